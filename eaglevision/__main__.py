@@ -8,5 +8,5 @@ from eaglevision.eaglevision import create_parser
 if __name__ == '__main__':
     # Execute the parse_args() method
     ARGS = create_parser(sys.argv[1:])
-    EAGLEVISIONOBJ = EagleVision(ARGS.path)
+    EAGLEVISIONOBJ = EagleVision(ARGS.path, ARGS.workers)
     EAGLEVISIONOBJ.eaglewatch()
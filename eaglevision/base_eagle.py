@@ -3,10 +3,87 @@ import os
 import sys
 import json
 import shutil
+import shlex
+import hashlib
+import subprocess
+from fnmatch import fnmatch
 import pandas as pd
+from lizard import md5_hash_file
+from lizard_languages import get_reader_for
+from functiondefextractor import core_extractor
+from eaglevision.cache_eagle import CacheEagle
 
+VCS_FOLDERS = [".git", ".svn", ".hg"]
+# Rows of the html reports rendered and written at a time, so that the report is never held as one string
+HTML_CHUNK = 10000
 
-class BaseEagle:  # pylint: disable=R0902
+
+def line_breaks(html):
+    """ Function which converts the escaped line breaks of the rendered html to <br> """
+    return html.replace(r'\r\n', "<br>").replace(r'\n', "<br>").replace(r'\r', "<br>")  # pragma: no mutate
+
+
+def float_columns(html_data_frame):
+    """ Function which formats the float columns over the whole table, as to_html picks the precision from the
+    rows rendered and would format each chunk differently
+    Returns: dictionary of the column to its formatted values """
+    if html_data_frame.empty:
+        return dict()
+    return {column: [value.strip() for value in html_data_frame[column].to_string(index=False).split("\n")]
+            for column in html_data_frame.columns if pd.api.types.is_float_dtype(html_data_frame[column])}
+
+
+def lizard_unique(file_paths, root):
+    """ Function which leaves out the files with the same content as a file read before by lizard, which walks the
+    folders bottom up and skips the duplicates by their md5
+    file_paths: files of the top down walk of the root
+    Returns: the unique files, in the order of file_paths """
+    def folders(path):
+        """ Returns: the folders from the root down to the folder of the path """
+        parts = os.path.relpath(os.path.dirname(path), root).split(os.sep)
+        parts = [] if parts == [os.curdir] else parts
+        return [tuple(parts[:depth]) for depth in range(len(parts) + 1)]
+
+    ranks = dict()
+    for path in file_paths:
+        for folder in folders(path):
+            ranks.setdefault(folder, len(ranks))
+
+    def bottom_up(path):
+        """ Returns: sort key of the folder of the path, the sub folders before the folder """
+        return [ranks[folder] for folder in folders(path)] + [len(ranks)]
+
+    hashes, unique = set(), set()
+    for path in sorted(file_paths, key=bottom_up):
+        file_hash = md5_hash_file(path)
+        if not file_hash or file_hash not in hashes:
+            hashes.add(file_hash)
+            unique.add(path)
+    return [path for path in file_paths if path in unique]
+
+
+def html_chunks(html_data_frame):
+    """ Generator which renders the table in chunks of rows, the table head and end are only kept in the first and
+    last chunk and the line breaks are converted to <br> per chunk """
+    floats = float_columns(html_data_frame)
+    for start in range(0, max(len(html_data_frame), 1), HTML_CHUNK):
+        chunk = html_data_frame.iloc[start:start + HTML_CHUNK]
+        if floats:
+            chunk = chunk.copy()
+            for column, values in floats.items():
+                chunk[column] = values[start:start + HTML_CHUNK]
+        html = chunk.to_html(classes='mystyle')  # pragma: no mutate
+        html = line_breaks(html)
+        if start > 0:
+            html = html[html.index("<tbody>\n") + len("<tbody>\n"):]
+        if start + HTML_CHUNK < len(html_data_frame):
+            html = html[:html.rindex("</tbody>")].rstrip(" ")
+        yield html
+
+
+# One getter per optional key of the json input is the convention of the analyzers, so the public methods grow
+# with the inputs
+class BaseEagle:  # pylint: disable=R0902, R0904
     """ Base class for the Similarity, Cloc and Cyclomatic complexity
      classes which holds generic data """
 
@@ -29,6 +106,30 @@ class BaseEagle:  # pylint: disable=R0902
         self._cyclo_args = None
         self._similarity_range = None
         self._report_folder = None
+        self._run_concurrent = None
+        self._concurrent_workers = None
+        self._shared_file_walk = None
+        self._incremental = None
+        self._base_ref = None
+        self._head_ref = None
+        self._cache_path = None
+        self._cache_max_age = None
+        self._cache_max_size = None
+        self._cyclo_in_process = None
+        self._cyclo_workers = None
+        self._cyclo_top_k = None
+        self._cloc_native = None
+        self._cloc_workers = None
+        self._similarity_engine = None
+        self._similarity_memory_limit = None
+        self._similarity_top_k = None
+        self._similarity_index = None
+        self._similarity_dedup = None
+        self._similarity_length_buckets = None
+        self._similarity_streaming = None
+        self._extraction_workers = None
+        self._extraction_native = None
+        self._pattern_file_scan = None
 
     # getter methods
     def get_report_folder(self):
@@ -138,6 +239,164 @@ class BaseEagle:  # pylint: disable=R0902
         """
         return self._similarity_range
 
+    def get_run_concurrent(self):
+        """
+        Returns: run the analyzers concurrently yes or no
+        """
+        return bool(self._run_concurrent)
+
+    def get_concurrent_workers(self):
+        """
+        Returns: number of worker processes for the concurrent analyzers
+        """
+        return self._concurrent_workers
+
+    def get_shared_file_walk(self):
+        """
+        Returns: walk the project path once for all the analyzers yes or no
+        """
+        return bool(self._shared_file_walk)
+
+    def get_incremental(self):
+        """
+        Returns: analyse only the files changed since the previous run yes or no
+        """
+        return bool(self._incremental)
+
+    def get_base_ref(self):
+        """
+        Returns: git revision from which the changed files are analysed
+        """
+        return self._base_ref
+
+    def get_head_ref(self):
+        """
+        Returns: git revision up to which the changed files are analysed, working tree when None
+        """
+        return self._head_ref
+
+    def get_cache_path(self):
+        """
+        Returns: path of the sqlite result cache, None when the results are not cached
+        """
+        return self._cache_path
+
+    def get_cache_max_age(self):
+        """
+        Returns: number of days after which unused entries are evicted from the result cache
+        """
+        return self._cache_max_age
+
+    def get_cache_max_size(self):
+        """
+        Returns: size in MB above which the least recently used entries are evicted from the result cache
+        """
+        return self._cache_max_size
+
+    def get_cyclo_in_process(self):
+        """
+        Returns: run lizard through its API in the analyzer process instead of a subprocess yes or no
+        """
+        return bool(self._cyclo_in_process)
+
+    def get_cyclo_workers(self):
+        """
+        Returns: number of worker processes analysing the shards of the cyclomatic complexity files
+        """
+        return self._cyclo_workers
+
+    def get_cyclo_top_k(self):
+        """
+        Returns: number of the most complex functions to report, all the functions when None
+        """
+        return self._cyclo_top_k
+
+    def get_cloc_native(self):
+        """
+        Returns: count the lines with the native line counter instead of cloc yes or no
+        """
+        return bool(self._cloc_native)
+
+    def get_cloc_workers(self):
+        """
+        Returns: number of worker processes of the native line counter
+        """
+        return self._cloc_workers
+
+    def get_similarity_engine(self):
+        """
+        Returns: name of the similarity engine, None for the all pairs cosine similarity
+        """
+        return self._similarity_engine
+
+    def get_similarity_memory_limit(self):
+        """
+        Returns: memory budget in MB of the cosine similarity blocks, None for the all pairs matrix at once
+        """
+        return self._similarity_memory_limit
+
+    def get_similarity_top_k(self):
+        """
+        Returns: number of the most similar functions reported per function, None for all the pairs in range
+        """
+        return self._similarity_top_k
+
+    def get_similarity_index(self):
+        """
+        Returns: similarity index of the report folder updated with the changed functions only yes or no
+        """
+        return bool(self._similarity_index)
+
+    def get_similarity_dedup(self):
+        """
+        Returns: copies of a function collapsed in to clone classes before the similarity check yes or no
+        """
+        return bool(self._similarity_dedup)
+
+    def get_similarity_length_buckets(self):
+        """
+        Returns: number of the length buckets of the functions for pruning the similarity check, None for no pruning
+        """
+        return self._similarity_length_buckets
+
+    def get_similarity_streaming(self):
+        """
+        Returns: functions extracted and checked file by file instead of all at once yes or no
+        """
+        return bool(self._similarity_streaming)
+
+    def get_extraction_workers(self):
+        """
+        Returns: number of worker processes of the function extraction
+        """
+        return self._extraction_workers
+
+    def get_extraction_native(self):
+        """
+        Returns: python functions extracted with the built in ast extractor instead of ctags yes or no
+        """
+        return bool(self._extraction_native)
+
+    def get_pattern_file_scan(self):
+        """
+        Returns: pattern only runs scan the files for the patterns before extracting the functions yes or no
+        """
+        return bool(self._pattern_file_scan)
+
+    def tracks_file_hashes(self):
+        """
+        Returns: the results are tracked per file content hash (incremental mode or result cache) yes or no
+        """
+        return self.get_incremental() or bool(self.get_cache_path())
+
+    def needs_file_walk(self):
+        """
+        Returns: the analyzers need the file list of the shared file walk yes or no
+        """
+        return any([self.get_shared_file_walk(), self.tracks_file_hashes(), self.get_base_ref(),
+                    self.get_cyclo_workers(), self.get_cloc_native(), self.get_similarity_streaming(),
+                    self.get_extraction_workers(), self.get_extraction_native(), self.get_pattern_file_scan()])
+
     def __validate_inputs_path__(self):
         """This function helps in validating the user inputs"""
 
@@ -182,10 +441,206 @@ class BaseEagle:  # pylint: disable=R0902
         self._exclude_extraction = input_data["extraction_exclude"]
         self._similarity_range = input_data["similarity_range"]
         self._report_folder = input_data["report_folder"]
+        # Optional config, absence of the keys keeps the sequential execution
+        self._run_concurrent = input_data.get("run_concurrent", False)
+        self._concurrent_workers = input_data.get("concurrent_workers", None)
+        self._shared_file_walk = input_data.get("shared_file_walk", False)
+        self._incremental = input_data.get("incremental", False)
+        self._base_ref = input_data.get("base_ref", None)
+        self._head_ref = input_data.get("head_ref", None)
+        self._cache_path = input_data.get("cache_path", None)
+        self._cache_max_age = input_data.get("cache_max_age", None)
+        self._cache_max_size = input_data.get("cache_max_size", None)
+        self._cyclo_in_process = input_data.get("cyclo_in_process", False)
+        self._cyclo_workers = input_data.get("cyclo_workers", None)
+        self._cyclo_top_k = input_data.get("cyclo_top_k", None)
+        self._cloc_native = input_data.get("cloc_native", False)
+        self._cloc_workers = input_data.get("cloc_workers", None)
+        self._similarity_engine = input_data.get("similarity_engine", None)
+        self._similarity_memory_limit = input_data.get("similarity_memory_limit", None)
+        self._similarity_top_k = input_data.get("similarity_top_k", None)
+        self._similarity_index = input_data.get("similarity_index", False)
+        self._similarity_dedup = input_data.get("similarity_dedup", False)
+        self._similarity_length_buckets = input_data.get("similarity_length_buckets", None)
+        self._similarity_streaming = input_data.get("similarity_streaming", False)
+        self._extraction_workers = input_data.get("extraction_workers", None)
+        self._extraction_native = input_data.get("extraction_native", False)
+        self._pattern_file_scan = input_data.get("pattern_file_scan", False)
+
+    def __split_cloc_args(self):
+        """ Function which splits the cloc args in to the excludes applied by the file walk and the rest
+        Returns: excluded folder names, excluded extensions, remaining cloc args """
+        exclude_dirs, exclude_ext, cloc_args = set(), set(), []
+        for arg in str(self.get_cloc_args() or "").split():
+            option, _, value = arg.partition("=")
+            if option == "--exclude-dir":
+                exclude_dirs.update(value.split(","))
+            elif option == "--exclude-ext":
+                exclude_ext.update(ext.lstrip("*.").lower() for ext in value.split(","))
+            else:
+                cloc_args.append(arg)
+        return exclude_dirs, exclude_ext, " ".join(cloc_args)
+
+    def __get_cyclo_option(self, short, long):
+        """ Function which fetches the values of an option of the cyclomatic complexity args, like -l / --languages
+        Returns: list of the values, in the order of the args """
+        args = shlex.split(str(self.get_cyclo_args() or ""))
+        values = []
+        for index, arg in enumerate(args):
+            if arg in (short, long) and index + 1 < len(args):
+                values.append(args[index + 1])
+            elif arg.startswith(long + "="):
+                values.append(arg[len(long) + 1:])
+            elif arg.startswith(short) and not arg.startswith("--") and len(arg) > len(short):
+                values.append(arg[len(short):])
+        return values
+
+    @staticmethod
+    def __is_cyclo_file(file_path, languages, excludes):
+        """ Function which checks if lizard would analyse the file: known language, of interest and not excluded """
+        reader = get_reader_for(file_path)
+        return bool(reader) and (not languages or bool(set(languages).intersection(reader.language_names))) \
+            and not any(fnmatch(file_path, pattern) for pattern in excludes)
+
+    def __walk(self, exclude_dirs, exclude_ext):
+        """ Function which walks the project path once
+        Returns: all the files, files of interest for cloc """
+        all_files, cloc_files = [], []
+        # the generated reports are not part of the project, else the incremental runs would analyse them
+        report_dir = os.path.abspath(os.path.join(self.get_report_folder(), "EagleVisionReport"))
+        for dir_path, dir_names, file_names in os.walk(self.get_proj_path()):
+            dir_names[:] = [name for name in dir_names if name not in VCS_FOLDERS and
+                            os.path.abspath(os.path.join(dir_path, name)) != report_dir]
+            file_paths = [os.path.join(dir_path, name) for name in file_names]
+            all_files.extend(file_paths)
+            if not exclude_dirs.intersection(os.path.relpath(dir_path, self.get_proj_path()).split(os.sep)):
+                cloc_files.extend(path for path in file_paths
+                                  if os.path.splitext(path)[1][1:].lower() not in exclude_ext)
+        return all_files, cloc_files
+
+    def walk_files(self):
+        """ Function which enumerates the files under the project path once and applies the excludes of all the
+        analyzers (cloc args, cyclo_exclude, extraction_exclude), so that the analyzers share one file list
+        Returns: dictionary with the file list for cloc, cyclo and extraction and the remaining cloc args """
+        exclude_dirs, exclude_ext, cloc_args = self.__split_cloc_args()
+        all_files, cloc_files = self.__walk(exclude_dirs, exclude_ext)
+        languages = self.__get_cyclo_option("-l", "--languages")
+        # the excludes of the cyclo args too, as lizard does not apply them to the listed files
+        excludes = [str(x) for x in self.get_cyclo_exclude() or [] if x is not None] + \
+            self.__get_cyclo_option("-x", "--exclude")
+        file_index = {
+            "cloc": cloc_files,
+            "cloc_args": cloc_args,
+            "cyclo": lizard_unique([path for path in all_files if self.__is_cyclo_file(path, languages, excludes)],
+                                   self.get_proj_path()),
+            "extraction": core_extractor.filter_files(core_extractor.filter_reg_files(
+                all_files, self.get_exclude_extraction()))
+        }
+        if self.get_base_ref():
+            self.__scope_to_changed(file_index)
+        all_files = set(file_index["cloc"]).union(file_index["cyclo"], file_index["extraction"])
+        if self.tracks_file_hashes():
+            file_index["hashes"] = {file_path: self.hash_file(file_path) for file_path in all_files}
+        return file_index
+
+    def get_changed_files(self):
+        """ Function which lists the files changed between the base_ref and head_ref git revisions
+        (the working tree when head_ref is not given), deleted files are left out
+        Returns: set of the normalised paths of the changed files under the project path """
+        # -z lists the paths as is, else git quotes the paths holding special or non ASCII characters
+        cmd = ["git", "diff", "--name-only", "-z", "--relative", "--diff-filter=d", str(self.get_base_ref())]
+        if self.get_head_ref():
+            cmd.append(str(self.get_head_ref()))
+        try:
+            output = subprocess.run(cmd, cwd=self.get_proj_path(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    universal_newlines=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError) as exc:
+            print("git diff of base_ref and head_ref failed --> Please recheck your inputs")  # pragma: no mutate
+            print(getattr(exc, "stderr", None) or exc)  # pragma: no mutate
+            sys.exit(1)
+        return {os.path.normpath(os.path.join(self.get_proj_path(), name)) for name in output.split("\0") if name}
+
+    def __scope_to_changed(self, file_index):
+        """ Function which limits the cloc and cyclo file lists to the changed files, the extraction list is kept
+        whole as index for the similarity and the changed files of it are listed separately """
+        changed = self.get_changed_files()
+        for key in ["cloc", "cyclo"]:
+            file_index[key] = [path for path in file_index[key] if os.path.normpath(path) in changed]
+        file_index["changed"] = [path for path in file_index["extraction"] if os.path.normpath(path) in changed]
+
+    @staticmethod
+    def hash_file(file_path):
+        """ Function which returns the content hash of the raw bytes of the file """
+        with open(file_path, "rb") as file_in:
+            return hashlib.sha1(file_in.read()).hexdigest()
+
+    @staticmethod
+    def load_manifest(manifest_path, settings):
+        """ Function which reads the file path to content hash manifest of the previous run
+        Returns: the manifest, empty when there is no previous run or when the analyzer settings changed """
+        manifest = dict()
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, encoding="utf-8") as file_in:
+                data = json.load(file_in)
+            if data.get("settings") == str(settings):
+                manifest = data.get("files", dict())
+        return manifest
+
+    @staticmethod
+    def save_manifest(manifest_path, settings, hashes):
+        """ Function which writes the file path to content hash manifest for the next run """
+        with open(manifest_path, "w", encoding="utf-8") as file_out:
+            json.dump({"settings": str(settings), "files": hashes}, file_out, indent=1)
+
+    @staticmethod
+    def split_changed_files(file_list, hashes, manifest):
+        """ Function which compares the content hashes with the manifest of the previous run
+        Returns: list of new or changed files, set of unchanged files """
+        unchanged = {file_path for file_path in file_list if manifest.get(file_path) == hashes[file_path]}
+        return [file_path for file_path in file_list if file_path not in unchanged], unchanged
+
+    @staticmethod
+    def cache_key(file_path, file_hash, by_name=False):
+        """ Function which returns the cache key of the file, the content hash along with the extension the
+        language is picked by (the name for the files with out extension), or the file name when the results
+        hold it """
+        name = os.path.basename(file_path)
+        return "%s|%s" % (file_hash, name if by_name else os.path.splitext(name)[1] or name)
+
+    def cache_lookup(self, kind, settings, file_list, hashes, columns, by_name=False):
+        """ Function which looks up the per file results in the result cache
+        by_name: the results depend on the file name, not only on its extension
+        Returns: files not found in the cache, data frame of the rows of the files found """
+        if not self.get_cache_path():
+            return file_list, pd.DataFrame(columns=columns)
+        with CacheEagle(self.get_cache_path()) as cache:
+            found = cache.get_rows(kind, settings, {path: self.cache_key(path, hashes[path], by_name)
+                                                    for path in file_list})
+        print("[EagleVision] %s of %s files served from the %s cache"  # pragma: no mutate
+              % (len(found), len(file_list), kind))  # pragma: no mutate
+        rows = [row for path in file_list for row in found.get(path, [])]
+        return [path for path in file_list if path not in found], pd.DataFrame(rows, columns=columns)
+
+    def cache_store(self, kind, settings, file_list, hashes, dataframe, path_column, by_name=False):
+        """ Function which stores the per file results of the analysed files in the result cache, files with out
+        rows are stored as well, then evicts the entries by age and total size """
+        if not self.get_cache_path():
+            return
+        groups = {path: rows.values.tolist() for path, rows in dataframe.groupby(path_column)}
+        with CacheEagle(self.get_cache_path(), self.get_cache_max_age(), self.get_cache_max_size()) as cache:
+            for path in file_list:
+                cache.put_rows(kind, settings, path, self.cache_key(path, hashes[path], by_name), groups.get(path, []))
+            cache.evict()
+
+    @staticmethod
+    def write_file_list(file_path, file_list):
+        """ Function which writes the list of files to be analysed, one file per line """
+        with open(file_path, "w", encoding="utf-8") as file_out:
+            file_out.write("\n".join(file_list))
 
     @staticmethod
     def report_html(file_path, html_data_frame, report_type):
-        """ Function which is used to report output """
+        """ Function which is used to report output, the table is written in chunks of rows """
         folder_path = os.path.dirname(file_path)
         pd.set_option('colheader_justify', 'center')  # pragma: no mutate
         html_string = '''
@@ -199,10 +654,12 @@ class BaseEagle:  # pylint: disable=R0902
         </html>
         ''' % report_type  # pragma: no mutate
 
+        head, tail = html_string.split("{table}")
         with open(file_path, 'w', encoding='utf-8') as html_file:
-            html_file.write(html_string.format(table=html_data_frame.to_html(  # pragma: no mutate
-                classes='mystyle')).replace(r'\r\n', "<br>").
-                            replace(r'\n', "<br>").replace(r'\r', "<br>"))  # pragma: no mutate
+            html_file.write(line_breaks(head))
+            for html in html_chunks(html_data_frame):
+                html_file.write(html)
+            html_file.write(line_breaks(tail))
         shutil.copy(os.path.join(os.path.dirname(__file__),
                                  "report_style.css"),
                     os.path.join(folder_path, "report_style.css"))  # pragma: no mutate
@@ -0,0 +1,94 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import json
+import time
+import sqlite3
+from pathlib import Path
+
+# Place holder of the file path in the cached rows, so that files with the same content share the rows
+PATH_HOLDER = "\0path\0"
+# Maximum number of host parameters of one sqlite statement
+QUERY_CHUNK = 500
+
+
+class CacheEagle:
+    """ Class which holds the per file results of the analyzers in a sqlite database, keyed by the kind of
+    result, the key of the file (BaseEagle.cache_key) and the analyzer settings """
+
+    def __init__(self, cache_path, max_age=None, max_size=None):
+        """ Constructor for the class
+        max_age: entries not used for more than max_age days are evicted
+        max_size: the least recently used entries are evicted above max_size MB """
+        self.max_age = max_age
+        self.max_size = max_size
+        Path(str(cache_path)).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(cache_path), timeout=60)
+        # Write ahead log, so that the concurrent analyzers can read while one of them writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (kind TEXT NOT NULL, hash TEXT NOT NULL, "
+                                "settings TEXT NOT NULL, path TEXT, data TEXT NOT NULL, size INTEGER NOT NULL, "
+                                "last_used REAL NOT NULL, PRIMARY KEY (kind, hash, settings))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_path ON results (path)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_hash ON results (hash)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.connection.commit()
+
+    def __enter__(self):
+        """ Function to use the cache as context manager """
+        return self
+
+    def __exit__(self, *args):
+        """ Function which closes the database on leaving the context """
+        self.close()
+
+    @staticmethod
+    def __replace_path(rows, old, new):
+        """ Function which replaces the file path in the text cells of the rows """
+        return [[cell.replace(old, new) if isinstance(cell, str) else cell for cell in row] for row in rows]
+
+    def get_rows(self, kind, settings, hashes):
+        """ Function which looks up the cached rows of the files
+        hashes: dictionary of file path to the key of the file
+        Returns: dictionary of file path to the list of rows, for the files found in the cache """
+        paths_of_hash = dict()
+        for path, file_hash in hashes.items():
+            paths_of_hash.setdefault(file_hash, []).append(path)
+        found = dict()
+        keys = list(paths_of_hash)
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for file_hash, data in self.connection.execute(
+                    "SELECT hash, data FROM results WHERE kind = ? AND settings = ? AND hash IN (%s)" % marks,
+                    [kind, str(settings)] + chunk):
+                for path in paths_of_hash[file_hash]:
+                    found[path] = self.__replace_path(json.loads(data), PATH_HOLDER, path)
+            self.connection.execute("UPDATE results SET last_used = ? WHERE kind = ? AND settings = ? AND hash IN "
+                                    "(%s)" % marks, [time.time(), kind, str(settings)] + chunk)
+        self.connection.commit()
+        return found
+
+    def put_rows(self, kind, settings, path, file_hash, rows):
+        """ Function which stores the rows of one file """
+        data = json.dumps(self.__replace_path(rows, path, PATH_HOLDER))
+        self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (kind, file_hash, str(settings), path, data, len(data), time.time()))
+
+    def evict(self):
+        """ Function which evicts the entries older than max_age days, then the least recently used entries
+        till the total size is below max_size MB """
+        if self.max_age is not None:
+            self.connection.execute("DELETE FROM results WHERE last_used < ?",
+                                    (time.time() - float(self.max_age) * 24 * 3600,))
+        if self.max_size is not None:
+            budget, total, evicted = float(self.max_size) * 1024 * 1024, 0, []
+            for rowid, size in self.connection.execute("SELECT rowid, size FROM results ORDER BY last_used DESC"):
+                total += size
+                if total > budget:
+                    evicted.append((rowid,))
+            self.connection.executemany("DELETE FROM results WHERE rowid = ?", evicted)
+        self.connection.commit()
+
+    def close(self):
+        """ Function which commits the stored rows and closes the database """
+        self.connection.commit()
+        self.connection.close()
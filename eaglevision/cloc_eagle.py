@@ -1,9 +1,14 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 import os
+import sys
 import subprocess
 from pathlib import Path
 import pandas as pd
 from eaglevision.base_eagle import BaseEagle
+from eaglevision.line_counter import count_files_parallel
+
+BY_FILE_COLUMNS = ["language", "filename", "blank", "comment", "code"]
+CLOC_COLUMNS = ["files", "language", "blank", "comment", "code"]
 
 
 class ClocEagle(BaseEagle): # pylint: disable=R0903
@@ -15,6 +20,9 @@ class ClocEagle(BaseEagle): # pylint: disable=R0903
         super().__init__()
         self.cmd = ""
         self.report_path = None
+        self.file_index = None
+        self.analysis_files = None
+        self.previous_rows = None
 
     def __cmd_builder(self):
         """ Function to form the cloc command to be executed """
@@ -22,8 +30,18 @@ class ClocEagle(BaseEagle): # pylint: disable=R0903
         if self.get_cloc_args():
             args = self.get_cloc_args()
         file_out = os.path.join(self.report_path, "cloc.csv")
-        self.cmd = 'cloc "%s" --csv --out="%s" %s' % (
-            self.get_proj_path().replace('\\', '/'), file_out.replace('\\', '/'), args) # pragma: no mutate
+        source = '"%s"' % self.get_proj_path().replace('\\', '/')
+        if self.file_index is not None:
+            # Files are already walked and filtered, cloc counts the listed files only
+            list_file = os.path.join(self.report_path, "cloc-files.txt")
+            self.write_file_list(list_file, self.analysis_files)
+            source = '--list-file="%s"' % list_file.replace('\\', '/')
+            args = self.file_index["cloc_args"]
+        if self.tracks_file_hashes():
+            # Counts per file, so that the counts of the unchanged files can be reused in the next run
+            file_out = os.path.join(self.report_path, "cloc-by-file.csv")
+            args = ("--by-file " + args).rstrip()
+        self.cmd = 'cloc %s --csv --out="%s" %s' % (source, file_out.replace('\\', '/'), args) # pragma: no mutate
         print(self.cmd) # pragma: no mutate
 
     def __write_cmd(self):
@@ -41,15 +59,99 @@ class ClocEagle(BaseEagle): # pylint: disable=R0903
     def __subprocess_out(self):
         """ Function to execute cloc command """
         self.__write_cmd()
-        status = subprocess.call(os.path.join(self.report_path, "cloc.cmd"))
+        status = 0
+        if self.analysis_files is None or self.analysis_files:
+            status = subprocess.call(os.path.join(self.report_path, "cloc.cmd"))
+        elif not self.tracks_file_hashes():
+            # No file to count (base_ref with out changes), cloc is not run and the report lists no language
+            self.aggregate_by_language(pd.DataFrame(columns=BY_FILE_COLUMNS)).to_csv(
+                os.path.join(self.report_path, "cloc.csv"), index=False)
         if status:
             print("There was error while processing the sub process command") # pragma: no mutate
         return status
 
+    def __count_native(self):
+        """ Function to count the lines with the native line counter instead of cloc, the per file counts are
+        written like cloc --by-file and aggregated per language in to cloc.csv """
+        by_file = pd.DataFrame(count_files_parallel(self.analysis_files, self.get_cloc_workers()),
+                               columns=BY_FILE_COLUMNS)
+        by_file.to_csv(os.path.join(self.report_path, "cloc-by-file.csv"), index=False)
+        if not self.tracks_file_hashes():
+            self.aggregate_by_language(by_file).to_csv(os.path.join(self.report_path, "cloc.csv"), index=False)
+        return 0
+
+    def __manifest_path(self):
+        """ Function to return the path of the content hash manifest of the incremental mode """
+        return os.path.join(self.report_path, "manifest.json")
+
+    def __read_by_file(self):
+        """ Function to read the per file counts of cloc, empty when cloc did not write any """
+        try:
+            dataframe = pd.read_csv(os.path.join(self.report_path, "cloc-by-file.csv"))
+        except (OSError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=BY_FILE_COLUMNS)
+        dataframe = dataframe.iloc[:, :len(BY_FILE_COLUMNS)]
+        dataframe.columns = BY_FILE_COLUMNS
+        return dataframe[dataframe["language"] != "SUM"]
+
+    def __settings(self, cloc_args):
+        """ Function which returns the settings the counts depend on, the cloc args and the counter """
+        return "%s|%s" % (cloc_args, "native" if self.get_cloc_native() else "cloc")
+
+    def __set_analysis_files(self):
+        """ Function to set the files to be counted, in incremental mode only the files changed since the
+        previous run are counted and the counts of the unchanged files are kept from the previous run, the files
+        found in the result cache are not counted either """
+        if self.needs_file_walk() and self.file_index is None:
+            self.file_index = self.walk_files()
+        if self.file_index is None:
+            return
+        self.analysis_files = self.file_index["cloc"]
+        self.previous_rows = pd.DataFrame(columns=BY_FILE_COLUMNS)
+        if self.get_incremental():
+            manifest = dict()
+            if os.path.isfile(os.path.join(self.report_path, "cloc-by-file.csv")):
+                manifest = self.load_manifest(self.__manifest_path(), self.__settings(self.get_cloc_args()))
+            self.analysis_files, unchanged = self.split_changed_files(self.file_index["cloc"],
+                                                                      self.file_index["hashes"], manifest)
+            previous = self.__read_by_file()
+            self.previous_rows = previous[previous["filename"].isin(unchanged)]
+        self.analysis_files, cached = self.cache_lookup("cloc", self.__settings(self.file_index["cloc_args"]),
+                                                        self.analysis_files, self.file_index.get("hashes"),
+                                                        BY_FILE_COLUMNS)
+        self.previous_rows = pd.concat([self.previous_rows, cached], ignore_index=True)
+
+    @staticmethod
+    def aggregate_by_language(by_file):
+        """ Function which aggregates the per file counts in to the per language counts of cloc.csv """
+        dataframe = by_file.groupby("language").agg(files=("filename", "count"), blank=("blank", "sum"),
+                                                    comment=("comment", "sum"), code=("code", "sum"))
+        dataframe = dataframe.reset_index().sort_values("code", ascending=False, kind="mergesort")
+        dataframe = dataframe[CLOC_COLUMNS]
+        total = pd.DataFrame([[dataframe["files"].sum(), "SUM", dataframe["blank"].sum(),
+                               dataframe["comment"].sum(), dataframe["code"].sum()]], columns=dataframe.columns)
+        return pd.concat([dataframe, total], ignore_index=True)
+
+    def __merge_incremental(self):
+        """ Function to store the counts of the counted files in the result cache, merge the counts of the
+        unchanged / cached files and write cloc.csv """
+        if not self.tracks_file_hashes():
+            return
+        changed_rows = self.__read_by_file() if self.analysis_files else pd.DataFrame(columns=BY_FILE_COLUMNS)
+        self.cache_store("cloc", self.__settings(self.file_index["cloc_args"]), self.analysis_files,
+                         self.file_index["hashes"], changed_rows, "filename")
+        by_file = pd.concat([self.previous_rows, changed_rows], ignore_index=True)
+        by_file.to_csv(os.path.join(self.report_path, "cloc-by-file.csv"), index=False)
+        self.aggregate_by_language(by_file).to_csv(os.path.join(self.report_path, "cloc.csv"), index=False)
+        if self.get_incremental():
+            self.save_manifest(self.__manifest_path(), self.__settings(self.get_cloc_args()),
+                               {path: self.file_index["hashes"][path] for path in self.file_index["cloc"]})
+
     def __report(self):
         """ Function to report the execution report of cloc"""
         dataframe = pd.read_csv(os.path.join(self.report_path, "cloc.csv"))
-        dataframe.drop(dataframe.columns[len(dataframe.columns) - 1], axis=1, inplace=True)
+        # cloc writes its version and timing in an extra last column, the aggregated counts do not have it
+        dataframe.drop(dataframe.columns[len(CLOC_COLUMNS):], axis=1, inplace=True)
         self.report_html(os.path.join(self.report_path, "cloc-report.html"), dataframe,
                          "Cloc Report")
 
@@ -58,14 +160,23 @@ class ClocEagle(BaseEagle): # pylint: disable=R0903
         self.report_path = os.path.join(self.get_report_path(), "cloc_report")
         Path(self.report_path).mkdir(parents=True, exist_ok=True)
 
-    def orchestrate_cloc(self, json):
-        """ Function which orchestrate the cloc execution"""
+    def orchestrate_cloc(self, json, file_index=None):
+        """ Function which orchestrate the cloc execution, returns the exit status of cloc
+        file_index: optional file list of the shared file walk (BaseEagle.walk_files)"""
         print("\n\n=================================")  # pragma: no mutate
         print("Please wait while [Cloc analysis Tool] process your inputs")  # pragma: no mutate
+        self.file_index = file_index
         self.populate_data(json)
         self.__set_report_path()
-        self.__cmd_builder()
-        if not self.__subprocess_out():
+        self.__set_analysis_files()
+        if self.get_cloc_native():
+            status = self.__count_native()
+        else:
+            self.__cmd_builder()
+            status = self.__subprocess_out()
+        if not status:
+            self.__merge_incremental()
             self.__report()
             print("\n\n[Cloc analysis Tool] saved the reports @ %s" % self.report_path)  # pragma: no mutate
             print("=================================")  # pragma: no mutate
+        return status
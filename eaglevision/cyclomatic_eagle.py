@@ -1,10 +1,88 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 import os
+import heapq
+import shlex
 import subprocess
+from bisect import bisect_right
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
+import lizard
 from eaglevision.base_eagle import BaseEagle
 
+CSV_COLUMNS = ["NLOC", "CCN", "Token", "Param", "Length", "Location", "Path", "Function", "Args", "Row", "Col"]
+# Number of shards per worker, smaller shards keep the workers busy till the end
+SHARDS_PER_WORKER = 4
+# Lower bounds of the CCN ranges of the distribution: low, moderate, high, very high and untestable complexity
+CCN_RANGES = [1, 6, 11, 21, 51]
+# Rows of the lizard csv read at a time in the top K mode
+CSV_CHUNK = 100000
+
+
+def function_record(file_info, func):
+    """ Function which returns the record of a function analysed by lizard, fields as in the lizard csv output """
+    name = func.name.replace('"', "'")
+    return [func.nloc, func.cyclomatic_complexity, func.token_count, len(func.parameters), func.length,
+            "%s@%s-%s@%s" % (name, func.start_line, func.end_line, file_info.filename), file_info.filename, name,
+            func.long_name.replace('"', "'"), func.start_line, func.end_line]
+
+
+def analyze_shard(file_names, cyclo_args):
+    """ Function which analyses one shard of the files with the lizard API, runs in a worker process
+    Returns: list of the function records of the shard """
+    options = lizard.parse_args(["lizard"] + shlex.split(str(cyclo_args or "")))
+    return [function_record(file_info, func) for file_info in lizard.analyze_files(file_names, 1, options.extensions)
+            if file_info for func in file_info.function_list]
+
+
+class ComplexitySummary:
+    """ Class which keeps the top K most complex functions in a bounded heap and running aggregates of all the
+    functions, so that the memory does not grow with the number of functions """
+
+    def __init__(self, top_k):
+        """ Constructor for the class """
+        self.top_k = int(top_k)
+        self.heap = []
+        self.functions = 0
+        self.ccn_histogram = [[0, 0] for _ in CCN_RANGES]
+        self.files = dict()
+
+    def add(self, record):
+        """ Function which adds the record of one function (CSV_COLUMNS) """
+        nloc, ccn, path = int(record[0]), int(record[1]), record[6]
+        self.functions += 1
+        # on equal CCN the function seen first is kept
+        entry = (ccn, -self.functions, record)
+        if len(self.heap) < self.top_k:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+        counts = self.ccn_histogram[max(0, bisect_right(CCN_RANGES, ccn) - 1)]
+        counts[0], counts[1] = counts[0] + 1, counts[1] + nloc
+        file_counts = self.files.setdefault(path, [0, 0, 0])
+        file_counts[0], file_counts[1], file_counts[2] = file_counts[0] + 1, file_counts[1] + nloc, \
+            max(file_counts[2], ccn)
+
+    def top(self):
+        """ Returns: data frame of the top K most complex functions, most complex first """
+        return pd.DataFrame([entry[2] for entry in sorted(self.heap, reverse=True)], columns=CSV_COLUMNS)
+
+    def distribution(self):
+        """ Returns: data frame of the number of functions and NLOC per CCN range, with the total """
+        ranges = ["%s-%s" % (low, high - 1) for low, high in zip(CCN_RANGES, CCN_RANGES[1:])]
+        dataframe = pd.DataFrame(self.ccn_histogram, columns=["Functions", "NLOC"],
+                                 index=ranges + [">=%s" % CCN_RANGES[-1]])
+        dataframe.loc["Total"] = dataframe.sum()
+        dataframe.index.name = "CCN"
+        return dataframe.reset_index()
+
+    def per_file(self):
+        """ Returns: data frame of the number of functions, NLOC and maximum CCN per file, biggest first """
+        dataframe = pd.DataFrame([[path] + counts for path, counts in self.files.items()],
+                                 columns=["Path", "Functions", "NLOC", "Max CCN"])
+        return dataframe.sort_values(["NLOC", "Path"], ascending=[False, True], kind="mergesort")
+
 
 class CyclomaticEagle(BaseEagle):
     """ To extract the cyclomatic complexity of a repo: """
@@ -15,6 +93,11 @@ class CyclomaticEagle(BaseEagle):
         super().__init__()
         self.cmd = ""
         self.report_path = None
+        self.file_index = None
+        self.analysis_files = None
+        self.previous_rows = None
+        self.records = None
+        self.stream = None
 
     def __cmd_builder(self):
         """ Function to form the cyclomatic complexity tool (lizard) command to be executed """
@@ -25,24 +108,139 @@ class CyclomaticEagle(BaseEagle):
         exclude = ",".join(str(x) for x in self.get_cyclo_exclude() if x is not None)
         if exclude:
             exclude = ','.join(' -x "{0}"'.format(w) for w in exclude.rstrip().split(','))
+        if self.file_index is not None:
+            # Files are already walked and filtered (language and exclude), lizard reads the listed files only
+            list_file = os.path.join(self.report_path, "cyclomatic-files.txt")
+            self.write_file_list(list_file, self.analysis_files)
+            self.cmd = 'python -m lizard -f "%s" ' % list_file
+            exclude = ""
         self.cmd = self.cmd + args + " " + exclude + " --csv"
         print(self.cmd) # pragma: no mutate
 
     def __subprocess_out(self):
-        """ Function to execute the subprocess with the specified cyclomatic complexity tool """
-        file_out = open(os.path.join(self.report_path, "cyclomatic-complexity.csv"), "w")
-        status = subprocess.call(r'%s' % self.cmd, stdout=file_out)
+        """ Function to execute the subprocess with the specified cyclomatic complexity tool, the output goes to a
+        temporary file which replaces the csv only on success, so that a failed run keeps the previous csv of the
+        incremental manifest """
+        csv_path = os.path.join(self.report_path, "cyclomatic-complexity.csv")
+        file_out = open(csv_path + ".tmp", "w")
+        status = 0
+        if self.analysis_files is None or self.analysis_files:
+            status = subprocess.call(r'%s' % self.cmd, stdout=file_out)
+        file_out.close()
         if status:
             print("There was error while processing the sub process command") # pragma: no mutate
-        file_out.close()
+            os.remove(csv_path + ".tmp")
+        else:
+            os.replace(csv_path + ".tmp", csv_path)
         return status
 
+    def __lizard_options(self):
+        """ Function which parses the cyclo_args like the lizard command line
+        Returns: lizard options, None when the cyclo_args are rejected """
+        try:
+            return lizard.parse_args(["lizard"] + shlex.split(str(self.get_cyclo_args() or "")))
+        except SystemExit:
+            print("There was error while processing the cyclo_args in lizard") # pragma: no mutate
+            return None
+
+    def __analyze_in_process(self):
+        """ Function which runs the lizard analysis API in this process and keeps the function records in memory,
+        with the same fields as the csv output of lizard
+        Returns: exit status, 2 when the cyclo_args are rejected by lizard like on the command line """
+        options = self.__lizard_options()
+        if options is None:
+            return 2
+        paths, excludes = self.analysis_files, options.exclude
+        if paths is None:
+            paths = [self.get_proj_path()]
+            excludes = excludes + [str(x) for x in self.get_cyclo_exclude() if x is not None]
+        result = lizard.analyze(paths, excludes, options.working_threads, options.extensions, options.languages)
+        records = (function_record(file_info, func) for file_info in result if file_info
+                   for func in file_info.function_list)
+        if self.get_cyclo_top_k() and not self.tracks_file_hashes():
+            # the records are streamed in to the top K report, the analysis runs while reporting
+            self.stream = records
+        else:
+            self.records = pd.DataFrame(list(records), columns=CSV_COLUMNS)
+        return 0
+
+    @staticmethod
+    def shard_files(file_names, shards):
+        """ Function which splits the files in to shards of about the same size, biggest files first
+        Returns: list of the shards, each a list of files """
+        ordered = sorted(file_names, key=lambda name: (-os.path.getsize(name), name))
+        return [shard for shard in (ordered[index::shards] for index in range(max(1, shards))) if shard]
+
+    def __analyze_sharded(self):
+        """ Function which analyses the shards of the files in parallel in a process pool, the records are merged
+        in to one table sorted by path and line, so that the order does not depend on the shards
+        Returns: exit status, 2 when the cyclo_args are rejected by lizard like on the command line """
+        if self.__lizard_options() is None:
+            return 2
+        workers = int(self.get_cyclo_workers())
+        shards = self.shard_files(self.analysis_files, workers * SHARDS_PER_WORKER)
+        records = []
+        if shards:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+                for shard_records in executor.map(analyze_shard, shards, repeat(self.get_cyclo_args())):
+                    records.extend(shard_records)
+        self.records = pd.DataFrame(records, columns=CSV_COLUMNS).sort_values(
+            ["Path", "Row", "Col"], kind="mergesort").reset_index(drop=True)
+        return 0
+
+    def __read_csv(self):
+        """ Function to read the csv generated by lizard, empty when there are no functions / no csv """
+        try:
+            return pd.read_csv(os.path.join(self.report_path, "cyclomatic-complexity.csv"),
+                               names=CSV_COLUMNS, sep=',')
+        except (OSError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=CSV_COLUMNS)
+
+    def __manifest_path(self):
+        """ Function to return the path of the content hash manifest of the incremental mode """
+        return os.path.join(self.report_path, "manifest.json")
+
+    def __set_analysis_files(self):
+        """ Function to set the files to be analysed, in incremental mode only the files changed since the
+        previous run are analysed and the rows of the unchanged files are kept from the previous csv, the files
+        found in the result cache are not analysed either """
+        if self.needs_file_walk() and self.file_index is None:
+            self.file_index = self.walk_files()
+        if self.file_index is None:
+            return
+        self.analysis_files = self.file_index["cyclo"]
+        self.previous_rows = pd.DataFrame(columns=CSV_COLUMNS)
+        if self.get_incremental():
+            manifest = dict()
+            if os.path.isfile(os.path.join(self.report_path, "cyclomatic-complexity.csv")):
+                manifest = self.load_manifest(self.__manifest_path(), self.get_cyclo_args())
+            self.analysis_files, unchanged = self.split_changed_files(self.file_index["cyclo"],
+                                                                      self.file_index["hashes"], manifest)
+            previous = self.__read_csv()
+            self.previous_rows = previous[previous["Path"].isin(unchanged)]
+        self.analysis_files, cached = self.cache_lookup("cyclo", self.get_cyclo_args(), self.analysis_files,
+                                                        self.file_index.get("hashes"), CSV_COLUMNS)
+        self.previous_rows = pd.concat([self.previous_rows, cached], ignore_index=True)
+
+    def __merge_incremental(self):
+        """ Function to store the rows of the analysed files in the result cache and to merge the rows of the
+        unchanged / cached files in to the csv """
+        if not self.tracks_file_hashes():
+            return
+        analysed = self.__read_csv() if self.records is None else self.records
+        self.cache_store("cyclo", self.get_cyclo_args(), self.analysis_files, self.file_index["hashes"], analysed,
+                         "Path")
+        self.records = pd.concat([self.previous_rows, analysed], ignore_index=True)
+        if self.get_incremental() or not (self.get_cyclo_in_process() or self.get_cyclo_workers()):
+            self.records.to_csv(os.path.join(self.report_path, "cyclomatic-complexity.csv"), index=False,
+                                header=False)
+        if self.get_incremental():
+            self.save_manifest(self.__manifest_path(), self.get_cyclo_args(),
+                               {path: self.file_index["hashes"][path] for path in self.file_index["cyclo"]})
+
     def __report(self):
         """ Function to report the cyclomatic complexity execution report """
-        dataframe = pd.read_csv(os.path.join(self.report_path, "cyclomatic-complexity.csv"),
-                                names=["NLOC", "CCN", "Token", "Param", "Length", "Location",
-                                       "Path", "Function", "Args", "Row", "Col"],
-                                sep=',')
+        dataframe = self.__read_csv() if self.records is None else self.records.copy()
         dataframe.drop(['Path', 'Function', 'Row', 'Col'], axis=1, inplace=True)
         dataframe.sort_values('CCN', ascending=False, inplace=True)
         dataframe["Location"] = dataframe["Location"].str.replace('\\', '/')
@@ -50,19 +248,62 @@ class CyclomaticEagle(BaseEagle):
                                       "cyclomatic-complexity-report.html"), dataframe,
                          "Cyclomatic Complexity report")
 
+    def __iter_records(self):
+        """ Function which yields the function records, from memory or streamed from the lizard csv """
+        if self.stream is not None:
+            yield from self.stream
+        elif self.records is not None:
+            yield from self.records.itertuples(index=False, name=None)
+        elif os.path.isfile(os.path.join(self.report_path, "cyclomatic-complexity.csv")) and \
+                os.path.getsize(os.path.join(self.report_path, "cyclomatic-complexity.csv")):
+            for chunk in pd.read_csv(os.path.join(self.report_path, "cyclomatic-complexity.csv"), names=CSV_COLUMNS,
+                                     sep=',', chunksize=CSV_CHUNK):
+                yield from chunk.itertuples(index=False, name=None)
+
+    def __report_top_k(self):
+        """ Function to report the top K most complex functions, the CCN distribution and the NLOC per file """
+        summary = ComplexitySummary(self.get_cyclo_top_k())
+        for record in self.__iter_records():
+            summary.add(record)
+        dataframe = summary.top().drop(['Path', 'Function', 'Row', 'Col'], axis=1)
+        dataframe["Location"] = dataframe["Location"].str.replace('\\', '/')
+        self.report_html(os.path.join(self.report_path, "cyclomatic-complexity-report.html"), dataframe,
+                         "Cyclomatic Complexity report, top %s of %s functions" % (summary.top_k, summary.functions))
+        self.report_html(os.path.join(self.report_path, "cyclomatic-complexity-distribution.html"),
+                         summary.distribution(), "Cyclomatic Complexity distribution")
+        per_file = summary.per_file()
+        per_file.to_csv(os.path.join(self.report_path, "cyclomatic-nloc-per-file.csv"), index=False)
+        self.report_html(os.path.join(self.report_path, "cyclomatic-nloc-per-file.html"),
+                         per_file.head(summary.top_k), "NLOC per file, top %s of %s files" % (summary.top_k,
+                                                                                            len(per_file)))
+
     def __set_report_path(self):
         """ Function to set the report path for cyclomatic complexity"""
         self.report_path = os.path.join(self.get_report_path(), "cyclomatic_report")
         Path(self.report_path).mkdir(parents=True, exist_ok=True)
 
-    def orchestrate_cyclomatic(self, json):
-        """ Function which orchestrate the cyclomatic complexity  execution"""
+    def orchestrate_cyclomatic(self, json, file_index=None):
+        """ Function which orchestrate the cyclomatic complexity  execution, returns the exit status of lizard
+        file_index: optional file list of the shared file walk (BaseEagle.walk_files)"""
         print("\n\n=================================")  # pragma: no mutate
         print("Please wait while [Cyclomatic analysis Tool] process your inputs")  # pragma: no mutate
+        self.file_index = file_index
         self.populate_data(json)
         self.__set_report_path()
-        self.__cmd_builder()
-        if not self.__subprocess_out():
-            self.__report()
+        self.__set_analysis_files()
+        if self.get_cyclo_workers():
+            status = self.__analyze_sharded()
+        elif self.get_cyclo_in_process():
+            status = self.__analyze_in_process()
+        else:
+            self.__cmd_builder()
+            status = self.__subprocess_out()
+        if not status:
+            self.__merge_incremental()
+            if self.get_cyclo_top_k():
+                self.__report_top_k()
+            else:
+                self.__report()
             print("\n\n[Cyclomatic analysis Tool] saved the reports @ %s" % self.report_path)  # pragma: no mutate
             print("=================================")  # pragma: no mutate
+        return status
@@ -1,10 +1,17 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 
+import os
+import sys
 import argparse
+import tempfile
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor
 from eaglevision.cloc_eagle import ClocEagle
 from eaglevision.base_eagle import BaseEagle
 from eaglevision.cyclomatic_eagle import CyclomaticEagle
 from eaglevision.similarity_eagle import SimilarityEagle
+from eaglevision.scheduler_eagle import SchedulerEagle
 
 
 def create_parser(args):
@@ -18,58 +25,152 @@ def create_parser(args):
                             metavar="--p",
                             type=str,
                             help="Input file path")
+    cos_parser.add_argument("--workers",
+                            metavar="--w",
+                            type=int,
+                            default=None,
+                            help="Number of workers shared by the json entries analysed in parallel, biggest "
+                                 "repository first")
     # ...Create your parser as you like...
     return cos_parser.parse_args(args)
 
 
+ANALYZER_NAMES = {
+    "CYCLOEXE": "Cyclomatic analysis Tool",
+    "CLOCEXE": "Cloc analysis Tool",
+    "SIMEXE": "Pattern matching and Code Similarity Tool"
+}
+
+
 class EagleVision(BaseEagle):
     """ Class which consolidates the matrices on Similarity, Cyclomatic Complexity, Cloc """
 
-    def __init__(self, json_path):
+    def __init__(self, json_path, workers=None):
         """ Constructor for the class """
         super(EagleVision)
         super().__init__()
         self.json_path = json_path
+        self.workers = workers
 
     @staticmethod
-    def __eaglewatch_cloc__(json):
+    def __eaglewatch_cloc__(json, file_index=None):
         """ Function which invokes the Cloc class for analysis """
         cloceagleobj = ClocEagle()
-        cloceagleobj.orchestrate_cloc(json)
+        return cloceagleobj.orchestrate_cloc(json, file_index)
 
     @staticmethod
-    def __eaglewatch_cyclo__(json):
+    def __eaglewatch_cyclo__(json, file_index=None):
         """ Function which invokes the Cyclomatic complexity class for analysis """
         cyclomaticeagleobj = CyclomaticEagle()
-        cyclomaticeagleobj.orchestrate_cyclomatic(json)
+        return cyclomaticeagleobj.orchestrate_cyclomatic(json, file_index)
 
     @staticmethod
-    def __eaglewatch_similarity__(json):
+    def __eaglewatch_similarity__(json, file_index=None):
         """ Function which invokes the Similarity analysis class for analysis """
         similarityeagleobj = SimilarityEagle()
-        similarityeagleobj.orchestrate_similarity(json)
+        return similarityeagleobj.orchestrate_similarity(json, file_index)
 
     @staticmethod
     def __empty_call():
         """ Empty call handler"""
         pass # pylint: disable=W0107
 
+    def __eaglewatch_concurrent__(self, json, toggle, file_index):
+        """ Function which runs the enabled analyzers in a process pool, prints the console output of
+        each analyzer as one block followed by the exit status of every analyzer """
+        analyzers = [func for func in toggle if func]
+        if not analyzers:
+            return 0
+        workers = self.get_concurrent_workers() or len(analyzers)
+        with ProcessPoolExecutor(max_workers=min(int(workers), len(analyzers))) as executor:
+            results = list(executor.map(run_analyzer, analyzers, [json] * len(analyzers),
+                                        [file_index] * len(analyzers)))
+        for _, _, output in results:
+            print(output, end="")  # pragma: no mutate
+        print("\n\n=================================")  # pragma: no mutate
+        for func, status, _ in results:
+            print("[%s] exit status: %s" % (ANALYZER_NAMES[func], status))  # pragma: no mutate
+        print("=================================")  # pragma: no mutate
+        return next((status for _, status, _ in results if status), 0)
+
+    def eaglewatch_entry(self, json):
+        """ Function which runs the enabled analyzers for one entry of the json config
+        Returns: first non zero exit status of the analyzers, else 0 """
+        self.populate_data(json)
+        status = 0
+        try:
+            toggle = [self.get_run_cloc_metric(), self.get_run_cyclomatic_complexity(),
+                      self.get_run_similarity() or self.get_run_pattern_match()]
+            file_index = self.walk_files() if self.needs_file_walk() else None
+            if self.get_run_concurrent():
+                return self.__eaglewatch_concurrent__(json, toggle, file_index)
+            function_dict = {
+                "CYCLOEXE": lambda: self.__eaglewatch_cyclo__(json, file_index),
+                "CLOCEXE": lambda: self.__eaglewatch_cloc__(json, file_index),
+                "SIMEXE": lambda: self.__eaglewatch_similarity__(json, file_index),
+                "": lambda: self.__empty_call() # pylint: disable=W0108
+            }
+            for i in range(0, 3):
+                func = toggle[i]
+                func_status = function_dict[func]()
+                status = status or func_status
+        except KeyError:
+            pass
+        return status
+
     def eaglewatch(self):
         """ Function which orchestrate the execution of  eaglewatch """
         json_data = self.read_json(self.json_path)
+        if self.workers:
+            summary_path = os.path.join(os.path.dirname(os.path.abspath(self.json_path)), "eaglevision-summary.html")
+            SchedulerEagle(run_entry).schedule(json_data, self.workers, summary_path)
+            return
         for data in range(len(json_data)):  # pylint: disable=C0200
-            self.populate_data(json_data[data])
-            try:
-                toggle = [self.get_run_cloc_metric(), self.get_run_cyclomatic_complexity(),
-                          self.get_run_similarity() or self.get_run_pattern_match()]
-                function_dict = {
-                    "CYCLOEXE": lambda: self.__eaglewatch_cyclo__(json_data[data]), # pylint: disable=W0640
-                    "CLOCEXE": lambda: self.__eaglewatch_cloc__(json_data[data]), # pylint: disable=W0640
-                    "SIMEXE": lambda: self.__eaglewatch_similarity__(json_data[data]), # pylint: disable=W0640
-                    "": lambda: self.__empty_call() # pylint: disable=W0108
-                }
-                for i in range(0, 3):
-                    func = toggle[i]
-                    function_dict[func]()
-            except KeyError:
-                continue
+            self.eaglewatch_entry(json_data[data])
+
+
+def run_entry(json):
+    """ Function which runs one entry of the json config, this is the unit of work of the scheduler """
+    return EagleVision(None).eaglewatch_entry(json)
+
+
+def _redirect_fds(capture):
+    """ Function which points the process level stdout and stderr to the capture file, so that the output of
+    the tools started as sub process is captured as well. Returns the duplicates needed to restore them """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    os.dup2(capture.fileno(), 1)
+    os.dup2(capture.fileno(), 2)
+    return saved_fds
+
+
+def _restore_fds(saved_fds):
+    """ Function which restores the process level stdout and stderr """
+    for file_desc, saved_fd in enumerate(saved_fds, 1):
+        os.dup2(saved_fd, file_desc)
+        os.close(saved_fd)
+
+
+def run_analyzer(analyzer, json, file_index=None):
+    """ Function which runs one analyzer in a worker process of the concurrent mode
+    Returns: analyzer key, exit status of the analyzer and the console output captured during the run """
+    function_dict = {
+        "CYCLOEXE": EagleVision.__eaglewatch_cyclo__,
+        "CLOCEXE": EagleVision.__eaglewatch_cloc__,
+        "SIMEXE": EagleVision.__eaglewatch_similarity__
+    }
+    with tempfile.TemporaryFile(mode="w+", buffering=1) as capture:
+        saved_fds = _redirect_fds(capture)
+        try:
+            with redirect_stdout(capture), redirect_stderr(capture):
+                status = function_dict[analyzer](json, file_index)
+        except SystemExit as exc:
+            status = exc.code
+        except Exception:  # pylint: disable=W0703
+            traceback.print_exc(file=capture)
+            status = 1
+        finally:
+            _restore_fds(saved_fds)
+        capture.seek(0)
+        return analyzer, status or 0, capture.read()
@@ -0,0 +1,134 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved.
+Native line counter, counts the blank, comment and code lines per file like cloc """
+import os
+import mmap
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+# Comment syntax: line comment markers, block comment (start, end) pairs
+C_STYLE = ((b"//",), ((b"/*", b"*/"),))
+HASH_STYLE = ((b"#",), ())
+XML_STYLE = ((), ((b"<!--", b"-->"),))
+NO_COMMENT = ((), ())
+SYNTAX = {
+    "C": C_STYLE, "C++": C_STYLE, "C/C++ Header": C_STYLE, "C#": C_STYLE, "Java": C_STYLE,
+    "JavaScript": C_STYLE, "TypeScript": C_STYLE, "JSX": C_STYLE, "Go": C_STYLE, "Rust": C_STYLE,
+    "Kotlin": C_STYLE, "Swift": C_STYLE, "Scala": C_STYLE, "Groovy": C_STYLE, "Dart": C_STYLE,
+    "Objective-C": C_STYLE, "Objective-C++": C_STYLE, "SCSS": C_STYLE, "CSS": ((), ((b"/*", b"*/"),)),
+    "PHP": ((b"//", b"#"), ((b"/*", b"*/"),)), "SQL": ((b"--",), ((b"/*", b"*/"),)),
+    "Python": ((b"#",), ((b'"""', b'"""'), (b"'''", b"'''"))), "Ruby": ((b"#",), ((b"=begin", b"=end"),)),
+    "Lua": ((b"--",), ((b"--[[", b"]]"),)), "PowerShell": ((b"#",), ((b"<#", b"#>"),)),
+    "Perl": HASH_STYLE, "Bourne Shell": HASH_STYLE, "Bourne Again Shell": HASH_STYLE, "R": HASH_STYLE,
+    "YAML": HASH_STYLE, "TOML": HASH_STYLE, "CMake": HASH_STYLE, "make": HASH_STYLE, "Dockerfile": HASH_STYLE,
+    "INI": ((b";", b"#"), ()), "HTML": XML_STYLE, "XML": XML_STYLE, "JSON": NO_COMMENT, "Markdown": NO_COMMENT,
+}
+EXTENSIONS = {
+    "c": "C", "cpp": "C++", "cc": "C++", "cxx": "C++", "c++": "C++", "h": "C/C++ Header", "hpp": "C/C++ Header",
+    "hh": "C/C++ Header", "hxx": "C/C++ Header", "cs": "C#", "java": "Java", "js": "JavaScript",
+    "mjs": "JavaScript", "cjs": "JavaScript", "ts": "TypeScript", "tsx": "TypeScript", "jsx": "JSX", "go": "Go",
+    "rs": "Rust", "kt": "Kotlin", "kts": "Kotlin", "swift": "Swift", "scala": "Scala", "groovy": "Groovy",
+    "dart": "Dart", "m": "Objective-C", "mm": "Objective-C++", "scss": "SCSS", "css": "CSS", "php": "PHP",
+    "sql": "SQL", "py": "Python", "rb": "Ruby", "lua": "Lua", "ps1": "PowerShell", "pl": "Perl", "pm": "Perl",
+    "sh": "Bourne Shell", "bash": "Bourne Again Shell", "r": "R", "yaml": "YAML", "yml": "YAML", "toml": "TOML",
+    "cmake": "CMake", "ini": "INI", "html": "HTML", "htm": "HTML", "xml": "XML", "json": "JSON", "md": "Markdown",
+}
+FILE_NAMES = {"makefile": "make", "gnumakefile": "make", "dockerfile": "Dockerfile", "cmakelists.txt": "CMake"}
+
+
+@lru_cache(maxsize=None)
+def language_of_extension(extension):
+    """ Function which returns the language of the file extension, cached per extension """
+    return EXTENSIONS.get(extension.lower())
+
+
+def language_of(file_path):
+    """ Function which detects the language of the file by its name or extension
+    Returns: cloc name of the language, None when not counted """
+    name = os.path.basename(file_path)
+    return FILE_NAMES.get(name.lower()) or language_of_extension(os.path.splitext(name)[1][1:])
+
+
+def open_block(line, blocks):
+    """ Function which returns the end marker of the block comment left open at the end of the line """
+    for start, end in blocks:
+        index = line.find(start)
+        if line.find(end, index + len(start)) < 0 <= index:
+            return end
+    return None
+
+
+def classify(line, syntax):
+    """ Function which classifies a stripped non blank line outside of a block comment
+    Returns: "comment" or "code", end marker of the block comment opened by the line """
+    line_markers, blocks = syntax
+    for start, end in blocks:
+        if line.startswith(start):
+            rest = line[len(start):]
+            if rest.find(end) < 0:
+                return "comment", end
+            rest = rest[rest.find(end) + len(end):].strip()
+            return ("code", open_block(rest, blocks)) if rest else ("comment", None)
+    if line_markers and line.startswith(line_markers):
+        return "comment", None
+    return "code", open_block(line, blocks)
+
+
+def count_lines(lines, syntax):
+    """ Function which counts the blank, comment and code lines
+    Returns: blank, comment, code counts """
+    counts = {"blank": 0, "comment": 0, "code": 0}
+    block_end = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            counts["blank"] += 1
+            continue
+        if block_end is not None:
+            index = line.find(block_end)
+            if index < 0:
+                counts["comment"] += 1
+                continue
+            line, block_end = line[index + len(block_end):].strip(), None
+            if not line:
+                counts["comment"] += 1
+                continue
+        kind, block_end = classify(line, syntax)
+        counts[kind] += 1
+    return counts["blank"], counts["comment"], counts["code"]
+
+
+def count_file(file_path):
+    """ Function which counts the lines of the file, read through a memory map
+    Returns: language, file path, blank, comment, code; None when the language is not counted """
+    language = language_of(file_path)
+    if language is None:
+        return None
+    try:
+        with open(file_path, "rb") as file_in:
+            if os.fstat(file_in.fileno()).st_size == 0:
+                return [language, file_path, 0, 0, 0]
+            with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return [language, file_path] + list(count_lines(iter(mapped.readline, b""), SYNTAX[language]))
+    except (OSError, ValueError):
+        return None
+
+
+def count_files(file_paths):
+    """ Function which counts the lines of the files, runs in a worker process
+    Returns: list of the per file counts """
+    return [row for row in map(count_file, file_paths) if row is not None]
+
+
+def count_files_parallel(file_paths, workers=None):
+    """ Function which counts the lines of the files across worker processes, in the order of the files
+    Returns: list of the per file counts """
+    workers = int(workers or 1)
+    if workers <= 1 or len(file_paths) < 2:
+        return count_files(file_paths)
+    chunk = max(1, len(file_paths) // (workers * 4))
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_rows in executor.map(count_files, [file_paths[index:index + chunk]
+                                                     for index in range(0, len(file_paths), chunk)]):
+            rows.extend(chunk_rows)
+    return rows
@@ -0,0 +1,166 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved.
+Pattern check of all the patterns in one scan of the functions, instead of one condition_checker run per pattern """
+import os
+import re
+import mmap
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Bytes out of ASCII, the files holding them are decoded to be matched like the condition checker
+NON_ASCII = re.compile(rb"[\x80-\xff]")
+# Line boundaries of str.splitlines, the statements of a function are split in to lines for the pivot table
+LINE_BREAKS = r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]"
+
+
+def compile_patterns(patterns):
+    """ Function which compiles the patterns in to one regex finding at every position the longest pattern
+    starting there, case insensitive like the condition checker """
+    alternatives = sorted({str(pattern).upper() for pattern in patterns}, key=len, reverse=True)
+    return re.compile("(?=(%s))" % "|".join(re.escape(pattern) for pattern in alternatives))
+
+
+def present_patterns(regex, patterns, text):
+    """ Function which returns the patterns found in the upper case text, a pattern is found when it is the start
+    of a longest match as the shorter patterns starting at the same position are not reported by the regex """
+    found = {match.group(1) for match in regex.finditer(text)}
+    return [pattern for pattern in patterns if any(match.startswith(pattern) for match in found)]
+
+
+def statement_lines(statements, separator=None):
+    """ Function which splits the statements in to their lines, cut at the first separator when given
+    Returns: series of the lines, in the order of the statements """
+    lines = pd.Series(statements, dtype=object).astype(str).str.split(LINE_BREAKS, regex=True).explode()
+    lines = lines[lines.str.len() > 0]
+    if separator is not None and not lines.empty:
+        lines = lines.str.partition(separator)[0]
+    return lines.reset_index(drop=True)
+
+
+def pattern_pivots(patterns, statements, separators):
+    """ Function which computes the pivot tables of the patterns with one group by of the lines of all the patterns
+    statements: statements of the functions of each pattern
+    separators: separator of each pattern, None for the whole statement
+    Returns: list of the pivot table of each pattern with the Different <pattern> patterns and Count columns, the
+    lines by count like condition_checker.get_pivot_table_result """
+    lines = [statement_lines(pattern_statements, separator)
+             for pattern_statements, separator in zip(statements, separators)]
+    keys = pd.Categorical(np.repeat(np.arange(len(lines)), [len(pattern_lines) for pattern_lines in lines]),
+                          categories=np.arange(len(lines)))
+    lines = pd.concat(lines + [pd.Series([], dtype=object)], ignore_index=True)
+    counts = lines.groupby([keys, lines], sort=False, observed=True).size()
+    pivots = []
+    for key, pattern in enumerate(patterns):
+        pivot = counts[counts.index.get_level_values(0) == key].droplevel(0).sort_values(ascending=False)
+        pivot = pivot.rename_axis("Different %s patterns " % pattern).rename("Count").reset_index()
+        pivots.append(pivot.astype({"Count": np.int64}))
+    return pivots
+
+
+def pattern_pivot(statements, pattern, separator=None):
+    """ Function which computes the pivot table of the statements of the pattern, for dashboards and the html
+    pivot of the pattern check
+    Returns: data frame with the Different <pattern> patterns and Count columns """
+    return pattern_pivots([pattern], [statements], [separator])[0]
+
+
+def match_function(regex, patterns, code):
+    """ Function which matches the upper case patterns in the code of one function, the lines are only looked at
+    for the patterns found in it, the patterns are counted as plain text (condition_checker counts them as regex)
+    Returns: dictionary of the patterns found to their count and statements, like the condition checker """
+    present = present_patterns(regex, patterns, code.upper())
+    if not present:
+        return dict()
+    lines = [line.strip() for line in code.splitlines()]
+    upper_lines = [line.upper() for line in lines]
+    return {pattern: (code.upper().count(pattern), "".join(line + os.linesep for line, upper_line
+                                                           in zip(lines, upper_lines) if pattern in upper_line))
+            for pattern in present}
+
+
+def unique_pivots(patterns, statements, separators):
+    """ Function which computes the pivot table of each distinct pattern and separator pair once, a pattern listed
+    twice with other separators has a pivot table per separator
+    statements: dictionary of the upper case pattern to the statements of the functions
+    Returns: dictionary of the (pattern, separator) pair to the pivot table """
+    unique = list(dict.fromkeys(zip(patterns, separators)))
+    return dict(zip(unique, pattern_pivots([pattern for pattern, _ in unique],
+                                           [statements[str(pattern).upper()] for pattern, _ in unique],
+                                           [separator for _, separator in unique])))
+
+
+def check_conditions(patterns, data_frame, separators):
+    """ Function which pattern checks the functions for all the patterns in one scan of each function, the lines
+    of a function are only looked at for the patterns found in it
+    separators: separator of each pattern for the pivot table, None for the whole statement
+    Returns: list of the data and pivot table of condition_checker.check_condition of each pattern, in the order
+    of the patterns """
+    if not patterns:
+        return []
+    data = pd.DataFrame(data_frame, columns=["Uniq ID", "Code"])
+    upper = [str(pattern).upper() for pattern in patterns]
+    regex = compile_patterns(patterns)
+    matches = [match_function(regex, upper, str(code)) for code in data["Code"]]
+    counts = {pattern: [match.get(pattern, (0, ""))[0] for match in matches] for pattern in upper}
+    statements = {pattern: [match.get(pattern, (0, ""))[1] for match in matches] for pattern in upper}
+    pivots = unique_pivots(patterns, statements, separators)
+    results = []
+    for pattern, separator, pattern_upper in zip(patterns, separators, upper):
+        pattern_data = data.copy()
+        pattern_data["Count of %s in function" % pattern] = counts[pattern_upper]
+        pattern_data["%s Statements" % pattern] = statements[pattern_upper]
+        results.append((pattern_data, pivots[(pattern, separator)]))
+    return results
+
+
+def file_regex(patterns):
+    """ Function which compiles the upper case patterns of only ASCII in to one case insensitive regex of the file
+    bytes, the ASCII case folding of the bytes is the .upper() of the condition checker for the ASCII text
+    Returns: regex, None when all the patterns are out of ASCII """
+    patterns = [str(pattern).upper() for pattern in patterns if str(pattern).upper().isascii()]
+    if not patterns:
+        return None
+    return re.compile(b"|".join(re.escape(pattern.encode("ascii")) for pattern in patterns), re.IGNORECASE)
+
+
+def has_patterns(file_path, regex, patterns):
+    """ Function which checks whether any of the patterns is in the file, read through a memory map, the files out
+    of ASCII without a hit of the regex are decoded and compared by .upper() like the condition checker, as the
+    upper case of their text may hold a pattern (\u00df is SS) """
+    try:
+        with open(file_path, "rb") as file_in:
+            if os.fstat(file_in.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if regex is not None and regex.search(mapped) is not None:
+                    return True
+                if NON_ASCII.search(mapped) is None:
+                    return False
+                text = mapped[:].decode("utf-8", errors="ignore").upper()
+                return any(str(pattern).upper() in text for pattern in patterns)
+    except (OSError, ValueError):
+        return False
+
+
+def scan_files(file_paths, patterns):
+    """ Function which scans the files for the patterns, runs in a worker process
+    Returns: list of the files containing any of the patterns """
+    regex = file_regex(patterns)
+    return [file_path for file_path in file_paths if has_patterns(file_path, regex, patterns)]
+
+
+def scan_files_parallel(file_paths, patterns, workers=None):
+    """ Function which scans the files for the patterns across worker processes, in the order of the files
+    Returns: list of the files containing any of the patterns """
+    workers = int(workers or 1)
+    if workers <= 1 or len(file_paths) < 2:
+        return scan_files(file_paths, patterns)
+    chunk = max(1, len(file_paths) // (workers * 4))
+    hits = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_hits in executor.map(scan_files, [file_paths[index:index + chunk]
+                                                    for index in range(0, len(file_paths), chunk)],
+                                       repeat(patterns)):
+            hits.extend(chunk_hits)
+    return hits
@@ -0,0 +1,38 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved.
+Native extractor of the python functions with the ast module, instead of ctags and grep """
+import os
+import ast
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def has_annotation(node, lines, annot):
+    """ Function which checks the annotation condition like the extractor, an annotation starting with @ is
+    looked up in the decorators of the function, else it is the start of the function name """
+    if annot is None:
+        return True
+    if annot[0] != "@":
+        return node.name.startswith(annot.lower())
+    first = min([decorator.lineno for decorator in node.decorator_list] or [node.lineno])
+    return any(annot in line for line in lines[first - 1:node.lineno - 1])
+
+
+def extract_functions(file_name, annot=None):
+    """ Function which extracts the functions of a python file, from the def line to the last line of the body
+    without the blank lines like the extractor
+    Returns: list of the unique ids and list of the code of the functions, None when the file does not parse """
+    try:
+        with open(file_name, encoding="utf-8", errors="ignore") as file_in:
+            source = file_in.read()
+        tree = ast.parse(source, filename=file_name)
+    except (OSError, SyntaxError, ValueError):
+        return None
+    lines = [line.rstrip() for line in source.splitlines()]
+    names, bodies = [], []
+    nodes = sorted((node for node in ast.walk(tree) if isinstance(node, FUNCTION_NODES)),
+                   key=lambda node: node.lineno)
+    for node in nodes:
+        if has_annotation(node, lines, annot):
+            names.append("%s_%s" % (file_name, node.name))
+            bodies.append(os.linesep.join(line for line in lines[node.lineno - 1:node.end_lineno] if line))
+    return names, bodies
@@ -0,0 +1,140 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import sys
+import time
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from eaglevision.base_eagle import BaseEagle
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # pylint: disable=C0103
+
+# Worker pools started by an entry, capped to the share of the entry in the worker budget
+WORKER_KEYS = ["cyclo_workers", "cloc_workers", "extraction_workers"]
+
+
+def get_peak_memory():
+    """ Function which returns the peak resident memory in MB of the current process and its children
+    Returns: peak memory in MB or None if the platform does not provide it """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is reported in bytes on mac and in kilobytes on linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def entry_budget(json, budget):
+    """ Function which caps the worker pools of the entry to its share of the worker budget, the analyzers of
+    "run_concurrent" share it as well
+    Returns: copy of the entry with the capped worker counts """
+    capped = dict(json)
+    share = budget
+    if capped.get("run_concurrent"):
+        capped["concurrent_workers"] = min(int(capped.get("concurrent_workers") or budget), budget)
+        share = max(1, budget // capped["concurrent_workers"])
+    for key in WORKER_KEYS:
+        if capped.get(key):
+            capped[key] = min(int(capped[key]), share)
+    return capped
+
+
+def run_entry_process(entry_runner, json, connection):
+    """ Function which runs one config entry in a dedicated process and sends back the exit status
+    along with the peak memory of the process """
+    status = 1
+    try:
+        status = entry_runner(json) or 0
+    except SystemExit as exc:
+        status = exc.code or 0
+    finally:
+        connection.send((status, get_peak_memory()))
+        connection.close()
+
+
+class SchedulerEagle(BaseEagle):
+    """ Class which runs the entries of the json config list in parallel within a global worker budget """
+
+    def __init__(self, entry_runner):
+        """ Constructor for the class """
+        super(SchedulerEagle)
+        super().__init__()
+        self.entry_runner = entry_runner
+        self.summary = None
+
+    @staticmethod
+    def estimate_size(path):
+        """ Function which estimates the size of a repository from the files committed in git HEAD, so that the
+        files are not walked on top of the walk of the entry, the path is walked when it is not in git
+        Returns: total bytes and number of files under the path """
+        try:
+            output = subprocess.run(["git", "ls-tree", "-r", "-l", "-z", "HEAD"], cwd=str(path), check=True,
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+        except (OSError, subprocess.CalledProcessError):
+            output = b""
+        # the entries are "<mode> <type> <object> <size>\t<path>", the size of the submodules is "-"
+        sizes = [entry.split(b"\t")[0].split()[-1] for entry in output.split(b"\0") if entry]
+        if sizes:
+            return sum(int(size) for size in sizes if size.isdigit()), len(sizes)
+        total_bytes, total_files = 0, 0
+        for dir_path, _, file_names in os.walk(str(path)):
+            for file_name in file_names:
+                try:
+                    total_bytes += os.path.getsize(os.path.join(dir_path, file_name))
+                    total_files += 1
+                except OSError:
+                    continue
+        return total_bytes, total_files
+
+    def __run_entry(self, json):
+        """ Function which runs one entry in its own process, so that the peak memory is measured per entry """
+        start = time.time()
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=run_entry_process, args=(self.entry_runner, json, sender))
+        process.start()
+        sender.close()
+        try:
+            status, peak_memory = receiver.recv()
+        except EOFError:
+            status, peak_memory = None, None
+        process.join()
+        if status is None:
+            status = process.exitcode
+        return status, round(time.time() - start, 2), peak_memory
+
+    def __order_entries(self, json_data):
+        """ Function which orders the entries biggest repository first, estimated by bytes and file count """
+        sizes = [self.estimate_size(data.get("path", "")) for data in json_data]
+        order = sorted(range(len(json_data)), key=lambda index: sizes[index], reverse=True)
+        return order, sizes
+
+    def schedule(self, json_data, workers, summary_path=None):
+        """ Function which runs all the config entries, at most workers entries at a time, the worker pools of the
+        entries running at a time share the workers
+        Returns: data frame with the summary of each entry """
+        order, sizes = self.__order_entries(json_data)
+        running = max(1, min(int(workers), len(json_data)))
+        budget = max(1, int(workers) // running)
+        with ThreadPoolExecutor(max_workers=running) as executor:
+            futures = {index: executor.submit(self.__run_entry, entry_budget(json_data[index], budget))
+                       for index in order}
+            results = {index: future.result() for index, future in futures.items()}
+        self.summary = pd.DataFrame(
+            [[json_data[index].get("path"), sizes[index][1], round(sizes[index][0] / (1024 * 1024), 2)]
+             + list(results[index]) for index in range(len(json_data))],
+            columns=["Path", "Files", "Size (MB)", "Status", "Duration (s)", "Peak memory (MB)"])
+        self.__report(summary_path)
+        return self.summary
+
+    def __report(self, summary_path):
+        """ Function to report the per entry summary on the console and as html """
+        print("\n\n=================================")  # pragma: no mutate
+        print(self.summary.to_string())  # pragma: no mutate
+        print("=================================")  # pragma: no mutate
+        if summary_path is not None:
+            self.report_html(summary_path, self.summary, "EagleVision Summary")
+            print("[EagleVision] saved the summary @ %s" % summary_path)  # pragma: no mutate
@@ -4,12 +4,73 @@ import os
 import os.path
 import datetime
 import time
+from itertools import repeat
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy import sparse
 from functiondefextractor import core_extractor
-from functiondefextractor import condition_checker
 from similarity.similarity_io import SimilarityIO
 from eaglevision.base_eagle import BaseEagle
+from eaglevision.similarity_engines import minhash_cos_match, blocked_cos_match, top_k_cos_match, \
+    top_k_of_pairs, pairs_of_changed, winnowing_match, clone_classes, bucketed_cos_match, blocked_pairs, \
+    top_k_pairs, report_frame, BLOCK_MEMORY_LIMIT
+from eaglevision.similarity_index import SimilarityIndex, INDEX_FILE
+from eaglevision.python_extractor import extract_functions
+from eaglevision.pattern_matcher import check_conditions, scan_files_parallel
+
+EXTRACTED_COLUMNS = ["File", "Uniq ID", "Code"]
+# Code of the functions of the streaming mode, read back in chunks of rows for the similarity check
+STREAM_FILE = "streamed-functions.csv"
+STREAM_CHUNK = 10000
+# Files extracted at a time in the streaming mode, with one lookup of the result cache
+STREAM_FILES = 1000
+# Shards of the files per extraction worker, several so that a shard of big files does not hold up the rest
+SHARDS_PER_WORKER = 4
+# Similarity engines other than the all pairs cosine of SimilarityIO, by the name of similarity_engine
+SIMILARITY_ENGINES = {"minhash": minhash_cos_match, "winnowing": winnowing_match}
+
+
+def extract_files(file_names, annot, delta, native=False):
+    """ Function to extract code from the given files, mirrors core_extractor.extractor without walking the folder,
+    runs in the extraction workers
+    native: the python files are extracted with the ast module instead of ctags """
+    code_list = []
+    core_extractor.UID_LIST.clear()
+    core_extractor.DELTA_BODY.clear()
+    for file_name in file_names:
+        if delta is not None:
+            core_extractor.get_delta_lines(file_name, annot, delta)
+            continue
+        is_python = os.path.splitext(file_name)[1].upper() == ".PY"
+        extracted = extract_functions(file_name, annot) if native and is_python else None
+        if extracted is not None:
+            if extracted[0]:
+                core_extractor.UID_LIST.append(extracted[0])
+                code_list.append(extracted[1])
+            continue
+        functions, line_num = core_extractor.get_function_names(file_name)
+        if is_python:
+            code_list = core_extractor.process_py_files(code_list, line_num, file_name, annot, None)
+        else:
+            code_list = core_extractor.process_input_files(line_num, functions, annot, file_name, code_list, None)
+    return core_extractor.remove_comments(core_extractor.get_final_dataframe(delta, code_list))
+
+
+def extract_each_file(file_names, annot, delta, native=False):
+    """ Function to extract code file by file, runs in the extraction workers
+    Returns: data frame with the File, Uniq ID and Code columns in the order of the files """
+    frames = [pd.DataFrame(columns=EXTRACTED_COLUMNS)]
+    frames.extend(extract_files([file_name], annot, delta, native).assign(File=file_name) for file_name in file_names)
+    extracted = pd.concat(frames, ignore_index=True)[EXTRACTED_COLUMNS]
+    if delta is not None:
+        # The IDs of the annotation delta lines are numbered once the files are merged, as the file names repeat
+        extracted["Uniq ID"] = extracted["File"].map(os.path.basename) + "_"
+    return extracted
 
 
 class SimilarityEagle(BaseEagle):
@@ -21,14 +82,141 @@ class SimilarityEagle(BaseEagle):
         super().__init__()
         self.dataframe = None
         self.report_path = None
+        self.file_index = None
+        self.changed_ids = None
+        self.pruning = None
+
+    def __shards__(self, file_names):
+        """ Function which splits the files in to consecutive shards for the extraction workers, so that the merged
+        functions keep the order of the files
+        Returns: list of the shards, None when the files are extracted in this process """
+        workers = int(self.get_extraction_workers() or 1)
+        if workers <= 1 or len(file_names) < 2 or self.get_delta() is not None:
+            return None
+        size = -(-len(file_names) // (workers * SHARDS_PER_WORKER))
+        return [file_names[index:index + size] for index in range(0, len(file_names), size)]
+
+    def __run_shards__(self, extract, file_names):
+        """ Function which runs the extraction of the shards of the files in a process pool
+        Returns: data frame of the functions of all the shards in the order of the files """
+        shards = self.__shards__(file_names)
+        workers = min(int(self.get_extraction_workers()), len(shards))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(extract, shards, repeat(self.get_annotation()), repeat(self.get_delta()),
+                                       repeat(self.get_extraction_native())))
+        return pd.concat(frames, ignore_index=True)
+
+    def __extract_files__(self, file_names):
+        """ Function to extract code from the given files, mirrors core_extractor.extractor
+        without walking the folder again, across the extraction workers when configured """
+        if self.get_delta() is not None and self.get_annotation() is None:
+            print("extraction_delta should be in combination with extraction_annotation")  # pragma: no mutate
+            return pd.DataFrame()
+        if self.__shards__(file_names) is None:
+            return extract_files(file_names, self.get_annotation(), self.get_delta(), self.get_extraction_native())
+        return self.__run_shards__(extract_files, file_names)
+
+    def __extract_each_file__(self, file_names):
+        """ Function to extract code file by file, across the extraction workers when configured
+        Returns: data frame with the File, Uniq ID and Code columns in the order of the files """
+        if self.__shards__(file_names) is None:
+            return extract_each_file(file_names, self.get_annotation(), self.get_delta(),
+                                     self.get_extraction_native())
+        return self.__run_shards__(extract_each_file, file_names)
+
+    def __read_extracted__(self):
+        """ Function to read the functions extracted in the previous run of the incremental mode """
+        try:
+            return pd.read_csv(os.path.join(self.report_path, "extracted-functions.csv"), keep_default_na=False)
+        except (OSError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=EXTRACTED_COLUMNS)
+
+    def __extraction_settings__(self):
+        """ Function which returns the extraction settings the extracted functions depend on """
+        return "%s|%s|%s" % (self.get_annotation(), self.get_delta(), self.get_extraction_native())
+
+    def __extract_by_file__(self, file_names):
+        """ Function to extract code file by file, the functions of the files found in the result cache are not
+        extracted again
+        Returns: data frame with the File, Uniq ID and Code columns in the order of the files """
+        by_name = self.get_delta() is not None  # the IDs of the annotation delta lines are the file names
+        missing, cached = self.cache_lookup("extraction", self.__extraction_settings__(), file_names,
+                                            self.file_index.get("hashes"), EXTRACTED_COLUMNS, by_name)
+        extracted = pd.concat([cached, self.__extract_each_file__(missing)], ignore_index=True)[EXTRACTED_COLUMNS]
+        self.cache_store("extraction", self.__extraction_settings__(), missing, self.file_index.get("hashes"),
+                         extracted, "File", by_name)
+        order = {file_name: index for index, file_name in enumerate(file_names)}
+        return extracted.iloc[extracted["File"].map(order).argsort(kind="mergesort")].reset_index(drop=True)
+
+    def __extract__(self, file_names):
+        """ Function to extract code from the given files, through the result cache when configured """
+        if not self.get_cache_path() or (self.get_delta() is not None and self.get_annotation() is None):
+            return self.__extract_files__(file_names)
+        return self.__number_delta_ids__(self.__extract_by_file__(file_names))[["Uniq ID", "Code"]]
+
+    def __number_delta_ids__(self, extracted):
+        """ Function which numbers the duplicate IDs of the annotation delta lines like the extractor """
+        if self.get_delta() is not None:
+            mask = extracted["Uniq ID"].duplicated(keep=False)
+            extracted.loc[mask, "Uniq ID"] += extracted.groupby("Uniq ID").cumcount().add(1).astype(str)
+        return extracted
+
+    def __incremental_extraction__(self):
+        """ Function to extract code only from the files changed since the previous run, the functions of the
+        unchanged files are reused from the previous run """
+        if self.get_delta() is not None and self.get_annotation() is None:
+            return self.__extract_files__([])
+        manifest_path = os.path.join(self.report_path, "manifest.json")
+        settings = self.__extraction_settings__()
+        manifest = dict()
+        if os.path.isfile(os.path.join(self.report_path, "extracted-functions.csv")):
+            manifest = self.load_manifest(manifest_path, settings)
+        files = self.file_index["extraction"]
+        changed, unchanged = self.split_changed_files(files, self.file_index["hashes"], manifest)
+        previous = self.__read_extracted__()
+        frames = [previous[previous["File"].isin(unchanged)], self.__extract_by_file__(changed)]
+        order = {file_name: index for index, file_name in enumerate(files)}
+        extracted = pd.concat(frames, ignore_index=True)[EXTRACTED_COLUMNS]
+        extracted = extracted.iloc[extracted["File"].map(order).argsort(kind="mergesort")].reset_index(drop=True)
+        extracted.to_csv(os.path.join(self.report_path, "extracted-functions.csv"), index=False)
+        self.save_manifest(manifest_path, settings, {file_name: self.file_index["hashes"][file_name]
+                                                     for file_name in files})
+        extracted = self.__number_delta_ids__(extracted)
+        if "changed" in self.file_index:
+            self.changed_ids = set(extracted.loc[extracted["File"].isin(self.file_index["changed"]), "Uniq ID"])
+        return extracted[["Uniq ID", "Code"]]
+
+    def __scoped_extraction__(self):
+        """ Function to extract code from the files changed between base_ref and head_ref, the functions of the
+        rest of the repo are extracted as index only when the similarity is run """
+        changed = self.__extract__(self.file_index["changed"])
+        self.changed_ids = set(changed["Uniq ID"]) if not changed.empty else set()
+        if not self.get_run_similarity() or not self.changed_ids:
+            return changed
+        changed_files = set(self.file_index["changed"])
+        rest = self.__extract__([file_name for file_name in self.file_index["extraction"]
+                                       if file_name not in changed_files])
+        return pd.concat([changed, rest], ignore_index=True)
 
     def __code_extraction__(self):
         """ Function to extract code from the folder"""
         val = True
-        self.dataframe = core_extractor.extractor(self.get_proj_path(), annot=self.get_annotation(),
-                                                  delta=self.get_delta(),
-                                                  exclude=r"%s" % self.get_exclude_extraction())
-        if self.dataframe.empty:
+        if self.needs_file_walk() and self.file_index is None:
+            self.file_index = self.walk_files()
+        if self.get_incremental():
+            self.dataframe = self.__incremental_extraction__()
+        elif self.file_index is not None and "changed" in self.file_index:
+            self.dataframe = self.__scoped_extraction__()
+        elif self.file_index is not None:
+            self.dataframe = self.__extract__(self.file_index["extraction"])
+        else:
+            self.dataframe = core_extractor.extractor(self.get_proj_path(), annot=self.get_annotation(),
+                                                      delta=self.get_delta(),
+                                                      exclude=r"%s" % self.get_exclude_extraction())
+        if self.changed_ids is not None and not self.changed_ids:
+            print("No functions are changed between base_ref and head_ref")  # pragma: no mutate
+            val = False
+        elif self.dataframe.empty:
             print("No functions are extracted. Data frame is empty. Recheck your input arguments")
             val = False
         return val
@@ -38,20 +226,132 @@ class SimilarityEagle(BaseEagle):
         """ Function to get timestamp"""
         return str(datetime.datetime.fromtimestamp(time.time()).strftime('%H-%M-%S_%d_%m_%Y'))  # pragma: no mutate
 
+    def __patterns__(self):
+        """ Function which returns the pattern and separator pairs of the pattern check, empty when they do not
+        match up """
+        if self.get_pattern() is not None and len(self.get_pattern()) == len(self.get_pattern_seperator()):
+            return [(str(pattern), str(separator) if separator else None)
+                    for pattern, separator in zip(self.get_pattern(), self.get_pattern_seperator())]
+        print("The pattern input is expected to be list and should be of same length as pattern separators")
+        return []
+
+    def __report_pattern__(self, pattern, data, pivot):
+        """ Function which writes the functions and the pivot of the pattern check """
+        if self.get_run_pattern_match():
+            self.__report_xlsx__(data, "%s_pattern" % pattern)
+            pivot.to_html("%s.html" % os.path.join(self.report_path, pattern + "Pivot_" + self.get_timestamp()))
+
     def __code_pattern_analyzer__(self):
         """" Function to extract patterns from the source code fetched in to the dataframe """
+        patterns = self.__patterns__()
+        if patterns:
+            results = check_conditions([pattern for pattern, _ in patterns], self.__pattern_frame__(),
+                                       [separator for _, separator in patterns])
+            for (pattern, _), result in zip(patterns, results):
+                self.__report_pattern__(pattern, *result)
 
-        if self.get_pattern() is not None and len(self.get_pattern()) == len(self.get_pattern_seperator()):
-            for i in range(len(self.get_pattern())):
-                pattern_sep = str(self.get_pattern_seperator()[i]) if self.get_pattern_seperator()[i] else None
-                data, pattern = condition_checker.check_condition(str(self.get_pattern()[i]), self.dataframe,
-                                                                  pattern_sep)
-                if self.get_run_pattern_match():
-                    self.__report_xlsx__(data, "%s_pattern" % self.get_pattern()[i])
-                    pattern.to_html("%s.html" % os.path.join(self.report_path, self.get_pattern()[i] + "Pivot_" +
-                                                             self.get_timestamp()))
-        else:
-            print("The pattern input is expected to be list and should be of same length as pattern separators")
+    def __pattern_frame__(self):
+        """ Function which returns the functions to be pattern checked, only the changed ones when scoped to
+        base_ref and head_ref """
+        if self.changed_ids is None:
+            return self.dataframe
+        return self.dataframe[self.dataframe["Uniq ID"].isin(self.changed_ids)].reset_index(drop=True)
+
+    def __changed_cos_match__(self, similarity_io_obj):
+        """ Function which matches only the changed functions against all the functions of the repo, instead of
+        all against all as SimilarityIO.process_cos_match, the report data frame has the same layout """
+        filter_range = sorted(int(i) for i in str(similarity_io_obj.filter_range).split(','))
+        data_frame = similarity_io_obj.data_frame
+        changed = data_frame["Uniq ID"].isin(self.changed_ids).to_numpy()
+        word_count_vector = CountVectorizer().fit_transform(data_frame["Steps"].astype(str).to_numpy())
+        c_sim = 100 * cosine_similarity(word_count_vector[changed], word_count_vector)
+        # Self matches and the second occurrence of the changed to changed pairs are left out
+        rows = np.flatnonzero(changed)
+        c_sim[changed[None, :] & (np.arange(len(changed))[None, :] <= rows[:, None])] = np.nan
+        report_df = pd.DataFrame(c_sim, columns=data_frame["Potential Match"],
+                                 index=data_frame["Uniq ID"][changed]).stack().reset_index()
+        report_df.columns = ["UNIQ ID", "POTENTIAL MATCH", "SIMILARITY"]
+        return report_df[(filter_range[0] <= report_df['SIMILARITY']) &
+                         (report_df['SIMILARITY'] <= filter_range[1])]
+
+    def __indexed_cos_match__(self, similarity_io_obj):
+        """ Function which updates the similarity index of the report folder with the new, changed and removed
+        functions and compares only the new and changed ones, the pairs of the unchanged ones come from the index """
+        data_frame = similarity_io_obj.data_frame
+        similarity_index = SimilarityIndex(os.path.join(self.report_path, INDEX_FILE), similarity_io_obj.filter_range)
+        changed = similarity_index.update(data_frame["Uniq ID"], data_frame["Steps"])
+        print("[Code Similarity Tool] %s of %s functions are new or changed since the last index"  # pragma: no mutate
+              % (changed.sum(), len(changed)))  # pragma: no mutate
+        report_df = similarity_index.query(changed, similarity_io_obj.filter_range,
+                                           self.get_similarity_memory_limit())
+        similarity_index.save()
+        if self.get_similarity_top_k():
+            return top_k_of_pairs(report_df, self.get_similarity_top_k(), self.changed_ids)
+        if self.changed_ids is not None:
+            return pairs_of_changed(report_df, self.changed_ids)
+        return report_df
+
+    def __bucketed_cos_match__(self, data_frame, filter_range, changed):
+        """ Function which prunes the pairs of functions whose lengths can not reach the lower bound of the range
+        and reports the share of the pairs computed """
+        report_df, computed, total = bucketed_cos_match(data_frame, filter_range, self.get_similarity_length_buckets(),
+                                                        self.get_similarity_memory_limit(), changed)
+        self.pruning = {"computed": computed, "total": total}
+        print("[Code Similarity Tool] length buckets pruned %s of %s pairs"  # pragma: no mutate
+              % (total - computed, total))  # pragma: no mutate
+        if self.get_similarity_top_k():
+            return top_k_of_pairs(report_df, self.get_similarity_top_k(), self.changed_ids)
+        return report_df
+
+    def __engine_cos_match__(self, engine, data_frame, filter_range, changed):
+        """ Function which finds the similar pairs with a similarity engine other than the cosine one """
+        report_df = engine(data_frame, filter_range, changed)
+        if self.get_similarity_top_k():
+            return top_k_of_pairs(report_df, self.get_similarity_top_k(), self.changed_ids)
+        return report_df
+
+    def __cos_match__(self, similarity_io_obj):
+        """ Function which finds the similar pairs with the configured similarity engine """
+        engine = SIMILARITY_ENGINES.get(self.get_similarity_engine())
+        if self.get_similarity_engine() not in (None, "cosine") and engine is None:
+            print("Unknown similarity_engine %s, the cosine engine is used" % self.get_similarity_engine())
+        data_frame = similarity_io_obj.data_frame
+        data_frame["Potential Match"] = data_frame["Uniq ID"]  # expected by SimilarityIO.report
+        changed = None if self.changed_ids is None else data_frame["Uniq ID"].isin(self.changed_ids).to_numpy()
+        if engine is not None:
+            return self.__engine_cos_match__(engine, data_frame, similarity_io_obj.filter_range, changed)
+        if self.get_similarity_index():
+            return self.__indexed_cos_match__(similarity_io_obj)
+        return self.__cosine_cos_match__(similarity_io_obj, changed)
+
+    def __cosine_cos_match__(self, similarity_io_obj, changed):
+        """ Function which finds the similar pairs with the cosine engine, pruned by length buckets, top K or
+        within the memory limit when configured """
+        data_frame = similarity_io_obj.data_frame
+        if self.get_similarity_length_buckets():
+            return self.__bucketed_cos_match__(data_frame, similarity_io_obj.filter_range, changed)
+        if self.get_similarity_top_k():
+            return top_k_cos_match(data_frame, similarity_io_obj.filter_range, self.get_similarity_top_k(),
+                                   self.get_similarity_memory_limit(), changed)
+        if self.get_similarity_memory_limit():
+            return blocked_cos_match(data_frame, similarity_io_obj.filter_range, self.get_similarity_memory_limit(),
+                                     changed)
+        if self.changed_ids is None:
+            return similarity_io_obj.process_cos_match()
+        return self.__changed_cos_match__(similarity_io_obj)
+
+    def __collapse_clones__(self, data_frame):
+        """ Function which reports the clone classes of the copied functions and keeps one representative per class
+        for the similarity check, a changed function is preferred as representative
+        Returns: data frame of the representatives """
+        changed = None if self.changed_ids is None else data_frame["Uniq ID"].isin(self.changed_ids).to_numpy()
+        representative, classes = clone_classes(data_frame, changed)
+        if not classes.empty:
+            self.__report_xlsx__(classes, "clone_classes")
+        class_count = classes["REPRESENTATIVE"].nunique()
+        print("[Code Similarity Tool] %s copied functions are collapsed in to %s clone classes"  # pragma: no mutate
+              % (len(classes) - class_count, class_count))  # pragma: no mutate
+        return data_frame[representative].reset_index(drop=True)
 
     def __code_similarity__(self):
         """ Function to conduct the similarity analysis """
@@ -64,7 +364,9 @@ class SimilarityEagle(BaseEagle):
                    similarity_io_obj.data_frame.columns[1]: 'Steps'}
         similarity_io_obj.data_frame.rename(columns=mapping, inplace=True)
         similarity_io_obj.uniq_header = "Uniq ID"  # Unique header of the input data frame
-        processed_similarity = similarity_io_obj.process_cos_match()
+        if self.get_similarity_dedup():
+            similarity_io_obj.data_frame = self.__collapse_clones__(similarity_io_obj.data_frame)
+        processed_similarity = self.__cos_match__(similarity_io_obj)
         similarity_io_obj.report(processed_similarity)
 
     def __report_xlsx__(self, data_f, name):
@@ -80,13 +382,141 @@ class SimilarityEagle(BaseEagle):
         self.report_path = os.path.join(self.get_report_path(), "pattern_and_similarity_report")
         Path(self.report_path).mkdir(parents=True, exist_ok=True)
 
-    def orchestrate_similarity(self, json):
-        """ Function which orchestrate the similarity execution"""
+    def __stream_functions__(self, file_names):
+        """ Generator which yields the functions extracted STREAM_FILES files at a time, so that one shard of the
+        files is held at a time """
+        for start in range(0, len(file_names), STREAM_FILES):
+            functions = self.__extract__(file_names[start:start + STREAM_FILES])
+            if not functions.empty:
+                yield functions
+
+    @staticmethod
+    def __merge_pivots__(pivots):
+        """ Function which adds up the pivots of the pattern check of the files in to the pivot of all the files """
+        pivot = pd.concat(pivots, ignore_index=True)
+        return pivot.groupby(pivot.columns[0], sort=False)[pivot.columns[1]].sum().sort_values(
+            ascending=False, kind="mergesort").reset_index()
+
+    def __stream_analysis__(self):
+        """ Function which pattern checks the streamed functions shard by shard and spills their code for the
+        similarity check, the pattern report lists the functions containing the pattern
+        Returns: number of functions, vocabulary of the words of the functions """
+        patterns = self.__patterns__()
+        matches = [([], []) for _ in patterns]
+        analyzer, vocabulary, count = CountVectorizer().build_analyzer(), dict(), 0
+        for functions in self.__stream_functions__(self.file_index["extraction"]):
+            results = check_conditions([pattern for pattern, _ in patterns], functions,
+                                       [separator for _, separator in patterns])
+            for (pattern, _), (data, pivot), (pattern_data, pivots) in zip(patterns, results, matches):
+                pattern_data.append(data[data["Count of %s in function" % pattern] > 0].drop(columns="Code"))
+                pivots.append(pivot)
+            if self.get_run_similarity():
+                for code in functions["Code"].astype(str):
+                    for word in analyzer(code):
+                        vocabulary.setdefault(word, len(vocabulary))
+                functions[["Uniq ID", "Code"]].to_csv(os.path.join(self.report_path, STREAM_FILE),
+                                                      mode="a" if count else "w", header=not count, index=False)
+            count += len(functions)
+        for (pattern, _), (data, pivots) in zip(patterns, matches):
+            if data:
+                self.__report_pattern__(pattern, pd.concat(data, ignore_index=True), self.__merge_pivots__(pivots))
+        return count, vocabulary
+
+    def __read_streamed__(self):
+        """ Generator which reads back the spilled functions in chunks of rows """
+        for chunk in pd.read_csv(os.path.join(self.report_path, STREAM_FILE), chunksize=STREAM_CHUNK, dtype=str,
+                                 keep_default_na=False):
+            yield chunk
+
+    def __streamed_similarity__(self, vocabulary):
+        """ Function which vectorizes the spilled functions chunk by chunk with the words of all the functions and
+        reports the similar pairs, only the functions of the reported pairs are read back for the report """
+        similarity_io_obj = SimilarityIO(None, None, None)
+        similarity_io_obj.file_path = self.report_path
+        if self.get_similarity_range():
+            similarity_io_obj.filter_range = self.get_similarity_range()
+        similarity_io_obj.uniq_header = "Uniq ID"
+        vectorizer, uniq_ids, vectors = CountVectorizer(vocabulary=vocabulary), [], []
+        for chunk in self.__read_streamed__():
+            uniq_ids.append(chunk["Uniq ID"].to_numpy())
+            vectors.append(vectorizer.transform(chunk["Code"]))
+        normalized = normalize(sparse.vstack(vectors).tocsr())
+        memory_limit = self.get_similarity_memory_limit() or BLOCK_MEMORY_LIMIT
+        if self.get_similarity_top_k():
+            pairs = top_k_pairs(normalized, self.get_similarity_top_k(), memory_limit)
+        else:
+            pairs = blocked_pairs(normalized, similarity_io_obj.filter_range, memory_limit)
+        report_df = report_frame(np.concatenate(uniq_ids), *pairs, similarity_io_obj.filter_range)
+        reported = set(report_df["UNIQ ID"]) | set(report_df["POTENTIAL MATCH"])
+        functions = pd.concat([chunk[chunk["Uniq ID"].isin(reported)] for chunk in self.__read_streamed__()],
+                              ignore_index=True).rename(columns={"Code": "Steps"})
+        functions["Potential Match"] = functions["Uniq ID"]
+        similarity_io_obj.data_frame = functions
+        similarity_io_obj.report(report_df)
+
+    def __orchestrate_streaming__(self):
+        """ Function which orchestrates the streaming mode, the functions are extracted and pattern checked file by
+        file, returns 1 when no functions are extracted """
+        if self.file_index is None:
+            self.file_index = self.walk_files()
+        print("Please wait while [Pattern matching tool] process your inputs")  # pragma: no mutate
+        count, vocabulary = self.__stream_analysis__()
+        if not count:
+            print("No functions are extracted. Data frame is empty. Recheck your input arguments")
+            return 1
+        print("[Pattern matching tool] have completed extracting the pattern check")  # pragma: no mutate
+        if self.get_run_similarity() and vocabulary:
+            print("Please wait while [Code Similarity Tool]"
+                  " process your inputs, This will take a while")  # pragma: no mutate
+            self.__streamed_similarity__(vocabulary)
+            print("\n[Code Similarity Tool] have completed Similarity analysis, "  # pragma: no mutate
+                  "reports @ %s" % self.report_path)  # pragma: no mutate
+        print("=================================")  # pragma: no mutate
+        return 0
+
+    def __file_scan__(self):
+        """ Function which checks whether the run is pattern only and scans the files for the patterns first """
+        return self.get_pattern_file_scan() and self.get_run_pattern_match() and not self.get_run_similarity() \
+            and not self.get_incremental() and not self.get_base_ref() and self.get_delta() is None
+
+    def __orchestrate_file_scan__(self):
+        """ Function which orchestrates the pattern only fast mode, the files are scanned for the patterns and only
+        the functions of the files with a hit are extracted and pattern checked """
+        if self.file_index is None:
+            self.file_index = self.walk_files()
+        print("Please wait while [Pattern matching tool] process your inputs")  # pragma: no mutate
+        patterns = self.__patterns__()
+        files = self.file_index["extraction"]
+        hits = scan_files_parallel(files, [pattern for pattern, _ in patterns],
+                                   self.get_extraction_workers()) if patterns else []
+        print("[Pattern matching tool] %s of %s files contain the patterns"  # pragma: no mutate
+              % (len(hits), len(files)))  # pragma: no mutate
+        functions = self.__extract__(hits) if hits else pd.DataFrame(columns=["Uniq ID", "Code"])
+        results = check_conditions([pattern for pattern, _ in patterns], functions,
+                                   [separator for _, separator in patterns])
+        for (pattern, _), (data, pivot) in zip(patterns, results):
+            data = data[data["Count of %s in function" % pattern] > 0].reset_index(drop=True)
+            self.__report_pattern__(pattern, data, pivot)
+        print("[Pattern matching tool] have completed extracting the pattern check")  # pragma: no mutate
+        print("=================================")  # pragma: no mutate
+        return 0
+
+    def orchestrate_similarity(self, json, file_index=None):
+        """ Function which orchestrate the similarity execution, returns 1 when no functions are extracted
+        file_index: optional file list of the shared file walk (BaseEagle.walk_files)"""
+        self.file_index = file_index
         self.populate_data(json)
         print("\n\n=================================")  # pragma: no mutate
         print("Please wait while input is processed")  # pragma: no mutate
         self.__set_report_path__()
+        if self.__file_scan__():
+            return self.__orchestrate_file_scan__()
+        if self.get_similarity_streaming() and not self.get_incremental() and not self.get_base_ref() \
+                and self.get_delta() is None:
+            return self.__orchestrate_streaming__()
+        status = 1
         if self.__code_extraction__():
+            status = 0
             print("Please wait while [Pattern matching tool] process your inputs")  # pragma: no mutate
             self.__code_pattern_analyzer__()
             print("[Pattern matching tool] have completed extracting the pattern check")  # pragma: no mutate
@@ -97,3 +527,6 @@ class SimilarityEagle(BaseEagle):
                 print("\n[Code Similarity Tool] have completed Similarity analysis, "  # pragma: no mutate
                       "reports @ %s" % self.report_path)  # pragma: no mutate
             print("=================================")  # pragma: no mutate
+        elif self.changed_ids is not None:
+            status = 0  # no changed functions is nothing to report, not an error
+        return status
@@ -0,0 +1,466 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved.
+Similarity engines which avoid the all pairs cosine similarity of SimilarityIO.process_cos_match """
+import re
+import zlib
+import hashlib
+import itertools
+from collections import Counter
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+# Prime of the universal hash functions of the MinHash permutations
+PRIME = (1 << 31) - 1
+NUM_PERM = 128
+SEED = 1
+# Probability of a pair at the lower bound of the similarity range to share a band of the signatures
+LSH_RECALL = 0.99
+# Candidate pairs whose exact cosine is computed at a time
+PAIR_CHUNK = 100000
+REPORT_COLUMNS = ["UNIQ ID", "POTENTIAL MATCH", "SIMILARITY"]
+# Lines of the copied regions of the winnowing engine, in the extracted body of the functions: the comments and
+# blank lines are removed by the extraction and 1 is the first line of the function, not the line in the file
+LINE_COLUMNS = ["UNIQ ID BODY LINES", "POTENTIAL MATCH BODY LINES"]
+TOKEN = re.compile(r"\w+|[^\w\s]")
+# Keywords and built in types of the extracted languages, kept by the normalization of the clone classes as they
+# are the structure of the code, the other words are names
+KEYWORDS = frozenset("""
+and as assert async await break case catch class const continue def default del do elif else enum except extends
+false final finally for foreach from func function go goto if implements import in instanceof interface is lambda
+let match new nonlocal not null or package pass private protected public raise return self static struct super
+switch this throw throws true try typeof unless until var void when where while with yield None True False
+bool boolean byte char double float int long short signed unsigned string str list dict set tuple object
+""".split())
+# Tokens per shingle and shingles per winnowing window, copies of at least 8 tokens are always found
+SHINGLE_TOKENS = 5
+WINNOW_WINDOW = 4
+# Fingerprints shared by more functions are boiler plate and are not matched
+MAX_POSTINGS = 100
+# Bytes per cell of a block of the similarity matrix: the dense scores, the sparse product and the masks
+BLOCK_CELL_BYTES = 32
+# Memory budget in MB of the similarity blocks when no similarity_memory_limit is given
+BLOCK_MEMORY_LIMIT = 256
+
+
+def word_count_matrix(steps):
+    """ Function which returns the word count vectors of the texts, tokenized like SimilarityIO """
+    return CountVectorizer().fit_transform(steps.astype(str).to_numpy()).tocsr()
+
+
+def first_minimum(values, counts):
+    """ Function which returns the position of the first minimum of the values of each row, the rows being the
+    consecutive runs of counts values """
+    owner = np.repeat(np.arange(len(counts)), counts)
+    hits = np.flatnonzero(values == np.repeat(np.minimum.reduceat(values, np.cumsum(counts) - counts), counts))
+    return hits[np.unique(owner[hits], return_index=True)[1]]
+
+
+def consistent_sample(state, log_weights, indices, vocabulary):
+    """ Function which draws one permutation of the consistent weighted sampling for the words of the rows
+    Returns: quantized weights and log hashes of the words """
+    rates, scales = state.gamma(2, 1, vocabulary)[indices], state.gamma(2, 1, vocabulary)[indices]
+    shifts = state.uniform(0, 1, vocabulary)[indices]
+    steps = np.floor(log_weights / rates + shifts)
+    return steps, np.log(scales) - rates * (steps - shifts + 1)
+
+
+def minhash_signatures(matrix, num_perm=NUM_PERM, seed=SEED):
+    """ Function which computes the weighted MinHash signatures of the squared normalized word counts of the rows,
+    by the consistent weighted sampling of Ioffe, two rows share a value with the probability of their weighted
+    Jaccard similarity
+    Returns: signatures (rows x num_perm), mask of the rows with at least one word """
+    weights = normalize(matrix).power(2).tocsr()
+    indices = weights.indices.astype(np.int64)
+    log_weights = np.log(weights.data)
+    counts = np.diff(weights.indptr)
+    non_empty = counts > 0
+    signatures = np.full((matrix.shape[0], num_perm), PRIME, dtype=np.int64)
+    if not non_empty.any():
+        return signatures, non_empty
+    state = np.random.RandomState(seed)
+    for perm in range(num_perm):
+        steps, log_hashes = consistent_sample(state, log_weights, indices, matrix.shape[1])
+        # the word of each row with the minimum hash, along with its quantized weight
+        chosen = first_minimum(log_hashes, counts[non_empty])
+        signatures[non_empty, perm] = indices[chosen] * PRIME + steps[chosen].astype(np.int64)
+    return signatures, non_empty
+
+
+def jaccard_lower_bound(cosine):
+    """ Function which returns the lowest weighted Jaccard similarity of the squared normalized counts of two
+    texts with this cosine similarity, from the bound of the total variation distance sqrt(1 - cosine ** 2) """
+    distance = np.sqrt(max(0.0, 1 - cosine ** 2))
+    return (1 - distance) / (1 + distance)
+
+
+def choose_rows_per_band(threshold, num_perm=NUM_PERM):
+    """ Function which chooses the rows per band, the most selective banding in which a pair of the Jaccard
+    threshold shares a band with the probability LSH_RECALL at least """
+    rows = 1
+    for candidate in [value for value in range(1, num_perm + 1) if num_perm % value == 0]:
+        if 1 - (1 - threshold ** candidate) ** (num_perm // candidate) >= LSH_RECALL:
+            rows = candidate
+    return rows
+
+
+def pairs_in_buckets(keys, rows, base):
+    """ Function which returns the pairs of rows sharing a bucket key, encoded as first * base + second """
+    order = np.argsort(keys, kind="mergesort")
+    bounds = np.flatnonzero(np.diff(keys[order])) + 1
+    pairs = []
+    for bucket in np.split(rows[order], bounds):
+        if len(bucket) > 1:
+            first, second = np.triu_indices(len(bucket), 1)
+            pairs.append(np.minimum(bucket[first], bucket[second]) * base + np.maximum(bucket[first], bucket[second]))
+    return pairs
+
+
+def lsh_candidates(signatures, non_empty, rows_per_band):
+    """ Function which bands the signatures and returns the candidate pairs sharing a band
+    Returns: first and second row index of the pairs, first < second """
+    rows = np.flatnonzero(non_empty).astype(np.int64)
+    base = np.int64(len(non_empty))
+    weights = np.random.RandomState(SEED).randint(1, PRIME, rows_per_band, dtype=np.int64)
+    pairs = [np.empty(0, dtype=np.int64)]
+    for start in range(0, signatures.shape[1] - rows_per_band + 1, rows_per_band):
+        # a collision of the band keys only adds a candidate, the exact cosine filters it out
+        keys = (signatures[rows, start:start + rows_per_band] * weights).sum(axis=1)
+        pairs.extend(pairs_in_buckets(keys, rows, base))
+    pairs = np.unique(np.concatenate(pairs))
+    return pairs // base, pairs % base
+
+
+def pair_cosine(matrix, first, second):
+    """ Function which computes the exact cosine similarity in percent of the pairs of rows """
+    normalized = normalize(matrix)
+    similarity = np.empty(len(first))
+    for start in range(0, len(first), PAIR_CHUNK):
+        chunk = slice(start, start + PAIR_CHUNK)
+        similarity[chunk] = np.asarray(normalized[first[chunk]].multiply(normalized[second[chunk]]).sum(axis=1)).ravel()
+    # rounding may put identical texts just above 100 percent
+    return np.clip(100 * similarity, 0, 100)
+
+
+def report_frame(uniq_ids, first, second, similarity, filter_range):
+    """ Function which returns the pairs within the similarity range in the layout of process_cos_match """
+    low, high = sorted(int(value) for value in str(filter_range).split(","))
+    keep = (low <= similarity) & (similarity <= high)
+    return pd.DataFrame({REPORT_COLUMNS[0]: uniq_ids[first[keep]], REPORT_COLUMNS[1]: uniq_ids[second[keep]],
+                         REPORT_COLUMNS[2]: similarity[keep]}, columns=REPORT_COLUMNS)
+
+
+def orient_changed(first, second, changed):
+    """ Function which keeps the pairs with a changed row, the changed row first """
+    keep = changed[first] | changed[second]
+    first, second = first[keep], second[keep]
+    swap = ~changed[first]
+    return np.where(swap, second, first), np.where(swap, first, second)
+
+
+def minhash_cos_match(data_frame, filter_range, changed=None):
+    """ Function which finds the similar pairs of the Steps with weighted MinHash / LSH candidates and exact cosine
+    of the candidates only, a pair within the range is a candidate with the probability LSH_RECALL at least
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: data frame with the UNIQ ID, POTENTIAL MATCH and SIMILARITY of the pairs within the range """
+    matrix = word_count_matrix(data_frame["Steps"])
+    cosine = min(int(value) for value in str(filter_range).split(",")) / 100.0
+    rows_per_band = choose_rows_per_band(jaccard_lower_bound(cosine))
+    signatures, non_empty = minhash_signatures(matrix)
+    first, second = lsh_candidates(signatures, non_empty, rows_per_band)
+    if changed is not None:
+        first, second = orient_changed(first, second, np.asarray(changed))
+    return report_frame(data_frame["Uniq ID"].to_numpy(), first, second, pair_cosine(matrix, first, second),
+                        filter_range)
+
+
+def rows_per_block(columns, memory_limit):
+    """ Function which returns the rows of the similarity matrix which fit in the memory budget of MB """
+    return max(1, int(float(memory_limit) * 1024 * 1024 // (max(1, columns) * BLOCK_CELL_BYTES)))
+
+
+def similarity_blocks(normalized, memory_limit, changed=None):
+    """ Function which yields the cosine similarity matrix of the normalized vectors in blocks of rows within the
+    memory budget, the rows of the changed functions only when given
+    Yields: row indexes of the block, similarity in percent of the rows to all the rows, mask of the cells to
+    report, leaving out the self matches and the second occurrence of each pair """
+    columns = np.arange(normalized.shape[0])
+    changed = np.ones(len(columns), dtype=bool) if changed is None else np.asarray(changed)
+    rows = np.flatnonzero(changed)
+    step = rows_per_block(len(columns), memory_limit)
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        similarity = 100 * (normalized[block] @ normalized.T).toarray()
+        yield block, similarity, (columns[None, :] > block[:, None]) | ~changed[None, :]
+
+
+def blocked_pairs(normalized, filter_range, memory_limit, changed=None):
+    """ Function which computes the cosine similarity of the normalized vectors block by block within the memory
+    budget and keeps only the pairs within the range of each block
+    Returns: first and second row index and similarity in percent of the pairs within the range """
+    low, high = sorted(int(value) for value in str(filter_range).split(","))
+    first, second, scores = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    for block, similarity, reported in similarity_blocks(normalized, memory_limit, changed):
+        row, column = np.nonzero(reported & (low <= similarity) & (similarity <= high))
+        first.append(block[row])
+        second.append(column)
+        scores.append(similarity[row, column])
+    return np.concatenate(first), np.concatenate(second), np.concatenate(scores)
+
+
+def blocked_cos_match(data_frame, filter_range, memory_limit, changed=None):
+    """ Function which computes the cosine similarity block by block within the memory budget, instead of the all
+    pairs matrix of process_cos_match, the scores equal those of process_cos_match
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: data frame with the UNIQ ID, POTENTIAL MATCH and SIMILARITY of the pairs within the range """
+    first, second, scores = blocked_pairs(normalize(word_count_matrix(data_frame["Steps"])), filter_range,
+                                          memory_limit, changed)
+    return report_frame(data_frame["Uniq ID"].to_numpy(), first, second, scores, filter_range)
+
+
+def top_k_cos_match(data_frame, filter_range, top_k, memory_limit=None, changed=None):
+    """ Function which finds the top_k most similar functions of each function block by block, the matrix of
+    all the pairs is never built
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: data frame with the UNIQ ID, POTENTIAL MATCH and SIMILARITY of the nearest functions within the range,
+    the most similar first per function """
+    first, second, scores = top_k_pairs(normalize(word_count_matrix(data_frame["Steps"])), top_k, memory_limit,
+                                        changed)
+    return report_frame(data_frame["Uniq ID"].to_numpy(), first, second, scores, filter_range)
+
+
+def top_k_pairs(normalized, top_k, memory_limit=None, changed=None):
+    """ Function which finds the top_k most similar rows of each row of the normalized vectors block by block
+    Returns: first and second row index and similarity in percent of the nearest rows, the most similar first """
+    first, second, scores = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    for block, similarity, _ in similarity_blocks(normalized, memory_limit or BLOCK_MEMORY_LIMIT, changed):
+        top = min(int(top_k), similarity.shape[1] - 1)
+        if top < 1:
+            break
+        similarity[np.arange(len(block)), block] = -1  # the function itself is not a neighbour
+        nearest = np.argpartition(-similarity, top - 1, axis=1)[:, :top]
+        nearest_scores = np.take_along_axis(similarity, nearest, axis=1)
+        order = np.lexsort((nearest, -nearest_scores), axis=1)
+        first.append(np.repeat(block, top))
+        second.append(np.take_along_axis(nearest, order, axis=1).ravel())
+        scores.append(np.take_along_axis(nearest_scores, order, axis=1).ravel())
+    return np.concatenate(first), np.concatenate(second), np.concatenate(scores)
+
+
+def swap_pairs(report_df):
+    """ Function which swaps the functions of the pairs of a report, along with their matched lines if any """
+    return report_df.rename(columns={REPORT_COLUMNS[0]: REPORT_COLUMNS[1], REPORT_COLUMNS[1]: REPORT_COLUMNS[0],
+                                     LINE_COLUMNS[0]: LINE_COLUMNS[1], LINE_COLUMNS[1]: LINE_COLUMNS[0]}
+                            )[list(report_df.columns)]
+
+
+def top_k_of_pairs(report_df, top_k, changed_ids=None):
+    """ Function which keeps the top_k most similar functions of each function of a report of the pairs, each pair
+    is reported once so both of its functions are considered
+    changed_ids: optional unique ids of the only functions to keep the neighbours of
+    Returns: data frame in the layout of the report, the most similar first per function """
+    pairs = pd.concat([report_df, swap_pairs(report_df)], ignore_index=True)
+    if changed_ids is not None:
+        pairs = pairs[pairs[REPORT_COLUMNS[0]].isin(changed_ids)]
+    pairs = pairs.sort_values([REPORT_COLUMNS[0], REPORT_COLUMNS[2]], ascending=[True, False], kind="mergesort")
+    return pairs.groupby(REPORT_COLUMNS[0], sort=False).head(int(top_k)).reset_index(drop=True)
+
+
+def pairs_of_changed(report_df, changed_ids):
+    """ Function which keeps the pairs of a report with a changed function, the changed function first """
+    changed_first = report_df[REPORT_COLUMNS[0]].isin(changed_ids)
+    changed_second = report_df[REPORT_COLUMNS[1]].isin(changed_ids) & ~changed_first
+    return pd.concat([report_df[changed_first], swap_pairs(report_df[changed_second])], ignore_index=True)
+
+
+def rightmost_minimum(window_hashes):
+    """ Function which returns the index of the rightmost minimal hash of the window """
+    return len(window_hashes) - 1 - window_hashes[::-1].index(min(window_hashes))
+
+
+def fingerprints(text, size=SHINGLE_TOKENS, window=WINNOW_WINDOW):
+    """ Function which selects the winnowing fingerprints of the token shingles of the text, the rightmost minimal
+    hash of each window of shingles
+    Returns: dictionary of the fingerprint hash to the (first line, last line) of its shingles """
+    tokens = [(token, number) for number, line in enumerate(str(text).splitlines(), 1)
+              for token in TOKEN.findall(line)]
+    hashes = [zlib.crc32("\x1f".join(token for token, _ in tokens[index:index + size]).encode("utf-8", "replace"))
+              for index in range(len(tokens) - size + 1)]
+    selected, last = dict(), -1
+    for start in range(max(1, len(hashes) - window + 1) if hashes else 0):
+        position = start + rightmost_minimum(hashes[start:start + window])
+        if position != last:
+            selected.setdefault(hashes[position], []).append((tokens[position][1], tokens[position + size - 1][1]))
+            last = position
+    return selected
+
+
+def line_ranges(spans):
+    """ Function which merges the line spans in to the text of the line ranges, like 3-7,12-15 """
+    ranges = []
+    for first, last in sorted(spans):
+        if ranges and first <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], last)
+        else:
+            ranges.append([first, last])
+    return ",".join(str(first) if first == last else "%s-%s" % (first, last) for first, last in ranges)
+
+
+def shared_fingerprints(prints, changed=None):
+    """ Function which counts the fingerprints shared by the pairs of functions through the postings of each
+    fingerprint, the fingerprints of more than MAX_POSTINGS functions are left out
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: counter of the (first row, second row) pairs """
+    postings = dict()
+    for row, selected in enumerate(prints):
+        for fingerprint in selected:
+            postings.setdefault(fingerprint, []).append(row)
+    shared = Counter()
+    for rows in postings.values():
+        if 1 < len(rows) <= MAX_POSTINGS:
+            shared.update(pair for pair in itertools.combinations(rows, 2)
+                          if changed is None or changed[pair[0]] or changed[pair[1]])
+    return shared
+
+
+def copied_lines(first_prints, second_prints):
+    """ Function which returns the line ranges of the fingerprints shared by the two functions, in the extracted
+    body of each function """
+    common = first_prints.keys() & second_prints.keys()
+    return [line_ranges(span for fingerprint in common for span in first_prints[fingerprint]),
+            line_ranges(span for fingerprint in common for span in second_prints[fingerprint])]
+
+
+def winnowing_match(data_frame, filter_range, changed=None):
+    """ Function which finds the copied regions between the functions by looking up their winnowing fingerprints,
+    the similarity is the percentage of the fingerprints the two functions share, only the pairs sharing at
+    least one fingerprint are reported
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: data frame with the UNIQ ID, POTENTIAL MATCH, SIMILARITY and the copied lines of the extracted body of
+    both functions """
+    low, high = sorted(int(value) for value in str(filter_range).split(","))
+    prints = [fingerprints(step) for step in data_frame["Steps"]]
+    changed = None if changed is None else np.asarray(changed)
+    uniq_ids, records = data_frame["Uniq ID"].to_numpy(), []
+    for (first, second), count in sorted(shared_fingerprints(prints, changed).items()):
+        similarity = 200.0 * count / (len(prints[first]) + len(prints[second]))
+        if low <= similarity <= high:
+            if changed is not None and not changed[first]:
+                first, second = second, first
+            records.append([uniq_ids[first], uniq_ids[second], similarity]
+                           + copied_lines(prints[first], prints[second]))
+    return pd.DataFrame(records, columns=REPORT_COLUMNS + LINE_COLUMNS)
+
+
+def normalized_body(text):
+    """ Function which normalizes the code of a function, the white space is dropped and the names are renamed in
+    the order of their first use, so that copies with other names or layout are equal, the keywords are kept """
+    names = dict()
+    return " ".join(names.setdefault(token, "v%s" % len(names))
+                    if (token[0].isalpha() or token[0] == "_") and token not in KEYWORDS else token
+                    for token in TOKEN.findall(str(text)))
+
+
+def clone_classes(data_frame, preferred=None):
+    """ Function which groups the functions with equal normalized code in to clone classes
+    preferred: optional mask of the functions to be taken as representative first
+    Returns: mask of the representative of each class, data frame with the REPRESENTATIVE, UNIQ ID and MEMBERS of
+    the functions of the classes with more than one member """
+    keys = [hashlib.sha1(normalized_body(step).encode("utf-8", "replace")).hexdigest() for step in data_frame["Steps"]]
+    priority = np.zeros(len(keys)) if preferred is None else ~np.asarray(preferred)
+    first_of_key = dict()
+    for row in np.lexsort((np.arange(len(keys)), priority)):
+        first_of_key.setdefault(keys[row], row)
+    representatives = np.array([first_of_key[key] for key in keys], dtype=np.int64)
+    members = np.bincount(representatives, minlength=len(keys))[representatives]
+    uniq_ids = data_frame["Uniq ID"].to_numpy()
+    classes = pd.DataFrame({"REPRESENTATIVE": uniq_ids[representatives], "UNIQ ID": uniq_ids, "MEMBERS": members},
+                           columns=["REPRESENTATIVE", "UNIQ ID", "MEMBERS"])
+    classes = classes[members > 1].sort_values("REPRESENTATIVE", kind="mergesort").reset_index(drop=True)
+    return representatives == np.arange(len(keys)), classes
+
+
+def length_profile(matrix):
+    """ Function which returns the bounds of the cosine similarity of the word count vectors by their number of
+    distinct words: a function b shares at most distinct(a) words with a, so cos(a, b) is at most the square root
+    of the share of the squared norm of b in its distinct(a) largest counts
+    Returns: number of distinct words of each row, cumulative share of the squared norm of the counts of the rows
+    sorted largest first, concatenated like the rows of the csr matrix """
+    distinct = np.diff(matrix.indptr)
+    owner = np.repeat(np.arange(matrix.shape[0]), distinct)
+    squares = matrix.data.astype(float)[np.lexsort((-matrix.data, owner))] ** 2
+    totals = np.concatenate([[0.0], np.cumsum(squares)])
+    starts, ends = np.repeat(totals[matrix.indptr[:-1]], distinct), np.repeat(totals[matrix.indptr[1:]], distinct)
+    return distinct, (totals[1:] - starts) / (ends - starts)
+
+
+def shared_words_bound(profile, rows, words):
+    """ Function which returns the bound of the cosine similarity of the rows with any function of at most words
+    distinct words, zero for the rows without words """
+    distinct, shares = profile
+    starts = np.cumsum(distinct) - distinct
+    bound = np.zeros(len(rows))
+    has_words = distinct[rows] > 0
+    bound[has_words] = np.sqrt(shares[starts[rows[has_words]] + np.minimum(distinct[rows[has_words]], words) - 1])
+    return bound
+
+
+def length_buckets(distinct, buckets):
+    """ Function which splits the rows in to buckets of about equal count by their number of distinct words
+    Returns: list of the row indexes of each bucket, fewest words first """
+    order = np.argsort(distinct, kind="mergesort")
+    return [bucket for bucket in np.array_split(order, max(1, min(int(buckets), len(order)))) if len(bucket)]
+
+
+def bucket_pair_blocks(normalized, rows, columns, changed, bounds, memory_limit=None, same=False):
+    """ Generator which computes the cosine similarity of the rows of one bucket with the columns of an other,
+    block by block, each pair once and of a changed function, like the row major upper triangle of
+    process_cos_match
+    same: the columns are of the bucket of the rows, a subset of the rows
+    Returns: first rows, second rows and scores of the pairs within the bounds and number of pairs computed, per
+    block """
+    step = rows_per_block(len(columns), memory_limit or BLOCK_MEMORY_LIMIT)
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        similarity = 100 * (normalized[block] @ normalized[columns].T).toarray()
+        pairs = (changed[block][:, None] | changed[columns][None, :]) & (block[:, None] != columns[None, :])
+        if same:
+            pairs &= block[:, None] < columns[None, :]
+        row, column = np.nonzero(pairs & (bounds[0] <= similarity) & (similarity <= bounds[1]))
+        yield (np.minimum(block[row], columns[column]), np.maximum(block[row], columns[column]),
+               similarity[row, column], int(pairs.sum()))
+
+
+def bucket_blocks(normalized, profile, buckets, changed, bounds, memory_limit=None):
+    """ Generator which computes the cosine similarity of the rows of each bucket with the functions of the same
+    or a bucket of more words whose bound with the most words of the bucket can reach the lower bound of the range
+    profile: distinct words and shares of the rows, from length_profile
+    Returns: blocks of bucket_pair_blocks """
+    groups = length_buckets(profile[0], buckets)
+    for index, rows in enumerate(groups):
+        for offset, columns in enumerate(groups[index:]):
+            columns = columns[100 * shared_words_bound(profile, columns, profile[0][rows].max()) >= bounds[0] - 1e-9]
+            if len(columns):
+                yield from bucket_pair_blocks(normalized, rows, columns, changed, bounds, memory_limit, offset == 0)
+
+
+def bucketed_cos_match(data_frame, filter_range, buckets, memory_limit=None, changed=None):
+    """ Function which buckets the functions by their effective length and computes the cosine similarity only of
+    the buckets whose length bound can reach the lower bound of the range, the scores equal those of
+    process_cos_match
+    changed: optional mask of the rows to be matched against all the rows
+    Returns: data frame with the UNIQ ID, POTENTIAL MATCH and SIMILARITY of the pairs within the range, number of
+    pairs computed and number of pairs to compare """
+    bounds = sorted(int(value) for value in str(filter_range).split(","))
+    matrix = word_count_matrix(data_frame["Steps"])
+    changed = np.ones(matrix.shape[0], dtype=bool) if changed is None else np.asarray(changed)
+    blocks = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), 0)]
+    blocks.extend(bucket_blocks(normalize(matrix), length_profile(matrix), buckets, changed, bounds, memory_limit))
+    first, second, scores = (np.concatenate([block[part] for block in blocks]) for part in range(3))
+    computed = sum(block[3] for block in blocks)
+    order = np.lexsort((second, first))
+    first, second, scores = first[order], second[order], scores[order]
+    if not changed.all():
+        first, second = orient_changed(first, second, changed)
+    total = int(changed.sum()) * (len(changed) - 1) - int(changed.sum()) * (int(changed.sum()) - 1) // 2
+    return report_frame(data_frame["Uniq ID"].to_numpy(), first, second, scores, filter_range), computed, total
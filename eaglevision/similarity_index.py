@@ -0,0 +1,97 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import hashlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from eaglevision.similarity_engines import REPORT_COLUMNS, BLOCK_MEMORY_LIMIT, blocked_pairs
+
+INDEX_FILE = "similarity_index.npz"
+# Hashed word features, large enough to keep the collisions of the words of a code base rare
+N_FEATURES = 1 << 20
+# Separator of the unique id and its occurrence number in the keys of the index, split from the right
+KEY_SEPARATOR = "#"
+
+
+def function_keys(uniq_ids):
+    """ Function which returns a key per function, the unique id numbered by occurrence as the ids may repeat """
+    uniq_ids = pd.Series(uniq_ids).astype(str).reset_index(drop=True)
+    return (uniq_ids + KEY_SEPARATOR + uniq_ids.groupby(uniq_ids).cumcount().astype(str)).to_numpy(dtype=str)
+
+
+class SimilarityIndex:
+    """ Class which holds the hashed word count vectors of the functions and their similar pairs on disk, so that
+    the next run vectorizes and compares only the new and changed functions """
+
+    def __init__(self, index_path, settings):
+        """ Constructor for the class
+        settings: similarity settings of the pairs, the index is rebuilt when they change """
+        self.index_path = str(index_path)
+        self.settings = str(settings)
+        self.keys = np.empty(0, dtype=str)
+        self.hashes = np.empty(0, dtype=str)
+        self.vectors = sparse.csr_matrix((0, N_FEATURES))
+        self.pairs = np.empty(0, dtype=str), np.empty(0, dtype=str), np.empty(0)
+        self.vectorizer = HashingVectorizer(n_features=N_FEATURES, alternate_sign=False)
+        self.__load()
+
+    def __load(self):
+        """ Function which loads the index saved with the same settings """
+        if not os.path.isfile(self.index_path):
+            return
+        with np.load(self.index_path) as data:
+            if str(data["settings"]) != self.settings:
+                return
+            self.keys, self.hashes = data["keys"], data["hashes"]
+            self.vectors = sparse.csr_matrix((data["data"], data["indices"], data["indptr"]),
+                                             shape=(len(self.keys), N_FEATURES))
+            self.pairs = data["first"], data["second"], data["scores"]
+
+    def save(self):
+        """ Function which saves the index """
+        Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "wb") as file_out:
+            np.savez_compressed(file_out, settings=self.settings, keys=self.keys, hashes=self.hashes,
+                                data=self.vectors.data, indices=self.vectors.indices, indptr=self.vectors.indptr,
+                                first=self.pairs[0], second=self.pairs[1], scores=self.pairs[2])
+
+    def update(self, uniq_ids, steps):
+        """ Function which inserts the new and changed functions and deletes the removed ones, the vectors of the
+        unchanged functions are reused
+        Returns: mask of the new and changed functions, in the order of the functions """
+        keys = function_keys(uniq_ids)
+        hashes = np.array([hashlib.sha1(str(step).encode("utf-8", "replace")).hexdigest() for step in steps],
+                          dtype=str)
+        known = dict(zip(self.keys, range(len(self.keys))))
+        rows = np.array([known.get(key, -1) for key in keys], dtype=np.int64)
+        changed = rows < 0
+        changed[~changed] = self.hashes[rows[~changed]] != hashes[~changed]
+        vectors = [self.vectors[rows[~changed]]]
+        if changed.any():
+            vectors.append(self.vectorizer.transform(pd.Series(steps).astype(str)[changed]))
+        vectors = sparse.vstack(vectors).tocsr()
+        # rows of the stacked vectors in the order of the functions
+        order = np.empty(len(keys), dtype=np.int64)
+        order[np.flatnonzero(~changed)] = np.arange((~changed).sum())
+        order[np.flatnonzero(changed)] = np.arange((~changed).sum(), len(keys))
+        self.vectors = vectors[order]
+        first, second, scores = self.pairs
+        kept = np.isin(first, keys[~changed]) & np.isin(second, keys[~changed])
+        self.pairs = first[kept], second[kept], scores[kept]
+        self.keys, self.hashes = keys, hashes
+        return changed
+
+    def query(self, changed, filter_range, memory_limit=None):
+        """ Function which compares the changed functions against all the functions and stores the pairs within
+        the range along with the pairs of the unchanged functions
+        Returns: data frame with the UNIQ ID, POTENTIAL MATCH and SIMILARITY of all the pairs within the range """
+        first, second, scores = blocked_pairs(self.vectors, filter_range, memory_limit or BLOCK_MEMORY_LIMIT,
+                                              changed)
+        self.pairs = (np.concatenate([self.pairs[0], self.keys[first]]),
+                      np.concatenate([self.pairs[1], self.keys[second]]),
+                      np.concatenate([self.pairs[2], scores]))
+        return pd.DataFrame({REPORT_COLUMNS[0]: [key.rsplit(KEY_SEPARATOR, 1)[0] for key in self.pairs[0]],
+                             REPORT_COLUMNS[1]: [key.rsplit(KEY_SEPARATOR, 1)[0] for key in self.pairs[1]],
+                             REPORT_COLUMNS[2]: self.pairs[2]}, columns=REPORT_COLUMNS)
@@ -2,11 +2,14 @@
 
 import os
 import json
+import tempfile
 from pathlib import Path
 import unittest
 from unittest.mock import mock_open, Mock, patch
 from test.test_support import TestResource
-from eaglevision.base_eagle import BaseEagle
+import pandas as pd
+import lizard
+from eaglevision.base_eagle import BaseEagle, line_breaks
 
 
 class EagleBaseTestCase(unittest.TestCase):
@@ -56,6 +59,30 @@ class EagleBaseTestCase(unittest.TestCase):
         self.assertEqual(baseobj._cyclo_args, None)
         self.assertEqual(baseobj._similarity_range, None)
         self.assertEqual(baseobj._report_folder, None)
+        self.assertEqual(baseobj._run_concurrent, None)
+        self.assertEqual(baseobj._concurrent_workers, None)
+        self.assertEqual(baseobj._shared_file_walk, None)
+        self.assertEqual(baseobj._incremental, None)
+        self.assertEqual(baseobj._base_ref, None)
+        self.assertEqual(baseobj._head_ref, None)
+        self.assertEqual(baseobj._cache_path, None)
+        self.assertEqual(baseobj._cache_max_age, None)
+        self.assertEqual(baseobj._cache_max_size, None)
+        self.assertEqual(baseobj._cyclo_in_process, None)
+        self.assertEqual(baseobj._cyclo_workers, None)
+        self.assertEqual(baseobj._cyclo_top_k, None)
+        self.assertEqual(baseobj._cloc_native, None)
+        self.assertEqual(baseobj._cloc_workers, None)
+        self.assertEqual(baseobj._similarity_engine, None)
+        self.assertEqual(baseobj._similarity_memory_limit, None)
+        self.assertEqual(baseobj._similarity_top_k, None)
+        self.assertEqual(baseobj._similarity_index, None)
+        self.assertEqual(baseobj._similarity_dedup, None)
+        self.assertEqual(baseobj._similarity_length_buckets, None)
+        self.assertEqual(baseobj._similarity_streaming, None)
+        self.assertEqual(baseobj._extraction_workers, None)
+        self.assertEqual(baseobj._extraction_native, None)
+        self.assertEqual(baseobj._pattern_file_scan, None)
 
     def test_set_get_class_var(self):
         """ Function to test the base class with a set init values """
@@ -101,6 +128,49 @@ class EagleBaseTestCase(unittest.TestCase):
         self.assertEqual(baseobj.get_run_cloc_metric(), "")
         self.assertEqual(baseobj.get_run_cyclomatic_complexity(), "")
 
+    def test_optional_getters(self):
+        """ Function to test the getters of the optional inputs with their defaults and set values """
+        baseobj = BaseEagle()
+        self.assertEqual(baseobj.get_run_concurrent(), False)
+        baseobj._run_concurrent = True
+        self.assertEqual(baseobj.get_run_concurrent(), True)
+        baseobj._concurrent_workers = 2
+        self.assertEqual(baseobj.get_concurrent_workers(), 2)
+        self.assertEqual(baseobj.get_shared_file_walk(), False)
+        baseobj._shared_file_walk = True
+        self.assertEqual(baseobj.get_shared_file_walk(), True)
+        self.assertEqual(baseobj.get_incremental(), False)
+        baseobj._incremental = True
+        self.assertEqual(baseobj.get_incremental(), True)
+        self.assertEqual(baseobj.get_base_ref(), None)
+        self.assertEqual(baseobj.get_head_ref(), None)
+        self.assertEqual(baseobj.needs_file_walk(), True)
+        baseobj._incremental, baseobj._shared_file_walk = False, False
+        self.assertEqual(baseobj.needs_file_walk(), False)
+        baseobj._base_ref = "main"
+        self.assertEqual(baseobj.needs_file_walk(), True)
+        self.assertEqual(baseobj.get_cache_path(), None)
+        self.assertEqual(baseobj.get_cache_max_age(), None)
+        self.assertEqual(baseobj.get_cache_max_size(), None)
+        self.assertEqual(baseobj.get_cyclo_in_process(), False)
+        self.assertEqual(baseobj.get_cyclo_workers(), None)
+        self.assertEqual(baseobj.get_cyclo_top_k(), None)
+        self.assertEqual(baseobj.get_cloc_native(), False)
+        self.assertEqual(baseobj.get_cloc_workers(), None)
+        self.assertEqual(baseobj.get_similarity_engine(), None)
+        self.assertEqual(baseobj.get_similarity_memory_limit(), None)
+        self.assertEqual(baseobj.get_similarity_top_k(), None)
+        self.assertEqual(baseobj.get_similarity_index(), False)
+        self.assertEqual(baseobj.get_similarity_dedup(), False)
+        self.assertEqual(baseobj.get_similarity_length_buckets(), None)
+        self.assertEqual(baseobj.get_similarity_streaming(), False)
+        self.assertEqual(baseobj.get_extraction_workers(), None)
+        self.assertEqual(baseobj.get_extraction_native(), False)
+        self.assertEqual(baseobj.get_pattern_file_scan(), False)
+        self.assertEqual(baseobj.tracks_file_hashes(), False)
+        baseobj._cache_path = "cache.db"
+        self.assertEqual(baseobj.tracks_file_hashes(), True)
+
     @staticmethod
     def test_validate_wrong_json_path__():
         """ Function to validate a wrong json path """
@@ -157,6 +227,8 @@ class EagleBaseTestCase(unittest.TestCase):
         self.assertEqual(baseobj._similarity_range, "70,100")
         self.assertEqual(os.path.normpath(baseobj._report_folder),
                          os.path.normpath(os.path.join(Path(__file__).parent.parent)))
+        self.assertEqual(baseobj._run_concurrent, False)
+        self.assertEqual(baseobj._concurrent_workers, None)
 
     def test_specific_string_getters(self):
         """ Function to validate few json items when the input json is null """
@@ -173,6 +245,119 @@ class EagleBaseTestCase(unittest.TestCase):
         self.assertEqual(baseobj.get_run_cloc_metric(), "")
         self.assertEqual(baseobj.get_run_cyclomatic_complexity(), "")
 
+    def test_walk_files(self):
+        """ Function to validate the shared file walk applies the excludes of every analyzer """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.java", "c.cpp", "readme.md", os.path.join("src", "d.py"),
+                         os.path.join(".git", "e.py")]:
+                Path(repo, name).parent.mkdir(parents=True, exist_ok=True)
+                Path(repo, name).write_text("def %s():\n    pass\n" % name[0])
+            baseobj = BaseEagle()
+            baseobj.populate_data({**TestResource.input_json, "path": repo, "cyclo_exclude": ["*b.java", None],
+                                   "cloc_args": "--exclude-dir=src --exclude-ext=*.cpp,*.java --quiet",
+                                   "shared_file_walk": True})
+            file_index = baseobj.walk_files()
+            self.assertEqual(sorted(file_index["cloc"]), [os.path.join(repo, "a.py"), os.path.join(repo, "readme.md")])
+            self.assertEqual(file_index["cloc_args"], "--quiet")
+            self.assertEqual(sorted(file_index["cyclo"]), [os.path.join(repo, "a.py"),
+                                                           os.path.join(repo, "src", "d.py")])
+            self.assertEqual(sorted(file_index["extraction"]), [os.path.join(repo, "a.py"), os.path.join(repo, "b.java"),
+                                                                os.path.join(repo, "src", "d.py")])
+
+    def test_walk_cyclo_files_like_lizard(self):
+        """ Function to validate the cyclo files are the files lizard reads itself, the excludes of the cyclo args
+        applied and the duplicates left out like lizard """
+        with tempfile.TemporaryDirectory() as repo:
+            for name, index in [("a.py", 1), ("b.py", 2), (os.path.join("src", "a.py"), 1), ("z.py", 1),
+                                (os.path.join("src", "deep", "a.py"), 1), (os.path.join("tests", "t.py"), 3),
+                                (os.path.join("src", "c.py"), 2), (os.path.join("src", "d.py"), 4)]:
+                Path(repo, name).parent.mkdir(parents=True, exist_ok=True)
+                Path(repo, name).write_text("def first():\n    return %s\n" % index)
+            baseobj = BaseEagle()
+            baseobj.populate_data({**TestResource.input_json, "path": repo, "cyclo_exclude": [None],
+                                   "cyclo_args": '-l python -x "*/tests/*" --exclude=*/d.py',
+                                   "shared_file_walk": True})
+            expected = sorted(lizard.get_all_source_files([repo], ["*/tests/*", "*/d.py"], ["python"]))
+            self.assertEqual(sorted(baseobj.walk_files()["cyclo"]), expected)
+            self.assertEqual(len(expected), 2)
+
+    def test_manifest(self):
+        """ Function to validate the content hash manifest of the incremental mode """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("print(1)")
+            Path(repo, "b.py").write_text("print(2)")
+            baseobj = BaseEagle()
+            baseobj.populate_data({**TestResource.input_json, "path": repo, "incremental": True})
+            hashes = baseobj.walk_files()["hashes"]
+            self.assertEqual(sorted(hashes), [os.path.join(repo, "a.py"), os.path.join(repo, "b.py")])
+            self.assertEqual(hashes[os.path.join(repo, "a.py")], baseobj.hash_file(os.path.join(repo, "a.py")))
+            Path(repo, "c.py").write_bytes(b"print(1)\xff")
+            hash_c = baseobj.hash_file(os.path.join(repo, "c.py"))
+            Path(repo, "c.py").write_bytes(b"print(1)\xfe")
+            self.assertNotEqual(baseobj.hash_file(os.path.join(repo, "c.py")), hash_c)
+            os.remove(os.path.join(repo, "c.py"))
+            os.makedirs(os.path.join(repo, "EagleVisionReport"))
+            manifest_path = os.path.join(repo, "EagleVisionReport", "manifest.json")
+            self.assertEqual(baseobj.load_manifest(manifest_path, "settings"), dict())
+            baseobj.save_manifest(manifest_path, "settings", hashes)
+            self.assertEqual(baseobj.load_manifest(manifest_path, "settings"), hashes)
+            self.assertEqual(baseobj.load_manifest(manifest_path, "other settings"), dict())
+            Path(repo, "b.py").write_text("print(3)")
+            Path(repo, "c.py").write_text("print(4)")
+            new_hashes = baseobj.walk_files()["hashes"]
+            changed, unchanged = baseobj.split_changed_files(sorted(new_hashes), new_hashes, hashes)
+            self.assertEqual(changed, [os.path.join(repo, "b.py"), os.path.join(repo, "c.py")])
+            self.assertEqual(unchanged, {os.path.join(repo, "a.py")})
+
+    def test_walk_changed_files(self):
+        """ Function to validate the file lists are scoped to the files changed between base_ref and head_ref """
+        with tempfile.TemporaryDirectory() as repo:
+            TestResource.commit_files(repo, {"a.py": "print(1)", "b.py": "print(2)", "c.py": "print(3)"})
+            TestResource.commit_files(repo, {"b.py": "print(4)", "d.py": "print(5)", "caf\u00e9 x.py": "print(7)"},
+                                      removed=["c.py"])
+            Path(repo, "a.py").write_text("print(6)")
+            baseobj = BaseEagle()
+            baseobj.populate_data({**TestResource.input_json, "path": repo, "cyclo_exclude": [None],
+                                   "base_ref": "HEAD~1", "head_ref": "HEAD"})
+            file_index = baseobj.walk_files()
+            expected = [os.path.join(repo, name) for name in ["b.py", "caf\u00e9 x.py", "d.py"]]
+            self.assertEqual(sorted(file_index["cloc"]), expected)
+            self.assertEqual(sorted(file_index["cyclo"]), expected)
+            self.assertEqual(sorted(file_index["changed"]), expected)
+            self.assertEqual(len(file_index["extraction"]), 4)
+            baseobj._head_ref = None
+            self.assertEqual(sorted(baseobj.walk_files()["changed"]), [os.path.join(repo, "a.py")] + expected)
+            baseobj._base_ref = "unknown_revision"
+            with self.assertRaises(SystemExit):
+                baseobj.walk_files()
+
+    def test_cache_key(self):
+        """ Function to validate the cache key holds the extension, or the file name when asked """
+        self.assertEqual(BaseEagle.cache_key(os.path.join("src", "a.py"), "hash"), "hash|.py")
+        self.assertEqual(BaseEagle.cache_key(os.path.join("src", "Makefile"), "hash"), "hash|Makefile")
+        self.assertEqual(BaseEagle.cache_key(os.path.join("src", "a.py"), "hash", True), "hash|a.py")
+
+    def test_report_html_chunks(self):
+        """ Function to validate the html report written in chunks of rows is the one written at once """
+        dataframe = pd.DataFrame({"File": ["a.py", "b.py", "c.py", "d.py", "e.py"],
+                                  "Code": ["x", r"y\nz", "<p>", "", "w"], "NLOC": [1, 2, 3, 4, 5],
+                                  "CCN": [3.0, 3.0, 2.25, float("nan"), 1e-7]})
+        reports = []
+        with tempfile.TemporaryDirectory() as report:
+            for chunk in [2, 5, 100]:
+                with patch("eaglevision.base_eagle.HTML_CHUNK", chunk):
+                    BaseEagle.report_html(os.path.join(report, "report.html"), dataframe, "Report")
+                reports.append(Path(report, "report.html").read_text(encoding="utf-8"))
+            BaseEagle.report_html(os.path.join(report, "empty.html"), dataframe[:0], "Report")
+            self.assertTrue(pd.read_html(os.path.join(report, "empty.html"))[0].empty)
+            self.assertTrue(os.path.isfile(os.path.join(report, "report_style.css")))
+        self.assertEqual(reports[0], reports[2])
+        self.assertEqual(reports[1], reports[2])
+        self.assertEqual(reports[0].count("<table"), 1)
+        self.assertIn(line_breaks(dataframe.to_html(classes='mystyle')), reports[0])
+        self.assertIn("y<br>z", reports[0])
+        self.assertIn("&lt;p&gt;", reports[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import time
+import tempfile
+import unittest
+from eaglevision.cache_eagle import CacheEagle
+
+
+class CacheEagleTestCase(unittest.TestCase):
+    """ Class to test the cache_eagle.py"""
+
+    def setUp(self):
+        """ Function used to create the temporary folder of the cache """
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.folder.name, "cache", "eaglevision.db")
+
+    def tearDown(self):
+        """ Deletes the cache """
+        self.folder.cleanup()
+
+    def test_put_and_get_rows(self):
+        """ Function to test the rows are found by content hash and settings, with the path of the file asked """
+        with CacheEagle(self.cache_path) as cache:
+            cache.put_rows("cyclo", "-l python", "/old/a.py", "hash_a", [[3, 1, "func@1-3@/old/a.py", "/old/a.py"]])
+            cache.put_rows("cyclo", "-l python", "/old/b.py", "hash_b", [])
+        with CacheEagle(self.cache_path) as cache:
+            found = cache.get_rows("cyclo", "-l python", {"/new/a.py": "hash_a", "/copy/a.py": "hash_a",
+                                                          "/new/b.py": "hash_b", "/new/c.py": "hash_c"})
+            self.assertEqual(found, {"/new/a.py": [[3, 1, "func@1-3@/new/a.py", "/new/a.py"]],
+                                     "/copy/a.py": [[3, 1, "func@1-3@/copy/a.py", "/copy/a.py"]],
+                                     "/new/b.py": []})
+            self.assertEqual(cache.get_rows("cyclo", "-l java", {"/new/a.py": "hash_a"}), dict())
+            self.assertEqual(cache.get_rows("cloc", "-l python", {"/new/a.py": "hash_a"}), dict())
+
+    def test_evict_by_age(self):
+        """ Function to test the entries not used for max_age days are evicted """
+        with CacheEagle(self.cache_path, max_age=1) as cache:
+            cache.put_rows("cloc", "", "a.py", "hash_a", [["Python", "a.py", 0, 0, 1]])
+            cache.put_rows("cloc", "", "b.py", "hash_b", [["Python", "b.py", 0, 0, 1]])
+            cache.connection.execute("UPDATE results SET last_used = ? WHERE hash = 'hash_a'",
+                                     (time.time() - 2 * 24 * 3600,))
+            cache.evict()
+            self.assertEqual(list(cache.get_rows("cloc", "", {"a.py": "hash_a", "b.py": "hash_b"})), ["b.py"])
+
+    def test_evict_by_size(self):
+        """ Function to test the least recently used entries are evicted above max_size """
+        with CacheEagle(self.cache_path, max_size=1) as cache:
+            for index in range(3):
+                cache.put_rows("extraction", "", "a.py", "hash_%s" % index, [["a.py", "id", "x" * 400 * 1024]])
+                cache.connection.execute("UPDATE results SET last_used = ? WHERE hash = ?",
+                                         (index, "hash_%s" % index))
+            cache.evict()
+            found = cache.get_rows("extraction", "", {"a.py": "hash_0", "b.py": "hash_1", "c.py": "hash_2"})
+        self.assertEqual(sorted(found), ["b.py", "c.py"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 import os
 import sys
+import tempfile
 import unittest
 from unittest import mock
 from io import StringIO
@@ -119,6 +120,21 @@ class ClocEagleTestCase(unittest.TestCase):
                                                                          "cloc.csv")))
         self.assertTrue(mock_subproc_call.called)
 
+    @mock.patch('subprocess.call', autospec=True)
+    def test_cmd_with_file_index(self, mock_subproc_call):
+        """ Function to test the command when the files are listed by the shared file walk """
+        mock_subproc_call.return_value = False
+        cloceagleobj = ClocEagle()
+        self.dummy_dataf()
+        file_index = {"cloc": ["a.py", "b.py"], "cloc_args": "--quiet"}
+        cloceagleobj.orchestrate_cloc(TestResource.input_json, file_index)
+        list_file = os.path.join(TestResource.report, "cloc_report", "cloc-files.txt")
+        self.assertEqual(cloceagleobj.cmd.replace("/", os.sep), 'cloc --list-file="%s" --csv --out="%s" --quiet' %
+                         (list_file, os.path.join(TestResource.report, "cloc_report", "cloc.csv")))
+        with open(list_file) as list_in:
+            self.assertEqual(list_in.read().splitlines(), ["a.py", "b.py"])
+        os.remove(list_file)
+
     @mock.patch('subprocess.call', autospec=True)
     def test_fail(self, mock_subproc_call):
         """ Function to test when the subprocess call fails"""
@@ -132,6 +148,129 @@ class ClocEagleTestCase(unittest.TestCase):
         self.assertEqual(matches[0], 'There was error while processing the sub process command')
         self.assertEqual(False, os.path.isfile(os.path.join(TestResource.report, "cloc_report", "cloc-report.html")))
 
+    @staticmethod
+    def fake_cloc(cmd_file):
+        """ Function which mimics cloc --by-file on the listed files, every line is counted as code """
+        with open(cmd_file) as cmd_in:
+            cmd = cmd_in.read()
+        with open(cmd.split('--list-file="')[1].split('"')[0]) as list_in:
+            file_names = list_in.read().splitlines()
+        with open(cmd.split('--out="')[1].split('"')[0], "w") as csv_out:
+            csv_out.write('language,filename,blank,comment,code,"github.com/AlDanial/cloc v 1.86"\n')
+            for file_name in file_names:
+                csv_out.write("Python,%s,0,0,%s\n" % (file_name, len(Path(file_name).read_text().splitlines())))
+            csv_out.write("SUM,,0,0,0\n")
+        return 0
+
+    def test_incremental(self):
+        """ Function to test only the changed files are counted and the counts of the unchanged files are reused """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("print(1)\nprint(2)\n")
+            Path(repo, "b.py").write_text("print(1)\n")
+            data = {**TestResource.input_json, "path": repo, "incremental": True, "cloc_args": None}
+            report = os.path.join(repo, "EagleVisionReport", "cloc_report")
+            with mock.patch('subprocess.call', side_effect=self.fake_cloc) as mock_subproc_call:
+                ClocEagle().orchestrate_cloc(data)
+                Path(repo, "b.py").write_text("print(1)\nprint(2)\nprint(3)\n")
+                cloceagleobj = ClocEagle()
+                cloceagleobj.orchestrate_cloc(data)
+                self.assertEqual(cloceagleobj.analysis_files, [os.path.join(repo, "b.py")])
+                self.assertIn("--by-file", cloceagleobj.cmd)
+                self.assertEqual(mock_subproc_call.call_count, 2)
+            dataframe = pd.read_csv(os.path.join(report, "cloc.csv"))
+            self.assertEqual(dataframe.iloc[:, :5].values.tolist(), [[2, "Python", 0, 0, 5], [2, "SUM", 0, 0, 5]])
+            self.assertTrue(os.path.isfile(os.path.join(report, "cloc-report.html")))
+
+    def test_base_ref_with_out_changes(self):
+        """ Function to test cloc is not run and an empty report replaces the previous one when no file changed
+        since the base_ref """
+        with tempfile.TemporaryDirectory() as repo:
+            TestResource.commit_files(repo, {"a.py": "print(1)\n"})
+            data = {**TestResource.input_json, "path": repo, "base_ref": "HEAD", "cloc_args": None}
+            report = os.path.join(repo, "EagleVisionReport", "cloc_report")
+            Path(report).mkdir(parents=True)
+            Path(report, "cloc.csv").write_text("files,language,blank,comment,code,cloc\n1,Python,0,0,1,\n")
+            with mock.patch('subprocess.call') as mock_subproc_call:
+                self.assertEqual(ClocEagle().orchestrate_cloc(data), 0)
+            self.assertFalse(mock_subproc_call.called)
+            dataframe = pd.read_csv(os.path.join(report, "cloc.csv"))
+            self.assertEqual(dataframe.iloc[:, :5].values.tolist(), [[0, "SUM", 0, 0, 0]])
+            self.assertTrue(os.path.isfile(os.path.join(report, "cloc-report.html")))
+
+    def test_aggregate_by_language(self):
+        """ Function to test the per file counts are aggregated per language like cloc """
+        by_file = pd.DataFrame([["Python", "a.py", 1, 2, 3], ["C++", "a.cpp", 1, 1, 10], ["Python", "b.py", 1, 0, 4]],
+                               columns=["language", "filename", "blank", "comment", "code"])
+        self.assertEqual(ClocEagle.aggregate_by_language(by_file).values.tolist(),
+                         [[1, "C++", 1, 1, 10], [2, "Python", 2, 2, 7], [3, "SUM", 3, 3, 17]])
+
+    def test_native(self):
+        """ Function to test the native line counter writes the cloc csv with out running cloc """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("# comment\nprint(1)\n\nprint(2)\n")
+            Path(repo, "b.java").write_text("// comment\nclass B {}\n")
+            Path(repo, "c.cpp").write_text("int c;\n")
+            data = {**TestResource.input_json, "path": repo, "cloc_native": True, "cloc_workers": 2,
+                    "cloc_args": "--exclude-ext=*.cpp"}
+            with mock.patch('subprocess.call') as mock_subproc_call:
+                self.assertEqual(ClocEagle().orchestrate_cloc(data), 0)
+            self.assertFalse(mock_subproc_call.called)
+            report = os.path.join(repo, "EagleVisionReport", "cloc_report")
+            dataframe = pd.read_csv(os.path.join(report, "cloc.csv"))
+            self.assertEqual(dataframe.iloc[:, :5].values.tolist(), [[1, "Python", 1, 1, 2], [1, "Java", 0, 1, 1],
+                                                                     [2, "SUM", 1, 2, 3]])
+            self.assertEqual(len(pd.read_csv(os.path.join(report, "cloc-by-file.csv"))), 2)
+            self.assertTrue(os.path.isfile(os.path.join(report, "cloc-report.html")))
+
+    def test_native_incremental(self):
+        """ Function to test the native line counter counts only the changed files in incremental mode """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("print(1)\n")
+            Path(repo, "b.py").write_text("print(1)\n")
+            data = {**TestResource.input_json, "path": repo, "cloc_native": True, "incremental": True,
+                    "cloc_args": None}
+            ClocEagle().orchestrate_cloc(data)
+            Path(repo, "b.py").write_text("print(1)\nprint(2)\n")
+            cloceagleobj = ClocEagle()
+            cloceagleobj.orchestrate_cloc(data)
+            self.assertEqual(cloceagleobj.analysis_files, [os.path.join(repo, "b.py")])
+            dataframe = pd.read_csv(os.path.join(repo, "EagleVisionReport", "cloc_report", "cloc.csv"))
+        self.assertEqual(dataframe.iloc[:, :5].values.tolist(), [[2, "Python", 0, 0, 3], [2, "SUM", 0, 0, 3]])
+
+    def test_incremental_counter_switch(self):
+        """ Function to test the counts of the native line counter are not reused when counting with cloc and the
+        report has the columns of cloc only """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("print(1)\n")
+            data = {**TestResource.input_json, "path": repo, "cloc_native": True, "incremental": True,
+                    "cloc_args": None}
+            ClocEagle().orchestrate_cloc(data)
+            cloceagleobj = ClocEagle()
+            with mock.patch('subprocess.call', side_effect=self.fake_cloc):
+                cloceagleobj.orchestrate_cloc({**data, "cloc_native": False})
+            self.assertEqual(cloceagleobj.analysis_files, [os.path.join(repo, "a.py")])
+            report = os.path.join(repo, "EagleVisionReport", "cloc_report")
+            self.assertEqual(list(pd.read_csv(os.path.join(report, "cloc.csv")).columns),
+                             ["files", "language", "blank", "comment", "code"])
+            with open(os.path.join(report, "cloc-report.html")) as html_in:
+                self.assertNotIn("incremental", html_in.read())
+
+    def test_native_cache_by_extension(self):
+        """ Function to test the files with the same content and an other extension are not served from the
+        cached counts of each other """
+        with tempfile.TemporaryDirectory() as repo, tempfile.TemporaryDirectory() as cache:
+            Path(repo, "a.py").write_text("print(1)\n")
+            Path(repo, "b.rb").write_text("print(1)\n")
+            data = {**TestResource.input_json, "path": repo, "cloc_native": True, "incremental": False,
+                    "cloc_args": None, "cache_path": os.path.join(cache, "cache.db")}
+            for _ in range(2):
+                self.assertEqual(ClocEagle().orchestrate_cloc(data), 0)
+            report = os.path.join(repo, "EagleVisionReport", "cloc_report")
+            by_file = pd.read_csv(os.path.join(report, "cloc-by-file.csv"))
+            self.assertEqual(sorted(zip(by_file["language"], by_file["filename"].map(os.path.basename))),
+                             [("Python", "a.py"), ("Ruby", "b.rb")])
+        self.assertIn("2 of 2 files served from the cloc cache", sys.stdout.getvalue())
+
 
 if __name__ == '__main__':
     unittest.main()
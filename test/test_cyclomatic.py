@@ -2,17 +2,20 @@
 
 import os
 import sys
+import tempfile
 import unittest
 from unittest import mock
 from io import StringIO
+from contextlib import redirect_stdout
 from pathlib import Path
 from test.test_support import TestResource
 import pandas as pd
 import numpy as np
-from eaglevision.cyclomatic_eagle import CyclomaticEagle
+import lizard
+from eaglevision.cyclomatic_eagle import CyclomaticEagle, ComplexitySummary, CSV_COLUMNS, function_record
 
 
-class CycloEagleTestCase(unittest.TestCase):
+class CycloEagleTestCase(unittest.TestCase):  # pylint: disable=R0904
     """ Class to unit test the cyclomatic_eagle.py"""
 
     @classmethod
@@ -132,6 +135,18 @@ class CycloEagleTestCase(unittest.TestCase):
                          'python -m lizard "%s"   -x "*.cpp", -x "*.java" --csv' %
                          TestResource.tst_resource_folder)
 
+    @mock.patch('subprocess.call', autospec=True)
+    def test_cmd_with_file_index(self, mock_subproc_call):
+        """ Function to verify the command generation when the files are listed by the shared file walk """
+        mock_subproc_call.return_value = False
+        cycloeagleobj = CyclomaticEagle()
+        cycloeagleobj.orchestrate_cyclomatic(TestResource.input_json, {"cyclo": ["a.py", "b.py"]})
+        list_file = os.path.join(TestResource.report, "cyclomatic_report", "cyclomatic-files.txt")
+        self.assertEqual(cycloeagleobj.cmd, 'python -m lizard -f "%s" -l java  -l python  --csv' % list_file)
+        with open(list_file) as list_in:
+            self.assertEqual(list_in.read().splitlines(), ["a.py", "b.py"])
+        os.remove(list_file)
+
     @mock.patch('subprocess.call', autospec=True)
     def test_fail(self, mock_subproc_call):
         """ Function to test the  subprocess command fail """
@@ -144,6 +159,189 @@ class CycloEagleTestCase(unittest.TestCase):
         self.assertEqual(False, os.path.isfile(os.path.join(TestResource.report,
                                                             "cyclomatic_report", "cyclomatic-complexity-report.html")))
 
+    @staticmethod
+    def fake_lizard(cmd, stdout):
+        """ Function which mimics lizard on the listed files, functions of changed files have CCN 5 """
+        with open(cmd.split('"')[1]) as list_in:
+            for file_name in list_in.read().splitlines():
+                ccn = 5 if "changed" in Path(file_name).read_text() else 1
+                stdout.write('3,%s,20,1,3,"func@1-3@%s","%s","func","func()",1,3\n' % (ccn, file_name, file_name))
+        return 0
+
+    def test_incremental(self):
+        """ Function to test only the changed files are analysed and the rows of the unchanged files are reused """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("def a():\n    pass\n")
+            Path(repo, "b.py").write_text("def b():\n    pass\n")
+            data = {**TestResource.input_json, "path": repo, "incremental": True, "cyclo_exclude": [None]}
+            report = os.path.join(repo, "EagleVisionReport", "cyclomatic_report")
+            with mock.patch('subprocess.call', side_effect=self.fake_lizard) as mock_subproc_call:
+                CyclomaticEagle().orchestrate_cyclomatic(data)
+                Path(repo, "b.py").write_text("def b():\n    changed = 1\n")
+                cycloeagleobj = CyclomaticEagle()
+                cycloeagleobj.orchestrate_cyclomatic(data)
+                self.assertEqual(cycloeagleobj.analysis_files, [os.path.join(repo, "b.py")])
+                self.assertEqual(mock_subproc_call.call_count, 2)
+                CyclomaticEagle().orchestrate_cyclomatic(data)
+                self.assertEqual(mock_subproc_call.call_count, 2)
+            dataframe = pd.read_csv(os.path.join(report, "cyclomatic-complexity.csv"), header=None)
+            self.assertEqual(sorted(zip(dataframe[6], dataframe[1])), [(os.path.join(repo, "a.py"), 1),
+                                                                       (os.path.join(repo, "b.py"), 5)])
+            self.assertTrue(os.path.isfile(os.path.join(report, "cyclomatic-complexity-report.html")))
+
+    def test_incremental_failed_run(self):
+        """ Function to test a failed lizard run keeps the csv of the manifest, so that the next run does not drop
+        the rows of the unchanged files """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("def a():\n    pass\n")
+            Path(repo, "b.py").write_text("def b():\n    pass\n")
+            data = {**TestResource.input_json, "path": repo, "incremental": True, "cyclo_exclude": [None]}
+            report = os.path.join(repo, "EagleVisionReport", "cyclomatic_report")
+            with mock.patch('subprocess.call', side_effect=self.fake_lizard):
+                CyclomaticEagle().orchestrate_cyclomatic(data)
+            Path(repo, "b.py").write_text("def b():\n    changed = 1\n")
+            with mock.patch('subprocess.call', return_value=1):
+                CyclomaticEagle().orchestrate_cyclomatic(data)
+            self.assertEqual(len(pd.read_csv(os.path.join(report, "cyclomatic-complexity.csv"), header=None)), 2)
+            with mock.patch('subprocess.call', side_effect=self.fake_lizard):
+                CyclomaticEagle().orchestrate_cyclomatic(data)
+            dataframe = pd.read_csv(os.path.join(report, "cyclomatic-complexity.csv"), header=None)
+            self.assertEqual(sorted(zip(dataframe[6], dataframe[1])), [(os.path.join(repo, "a.py"), 1),
+                                                                       (os.path.join(repo, "b.py"), 5)])
+            self.assertFalse(os.path.isfile(os.path.join(report, "cyclomatic-complexity.csv.tmp")))
+
+    def test_result_cache(self):
+        """ Function to test the functions of the files found in the result cache are not analysed again,
+        also for a config entry pointing at a copy of the files """
+        with tempfile.TemporaryDirectory() as repo, tempfile.TemporaryDirectory() as copy:
+            for folder in [repo, copy]:
+                Path(folder, "a.py").write_text("def a():\n    pass\n")
+            Path(repo, "b.py").write_text("def b():\n    changed = 1\n")
+            cache_path = os.path.join(repo, "cache.db")
+            with mock.patch('subprocess.call', side_effect=self.fake_lizard) as mock_subproc_call:
+                CyclomaticEagle().orchestrate_cyclomatic({**TestResource.input_json, "path": repo,
+                                                          "cache_path": cache_path, "cyclo_exclude": [None]})
+                cycloeagleobj = CyclomaticEagle()
+                cycloeagleobj.orchestrate_cyclomatic({**TestResource.input_json, "path": copy,
+                                                      "cache_path": cache_path, "cyclo_exclude": [None]})
+                self.assertEqual(cycloeagleobj.analysis_files, [])
+                self.assertEqual(mock_subproc_call.call_count, 1)
+            dataframe = pd.read_csv(os.path.join(copy, "EagleVisionReport", "cyclomatic_report",
+                                                 "cyclomatic-complexity.csv"), header=None)
+            self.assertEqual(dataframe.values.tolist(),
+                             [[3, 1, 20, 1, 3, "func@1-3@%s" % os.path.join(copy, "a.py"), os.path.join(copy, "a.py"),
+                               "func", "func()", 1, 3]])
+
+    def test_in_process(self):
+        """ Function to test the in process lizard engine gives the same records as the lizard csv output """
+        source = os.path.join(TestResource.par_dir, "eaglevision")
+        csv_out = StringIO()
+        with redirect_stdout(csv_out):
+            lizard.main(["lizard", source, "-l", "python", "-x", "*scheduler*", "--csv"])
+        csv_out.seek(0)
+        expected = pd.read_csv(csv_out, names=CSV_COLUMNS)
+        self.assertFalse(expected.empty)
+        cycloeagleobj = CyclomaticEagle()
+        with tempfile.TemporaryDirectory() as report, mock.patch('subprocess.call') as mock_subproc_call:
+            self.assertEqual(cycloeagleobj.orchestrate_cyclomatic(
+                {**TestResource.input_json, "path": source, "cyclo_args": "-l python", "report_folder": report,
+                 "cyclo_exclude": ["*scheduler*"], "cyclo_in_process": True}), 0)
+            self.assertFalse(mock_subproc_call.called)
+            self.assertEqual(cycloeagleobj.records.values.tolist(), expected.values.tolist())
+            self.assertFalse(os.path.isfile(os.path.join(cycloeagleobj.report_path, "cyclomatic-complexity.csv")))
+            data_frame = pd.concat(pd.read_html(os.path.join(cycloeagleobj.report_path,
+                                                             "cyclomatic-complexity-report.html")))
+        self.assertEqual(sorted(data_frame["CCN"]), sorted(expected["CCN"]))
+
+    def test_in_process_file_index(self):
+        """ Function to test the in process lizard engine analyses the listed files only """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_text("def a(x):\n    if x:\n        pass\n")
+            Path(repo, "b.py").write_text("def b():\n    pass\n")
+            cycloeagleobj = CyclomaticEagle()
+            cycloeagleobj.orchestrate_cyclomatic({**TestResource.input_json, "path": repo, "cyclo_in_process": True},
+                                                 {"cyclo": [os.path.join(repo, "a.py")]})
+        self.assertEqual(cycloeagleobj.records[["CCN", "Param", "Path", "Function"]].values.tolist(),
+                         [[2, 1, os.path.join(repo, "a.py"), "a"]])
+
+    def test_in_process_wrong_args(self):
+        """ Function to test the in process lizard engine fails like lizard on wrong arguments """
+        with mock.patch('sys.stderr', StringIO()):
+            status = CyclomaticEagle().orchestrate_cyclomatic({**TestResource.input_json, "cyclo_args": "--unknown",
+                                                               "cyclo_in_process": True})
+        self.assertEqual(status, 2)
+
+    def test_sharded(self):
+        """ Function to test the sharded analysis gives the records of lizard sorted by path and line """
+        source = os.path.join(TestResource.par_dir, "eaglevision")
+        expected = pd.DataFrame([function_record(file_info, func) for file_info in lizard.analyze([source])
+                                 for func in file_info.function_list], columns=CSV_COLUMNS)
+        expected = expected.sort_values(["Path", "Row"]).reset_index(drop=True)
+        cycloeagleobj = CyclomaticEagle()
+        with tempfile.TemporaryDirectory() as report:
+            self.assertEqual(cycloeagleobj.orchestrate_cyclomatic(
+                {**TestResource.input_json, "path": source, "cyclo_args": None, "report_folder": report,
+                 "cyclo_exclude": [None], "cyclo_workers": 2}), 0)
+            self.assertTrue(os.path.isfile(os.path.join(cycloeagleobj.report_path,
+                                                        "cyclomatic-complexity-report.html")))
+        self.assertEqual(cycloeagleobj.records.values.tolist(), expected.values.tolist())
+
+    def test_shard_files(self):
+        """ Function to test the files are split in to shards biggest first """
+        with tempfile.TemporaryDirectory() as repo:
+            for index in range(5):
+                Path(repo, "%s.py" % index).write_text("x" * (index + 1))
+            shards = CyclomaticEagle.shard_files([os.path.join(repo, "%s.py" % index) for index in range(5)], 2)
+            self.assertEqual(shards, [[os.path.join(repo, "%s.py" % index) for index in [4, 2, 0]],
+                                      [os.path.join(repo, "%s.py" % index) for index in [3, 1]]])
+            self.assertEqual(CyclomaticEagle.shard_files([os.path.join(repo, "0.py")], 8),
+                             [[os.path.join(repo, "0.py")]])
+            self.assertEqual(CyclomaticEagle.shard_files([], 8), [])
+
+    def test_complexity_summary(self):
+        """ Function to test the top K heap and the running aggregates """
+        summary = ComplexitySummary(2)
+        for nloc, ccn, path in [(3, 1, "a"), (10, 12, "a"), (5, 7, "b"), (8, 12, "b"), (60, 55, "c")]:
+            summary.add([nloc, ccn, 0, 0, 0, "loc", path, "func", "args", 1, 2])
+        self.assertEqual(summary.top()[["NLOC", "CCN"]].values.tolist(), [[60, 55], [10, 12]])
+        self.assertEqual(summary.distribution().values.tolist(),
+                         [["1-5", 1, 3], ["6-10", 1, 5], ["11-20", 2, 18], ["21-50", 0, 0], [">=51", 1, 60],
+                          ["Total", 5, 86]])
+        self.assertEqual(summary.per_file().values.tolist(), [["c", 1, 60, 55], ["a", 2, 13, 12], ["b", 2, 13, 12]])
+
+    def test_top_k_in_process(self):
+        """ Function to test the top K report streams the functions of the in process engine """
+        source = os.path.join(TestResource.par_dir, "eaglevision")
+        ccn = sorted((func.cyclomatic_complexity for file_info in lizard.analyze([source], ["*scheduler*"])
+                      for func in file_info.function_list), reverse=True)
+        cycloeagleobj = CyclomaticEagle()
+        with tempfile.TemporaryDirectory() as report:
+            cycloeagleobj.orchestrate_cyclomatic({**TestResource.input_json, "path": source, "cyclo_args": None,
+                                                  "report_folder": report, "cyclo_exclude": ["*scheduler*"],
+                                                  "cyclo_in_process": True, "cyclo_top_k": 3})
+            self.assertIsNone(cycloeagleobj.records)
+            data_frame = pd.concat(pd.read_html(os.path.join(cycloeagleobj.report_path,
+                                                             "cyclomatic-complexity-report.html")))
+            distribution = pd.concat(pd.read_html(os.path.join(cycloeagleobj.report_path,
+                                                               "cyclomatic-complexity-distribution.html")))
+            per_file = pd.read_csv(os.path.join(cycloeagleobj.report_path, "cyclomatic-nloc-per-file.csv"))
+        self.assertEqual(list(data_frame["CCN"]), ccn[:3])
+        self.assertEqual(list(distribution["Functions"])[-1], len(ccn))
+        self.assertEqual(per_file["Functions"].sum(), len(ccn))
+
+    def test_top_k_from_csv(self):
+        """ Function to test the top K report streams the functions from the lizard csv """
+        self.dummy_dataf()
+        cycloeagleobj = CyclomaticEagle()
+        with mock.patch.object(CyclomaticEagle, '_CyclomaticEagle__subprocess_out', return_value=False):
+            cycloeagleobj.orchestrate_cyclomatic({**TestResource.input_json, "cyclo_top_k": 2})
+        data_frame = pd.concat(pd.read_html(os.path.join(TestResource.report, "cyclomatic_report",
+                                                         "cyclomatic-complexity-report.html")))
+        self.assertEqual(list(data_frame["CCN"]), [5, 3])
+        for name in ["cyclomatic-complexity-distribution.html", "cyclomatic-nloc-per-file.html",
+                     "cyclomatic-nloc-per-file.csv"]:
+            os.remove(os.path.join(TestResource.report, "cyclomatic_report", name))
+
 
 if __name__ == '__main__':
     unittest.main()
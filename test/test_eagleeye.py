@@ -1,12 +1,17 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 
 import os
+import sys
+import json
 import unittest
 from unittest import mock
+from io import StringIO
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from test.test_support import TestResource
 from eaglevision.eaglevision import EagleVision
 from eaglevision.eaglevision import create_parser
+from eaglevision.eaglevision import run_analyzer
 
 
 def check_create_parser(option, value):
@@ -88,6 +93,61 @@ class EagleVisionTestCase(unittest.TestCase):
             eaglevisionobj.eaglewatch()
             self.assertTrue(mocked_class.called)
 
+    def test_run_analyzer_output_and_status(self):
+        """ Function to test the output capture and exit status of a single analyzer run """
+        mocked_class = mock.Mock(side_effect=lambda json, file_index: print("cloc analysis done") or 0)
+        with mock.patch('eaglevision.cloc_eagle.ClocEagle.orchestrate_cloc', mocked_class):
+            analyzer, status, output = run_analyzer("CLOCEXE", TestResource.input_json)
+        self.assertTrue(mocked_class.called)
+        self.assertEqual(analyzer, "CLOCEXE")
+        self.assertEqual(status, 0)
+        self.assertIn("cloc analysis done", output)
+
+    def test_run_analyzer_failure_status(self):
+        """ Function to test the exit status of analyzers which exit or raise """
+        with mock.patch('eaglevision.cyclomatic_eagle.CyclomaticEagle.orchestrate_cyclomatic',
+                        mock.Mock(side_effect=SystemExit(2))):
+            self.assertEqual(run_analyzer("CYCLOEXE", TestResource.input_json)[1], 2)
+        with mock.patch('eaglevision.similarity_eagle.SimilarityEagle.orchestrate_similarity',
+                        mock.Mock(side_effect=ValueError("broken input"))):
+            _, status, output = run_analyzer("SIMEXE", TestResource.input_json)
+            self.assertEqual(status, 1)
+            self.assertIn("ValueError: broken input", output)
+
+    def test_concurrent_eaglewatch(self):
+        """ Function to test the concurrent execution of the analyzers and the exit status report """
+        TestResource.write_json("populate.json", json.dumps([{**TestResource.input_json, "run_concurrent": True,
+                                                              "concurrent_workers": 1}]))
+        eaglevisionobj = EagleVision(os.path.join(Path(__file__).parent.parent, "test_resource", "populate.json"))
+        held, sys.stdout = sys.stdout, StringIO()
+        try:
+            with mock.patch('eaglevision.eaglevision.ProcessPoolExecutor', ThreadPoolExecutor), \
+                    mock.patch('eaglevision.cloc_eagle.ClocEagle.orchestrate_cloc', mock.Mock(return_value=0)), \
+                    mock.patch('eaglevision.cyclomatic_eagle.CyclomaticEagle.orchestrate_cyclomatic',
+                               mock.Mock(return_value=1)), \
+                    mock.patch('eaglevision.similarity_eagle.SimilarityEagle.orchestrate_similarity',
+                               mock.Mock(return_value=0)):
+                eaglevisionobj.eaglewatch()
+            out_str = sys.stdout.getvalue().split('\n')
+        finally:
+            sys.stdout = held
+        self.assertIn("[Cloc analysis Tool] exit status: 0", out_str)
+        self.assertIn("[Cyclomatic analysis Tool] exit status: 1", out_str)
+        self.assertIn("[Pattern matching and Code Similarity Tool] exit status: 0", out_str)
+
+    def test_shared_file_walk(self):
+        """ Function to test the analyzers receive the file list of the shared file walk """
+        TestResource.write_json("populate.json", json.dumps([{**TestResource.input_json, "shared_file_walk": True,
+                                                              "run_cloc_metric": False,
+                                                              "run_cyclomatic_complexity": False}]))
+        eaglevisionobj = EagleVision(os.path.join(Path(__file__).parent.parent, "test_resource", "populate.json"))
+        mocked_class = mock.Mock()
+        with mock.patch('eaglevision.similarity_eagle.SimilarityEagle.orchestrate_similarity', mocked_class):
+            eaglevisionobj.eaglewatch()
+        self.assertTrue(mocked_class.called)
+        self.assertEqual(sorted(mocked_class.call_args[0][1].keys()),
+                         ["cloc", "cloc_args", "cyclo", "extraction"])
+
     def test_path(self):
         """ Function to test the path variable in the command line
         correct and incorrect """
@@ -95,6 +155,8 @@ class EagleVisionTestCase(unittest.TestCase):
             check_create_parser("-p", "path_test")
         parsed = check_create_parser("--p", "path_test")
         self.assertEqual(parsed.path, "path_test")
+        self.assertEqual(parsed.workers, None)
+        self.assertEqual(check_create_parser("--w", "4").workers, 4)
 
 
 if __name__ == '__main__':
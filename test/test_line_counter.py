@@ -0,0 +1,64 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from eaglevision.line_counter import SYNTAX, language_of, count_lines, count_file, count_files, \
+    count_files_parallel
+
+
+class LineCounterTestCase(unittest.TestCase):
+    """ Class to test the line_counter.py"""
+
+    def test_language_of(self):
+        """ Function to test the language detection by file name and extension """
+        self.assertEqual(language_of(os.path.join("src", "main.CPP")), "C++")
+        self.assertEqual(language_of(os.path.join("src", "main.h")), "C/C++ Header")
+        self.assertEqual(language_of(os.path.join("src", "Makefile")), "make")
+        self.assertEqual(language_of(os.path.join("src", "CMakeLists.txt")), "CMake")
+        self.assertEqual(language_of(os.path.join("src", "notes.txt")), None)
+        self.assertEqual(language_of(os.path.join("src", "no_extension")), None)
+
+    def test_count_c_style(self):
+        """ Function to test the counting of the line and block comments of C like languages """
+        lines = [b"/* header", b" * comment", b"", b" */", b"int a; // trailing comment", b"// comment",
+                 b"int b; /* opened", b"closed */ int c;", b"/* one line */", b"/* one */ int d;", b"   ", b"}"]
+        self.assertEqual(count_lines(lines, SYNTAX["C++"]), (2, 5, 5))
+
+    def test_count_python(self):
+        """ Function to test the counting of the comments and doc strings of python """
+        lines = [b'""" module doc', b'string """', b"import os", b"# comment", b"", b"def first():",
+                 b'    """ one line doc """', b"    text = '''", b"    text'''", b"    return 1"]
+        self.assertEqual(count_lines(lines, SYNTAX["Python"]), (1, 5, 4))
+
+    def test_count_without_comments(self):
+        """ Function to test the counting of languages with out comments """
+        self.assertEqual(count_lines([b"{", b"", b'  "a": "#"', b"}"], SYNTAX["JSON"]), (1, 0, 3))
+
+    def test_count_file(self):
+        """ Function to test the counting of files through the memory map """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "a.py").write_bytes(b"# comment\r\nprint(1)\r\n\r\n")
+            Path(repo, "empty.py").write_text("")
+            Path(repo, "notes.txt").write_text("text")
+            self.assertEqual(count_file(os.path.join(repo, "a.py")), ["Python", os.path.join(repo, "a.py"), 1, 1, 1])
+            self.assertEqual(count_file(os.path.join(repo, "empty.py")),
+                             ["Python", os.path.join(repo, "empty.py"), 0, 0, 0])
+            self.assertEqual(count_file(os.path.join(repo, "notes.txt")), None)
+            self.assertEqual(count_file(os.path.join(repo, "missing.py")), None)
+
+    def test_count_files_parallel(self):
+        """ Function to test the counting across worker processes keeps the order of the files """
+        with tempfile.TemporaryDirectory() as repo:
+            file_paths = []
+            for index in range(9):
+                file_paths.append(os.path.join(repo, "%s.py" % index))
+                Path(file_paths[-1]).write_text("print(1)\n" * index)
+            file_paths.append(os.path.join(repo, "notes.txt"))
+            Path(file_paths[-1]).write_text("text")
+            self.assertEqual(count_files_parallel(file_paths, 3), count_files(file_paths))
+            self.assertEqual(len(count_files_parallel(file_paths)), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
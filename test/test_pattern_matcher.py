@@ -0,0 +1,68 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import tempfile
+import unittest
+import pandas as pd
+from functiondefextractor import condition_checker
+from eaglevision.pattern_matcher import check_conditions, compile_patterns, present_patterns, pattern_pivot, \
+    scan_files, scan_files_parallel
+
+FUNCTIONS = pd.DataFrame({"Uniq ID": ["a.py_first", "a.py_second", "b.py_third", "b.py_fourth"],
+                          "Code": ["def first():\n    assert value == 1\n    assertEqual(value, 1)",
+                                   "def second():\n    print(value)\n    Assert value",
+                                   "def third():\n    pass",
+                                   "@Test\ndef fourth():\n    xassert(value)\n    print(value); print(1)"]})
+
+
+class PatternMatcherTestCase(unittest.TestCase):
+    """ Class to test the single scan pattern check """
+
+    def test_present_patterns(self):
+        """ Function to test the patterns starting at the same or an overlapping position are all found """
+        patterns = ["ASSERT", "ASSERTEQUAL", "XAS", "PRINT"]
+        regex = compile_patterns(patterns)
+        self.assertEqual(present_patterns(regex, patterns, "ASSERTEQUAL(1)"), ["ASSERT", "ASSERTEQUAL"])
+        self.assertEqual(present_patterns(regex, patterns, "XASSERT"), ["ASSERT", "XAS"])
+        self.assertEqual(present_patterns(regex, patterns, "PASS"), [])
+
+    def test_check_conditions_like_condition_checker(self):
+        """ Function to test the data and pivot of every pattern are the ones of the condition checker """
+        patterns = ["assert", "assertEqual", "print", "@Test", "missing", "print", "assert"]
+        separators = ["(", None, "(", None, None, None, "("]
+        results = check_conditions(patterns, FUNCTIONS, separators)
+        self.assertEqual(len(results), len(patterns))
+        for pattern, separator, result in zip(patterns, separators, results):
+            data, pivot = condition_checker.check_condition(pattern, FUNCTIONS, separator)
+            pd.testing.assert_frame_equal(result[0], data)
+            pd.testing.assert_frame_equal(result[1], pivot)
+
+    def test_check_conditions_no_pattern(self):
+        """ Function to test no pattern gives no result """
+        self.assertEqual(check_conditions([], FUNCTIONS, []), [])
+
+    def test_scan_files(self):
+        """ Function to test the files containing any of the patterns are found case insensitive and in order """
+        with tempfile.TemporaryDirectory() as folder:
+            files = [os.path.join(folder, name) for name in ["a.py", "b.java", "c.py", "d.py", "e.py"]]
+            for file_name, text in zip(files[:4], ["assert 1", "@test\nvoid first()", "print(1)", ""]):
+                with open(file_name, "w") as file_out:
+                    file_out.write(text)
+            self.assertEqual(scan_files(files, ["assert", "@Test"]), files[:2])
+            self.assertEqual(scan_files_parallel(files, ["assert", "@Test"], 2), files[:2])
+            self.assertEqual(scan_files(files, ["missing"]), [])
+            with open(files[4], "w", encoding="utf-8") as file_out:
+                file_out.write("gr\u00f6\u00dfe = 1")
+            self.assertEqual(scan_files(files, ["GR\u00d6SSE"]), files[4:])
+            self.assertEqual(scan_files(files, ["\u00f6sse"]), files[4:])
+            self.assertEqual(scan_files(files, ["oss"]), [])
+            self.assertEqual(scan_files(files, ["sse", "ASSERT"]), [files[0], files[4]])
+
+    def test_pattern_pivot(self):
+        """ Function to test the pivot of the statements is the one of the condition checker """
+        data = pd.DataFrame({"Uniq ID": ["a", "b", "c"], "Code": ["", "", ""], "Count of print in function": [2, 1, 0],
+                             "print Statements": ["print(1)\nprint (2)\n", "print(1)\n", ""]})
+        for separator in [None, "(", " "]:
+            pd.testing.assert_frame_equal(pattern_pivot(data["print Statements"], "print", separator),
+                                          condition_checker.get_pivot_table_result(data, "print", separator, data)[1])
+        pd.testing.assert_frame_equal(pattern_pivot(["", ""], "print", "("),
+                                      condition_checker.get_pivot_table_result(data[2:], "print", "(", data)[1])
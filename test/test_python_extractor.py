@@ -0,0 +1,68 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import tempfile
+import unittest
+from functiondefextractor import core_extractor
+from eaglevision.python_extractor import extract_functions
+
+SAMPLE = '''import os
+
+
+class Sample:
+    """ Sample class """
+
+    @staticmethod
+    def first(value):
+        """ Doc string """
+
+        return value + 1
+
+    def second(self):
+        # comment
+        return os.sep
+
+
+def third():
+    pass
+'''
+
+
+class PythonExtractorTestCase(unittest.TestCase):
+    """ Class to test the python_extractor.py"""
+
+    def setUp(self):
+        """ Function which writes the sample python file """
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.folder.name, "sample.py")
+        with open(self.file_name, "w") as file_out:
+            file_out.write(SAMPLE)
+
+    def tearDown(self):
+        """ Function which removes the sample python file """
+        self.folder.cleanup()
+
+    def extractor_functions(self, annot):
+        """ Function which extracts the sample with the extractor, given the def lines ctags reports """
+        core_extractor.UID_LIST.clear()
+        code_list = core_extractor.process_py_files([], [8, 13, 18], self.file_name, annot, None)
+        data_frame = core_extractor.get_final_dataframe(None, code_list)
+        return list(data_frame["Uniq ID"]), list(data_frame["Code"])
+
+    def test_same_as_extractor(self):
+        """ Function to test the functions and their code equal those of the extractor """
+        for annot in [None, "@staticmethod", "thi"]:
+            self.assertEqual(extract_functions(self.file_name, annot), self.extractor_functions(annot))
+        self.assertEqual(extract_functions(self.file_name)[0], ["%s_%s" % (self.file_name, name)
+                                                                 for name in ["first", "second", "third"]])
+        self.assertEqual(extract_functions(self.file_name, "@Test"), ([], []))
+
+    def test_not_parsed(self):
+        """ Function to test the files which do not parse are left to the extractor """
+        with open(self.file_name, "w") as file_out:
+            file_out.write("def broken(:\n")
+        self.assertIsNone(extract_functions(self.file_name))
+        self.assertIsNone(extract_functions(os.path.join(self.folder.name, "missing.py")))
+
+
+if __name__ == '__main__':
+    unittest.main()
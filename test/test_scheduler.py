@@ -0,0 +1,105 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from io import StringIO
+from pathlib import Path
+from test.test_support import TestResource
+from eaglevision.eaglevision import EagleVision
+from eaglevision.scheduler_eagle import SchedulerEagle, get_peak_memory, entry_budget
+
+
+def dummy_entry_runner(json):
+    """ Function which mimics a config entry run, exits with error for the test folder """
+    if os.path.basename(os.path.normpath(json["path"])) == "test":
+        sys.exit(3)
+    return 0
+
+
+class SchedulerEagleTestCase(unittest.TestCase):
+    """ Class to test the scheduler_eagle.py"""
+
+    summary_path = os.path.join(TestResource.tst_resource_folder, "eaglevision-summary.html")
+
+    @classmethod
+    def tearDown(cls):
+        """"Deletes the generated files """
+        if os.path.exists(cls.summary_path):
+            os.remove(cls.summary_path)
+        if os.path.exists(os.path.join(TestResource.tst_resource_folder, "report_style.css")):
+            os.remove(os.path.join(TestResource.tst_resource_folder, "report_style.css"))
+
+    def setUp(self):
+        """ Function used to setup the read the console out """
+        self.held, sys.stdout = sys.stdout, StringIO()
+
+    def test_estimate_size(self):
+        """ Function to test the size estimation of a repository, from git HEAD or else by walking the path """
+        with tempfile.TemporaryDirectory() as repo:
+            Path(repo, "folder").mkdir()
+            Path(repo, "folder", "b.py").write_text("print(2)\n")
+            self.assertEqual(SchedulerEagle.estimate_size(repo), (9, 1))
+            TestResource.commit_files(repo, {"a.py": "print(1)"})
+            Path(repo, "untracked.py").write_text("print(3)")
+            self.assertEqual(SchedulerEagle.estimate_size(repo), (17, 2))
+            self.assertEqual(SchedulerEagle.estimate_size(os.path.join(repo, "folder")), (9, 1))
+        self.assertEqual(SchedulerEagle.estimate_size("random_path"), (0, 0))
+
+    def test_entry_budget(self):
+        """ Function to test the worker pools of an entry are capped to its share of the worker budget """
+        json = {"path": "repo", "cyclo_workers": 8, "cloc_workers": 1, "extraction_workers": None}
+        self.assertEqual(entry_budget(json, 2), {**json, "cyclo_workers": 2})
+        self.assertEqual(entry_budget({**json, "run_concurrent": True}, 4),
+                         {**json, "run_concurrent": True, "concurrent_workers": 4, "cyclo_workers": 1})
+        self.assertEqual(entry_budget({**json, "run_concurrent": True, "concurrent_workers": 2}, 4),
+                         {**json, "run_concurrent": True, "concurrent_workers": 2, "cyclo_workers": 2})
+        self.assertEqual(json["cyclo_workers"], 8)
+
+    def test_peak_memory(self):
+        """ Function to test the peak memory measurement """
+        self.assertGreater(get_peak_memory(), 0)
+
+    def test_schedule_summary(self):
+        """ Function to test the status, duration and memory summary of the scheduled entries """
+        json_data = [{**TestResource.input_json, "path": os.path.join(TestResource.par_dir, "test")},
+                     {**TestResource.input_json}]
+        schedulerobj = SchedulerEagle(dummy_entry_runner)
+        summary = schedulerobj.schedule(json_data, 2, self.summary_path)
+        self.assertEqual(list(summary["Status"]), [3, 0])
+        self.assertEqual(list(summary["Path"]), [json_data[0]["path"], json_data[1]["path"]])
+        self.assertTrue((summary["Duration (s)"] >= 0).all())
+        self.assertTrue((summary["Peak memory (MB)"] > 0).all())
+        self.assertTrue(os.path.isfile(self.summary_path))
+
+    def test_schedule_biggest_first(self):
+        """ Function to test the biggest repository is started first """
+        with tempfile.TemporaryDirectory() as small_repo, tempfile.TemporaryDirectory() as big_repo:
+            Path(small_repo, "small.py").write_text("print(1)")
+            Path(big_repo, "big.py").write_text("print(1)\n" * 100)
+            json_data = [{**TestResource.input_json, "path": small_repo},
+                         {**TestResource.input_json, "path": big_repo}]
+            started = []
+            with mock.patch('eaglevision.scheduler_eagle.SchedulerEagle._SchedulerEagle__run_entry',
+                            side_effect=lambda json: started.append(json) or (0, 0, 0)):
+                SchedulerEagle(dummy_entry_runner).schedule([{**data, "cyclo_workers": 4} for data in json_data], 1)
+        self.assertEqual([json["path"] for json in started], [big_repo, small_repo])
+        self.assertEqual([json["cyclo_workers"] for json in started], [1, 1])
+
+    def test_eaglewatch_with_workers(self):
+        """ Function to test the eaglewatch delegates to the scheduler when workers are given """
+        TestResource.write_json("populate.json", TestResource.json_in)
+        eaglevisionobj = EagleVision(os.path.join(TestResource.tst_resource_folder, "populate.json"), 4)
+        mocked_class = mock.Mock()
+        with mock.patch('eaglevision.scheduler_eagle.SchedulerEagle.schedule', mocked_class):
+            eaglevisionobj.eaglewatch()
+        self.assertTrue(mocked_class.called)
+        self.assertEqual(mocked_class.call_args[0][1], 4)
+        self.assertEqual(mocked_class.call_args[0][2], os.path.abspath(self.summary_path))
+        os.remove(os.path.join(TestResource.tst_resource_folder, "populate.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
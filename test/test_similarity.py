@@ -1,16 +1,20 @@
 """Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
 import os
 import sys
+import tempfile
 import unittest
 from unittest import mock
 from io import StringIO
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from test.test_support import TestResource
 import pandas as pd
+from functiondefextractor import core_extractor
 from pandas.util.testing import assert_frame_equal
 from eaglevision.similarity_eagle import SimilarityEagle
 
 
-class SimilarityEagleTestCase(unittest.TestCase):
+class SimilarityEagleTestCase(unittest.TestCase):  # pylint: disable=R0904
     """ Class to test the Similarity_eagle.py"""
 
     @classmethod
@@ -176,6 +180,452 @@ class SimilarityEagleTestCase(unittest.TestCase):
                                                            "golden_similarity_brief_report.html"))
             assert_frame_equal(actual_dataframe[0], expected_dataframe[0])
 
+    def test_extraction_with_file_index(self):
+        """ Function to test the extraction from the file list of the shared file walk """
+        similarityobj = SimilarityEagle()
+        mocked_class = mock.Mock()
+        with tempfile.TemporaryDirectory() as repo:
+            file_name = os.path.join(repo, "sample.py")
+            with open(file_name, "w") as file_out:
+                file_out.write("def first():\n    assert 1 == 1\n\ndef second():\n    print(1)\n")
+            with mock.patch('functiondefextractor.core_extractor.extractor', mocked_class), \
+                    mock.patch('functiondefextractor.core_extractor.get_function_names',
+                               mock.Mock(return_value=(["first", "second"], [1, 4]))):
+                data = {**TestResource.input_json, "path": repo, "run_similarity": False, "pattern_match": None}
+                similarityobj.orchestrate_similarity(data, {"extraction": [file_name]})
+        self.assertFalse(mocked_class.called)
+        self.assertEqual(list(similarityobj.dataframe["Uniq ID"]), [file_name + "_first", file_name + "_second"])
+        self.assertIn("assert 1 == 1", similarityobj.dataframe["Code"][0])
+
+    def test_extraction_with_file_index_delta_no_annotation(self):
+        """ Function to test the extraction from the file list when delta is given with out annotation """
+        similarityobj = SimilarityEagle()
+        data = {**TestResource.input_json, "extraction_delta": 5, "extraction_annotation": None}
+        self.assertEqual(similarityobj.orchestrate_similarity(data, {"extraction": []}), 1)
+
+    def test_incremental_extraction(self):
+        """ Function to test only the changed files are extracted and the functions of the unchanged files are reused """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert 1 == 1\n")
+            data = {**TestResource.input_json, "path": repo, "run_similarity": False, "pattern_match": None,
+                    "incremental": True}
+            mocked_names = mock.Mock(return_value=(["first"], [1]))
+            with mock.patch('functiondefextractor.core_extractor.get_function_names', mocked_names):
+                SimilarityEagle().orchestrate_similarity(data)
+                self.assertEqual(mocked_names.call_count, 2)
+                with open(os.path.join(repo, "b.py"), "w") as file_out:
+                    file_out.write("def first():\n    assert 2 == 2\n")
+                similarityobj = SimilarityEagle()
+                similarityobj.orchestrate_similarity(data)
+                self.assertEqual(mocked_names.call_count, 3)
+        self.assertEqual(list(similarityobj.dataframe["Uniq ID"]), [os.path.join(repo, "a.py_first"),
+                                                                    os.path.join(repo, "b.py_first")])
+        self.assertIn("assert 1 == 1", similarityobj.dataframe["Code"][0])
+        self.assertIn("assert 2 == 2", similarityobj.dataframe["Code"][1])
+
+    def test_changed_functions_similarity(self):
+        """ Function to test only the changed functions are pattern checked and matched against the whole repo """
+        with tempfile.TemporaryDirectory() as repo:
+            code = "def first():\n    assert value == %s\n"
+            TestResource.commit_files(repo, {"a.py": code % 1, "b.py": code % 1, "c.py": code % 1})
+            TestResource.commit_files(repo, {"b.py": code % 2, "c.py": code % 3})
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": ["assert"], "pattern_seperator": ["("], "similarity_range": "0,100",
+                    "base_ref": "HEAD~1", "head_ref": "HEAD"}
+            mocked_report = mock.Mock()
+            similarityobj = SimilarityEagle()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                            mock.Mock(return_value=(["first"], [1]))), \
+                    mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report), \
+                    mock.patch('eaglevision.similarity_eagle.check_conditions',
+                               mock.Mock(return_value=[(pd.DataFrame(), pd.DataFrame())])) \
+                    as mocked_condition:
+                self.assertEqual(similarityobj.orchestrate_similarity(data), 0)
+        self.assertEqual(similarityobj.changed_ids, {os.path.join(repo, "b.py_first"), os.path.join(repo, "c.py_first")})
+        self.assertEqual(sorted(mocked_condition.call_args[0][1]["Uniq ID"]), sorted(similarityobj.changed_ids))
+        report_df = mocked_report.call_args[0][0]
+        # every changed function is matched once against each other function, unchanged pairs are not matched
+        self.assertEqual(sorted(tuple(sorted(pair)) for pair in zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                         [(os.path.join(repo, "a.py_first"), os.path.join(repo, "b.py_first")),
+                          (os.path.join(repo, "a.py_first"), os.path.join(repo, "c.py_first")),
+                          (os.path.join(repo, "b.py_first"), os.path.join(repo, "c.py_first"))])
+        self.assertTrue(set(report_df["UNIQ ID"]).issubset(similarityobj.changed_ids))
+
+    def test_no_changed_functions(self):
+        """ Function to test no changed functions between the revisions is not an error """
+        with tempfile.TemporaryDirectory() as repo:
+            TestResource.commit_files(repo, {"a.py": "def first():\n    pass\n"})
+            TestResource.commit_files(repo, {"readme.md": "text"})
+            data = {**TestResource.input_json, "path": repo, "base_ref": "HEAD~1"}
+            similarityobj = SimilarityEagle()
+            self.assertEqual(similarityobj.orchestrate_similarity(data), 0)
+            self.assertEqual(similarityobj.changed_ids, set())
+
+    def test_extraction_result_cache(self):
+        """ Function to test the functions of the files found in the result cache are not extracted again """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert 1 == 1\n")
+            data = {**TestResource.input_json, "path": repo, "run_similarity": False, "pattern_match": None,
+                    "cache_path": os.path.join(repo, "cache.db")}
+            mocked_names = mock.Mock(return_value=(["first"], [1]))
+            with mock.patch('functiondefextractor.core_extractor.get_function_names', mocked_names):
+                SimilarityEagle().orchestrate_similarity(data)
+                similarityobj = SimilarityEagle()
+                similarityobj.orchestrate_similarity(data)
+            self.assertEqual(mocked_names.call_count, 2)
+        self.assertEqual(list(similarityobj.dataframe["Uniq ID"]), [os.path.join(repo, "a.py_first"),
+                                                                    os.path.join(repo, "b.py_first")])
+        self.assertIn("assert 1 == 1", similarityobj.dataframe["Code"][1])
+
+
+    def test_minhash_similarity_engine(self):
+        """ Function to test the similarity check with the MinHash engine and the fallback of an unknown engine """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py", "c.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert %s == 1\n" % ("other" if name == "c.py" else "value"))
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "90,100", "similarity_engine": "minhash"}
+            reports = []
+            for engine in ["minhash", "random"]:
+                mocked_report = mock.Mock()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                                mock.Mock(return_value=(["first"], [1]))), \
+                        mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                    SimilarityEagle().orchestrate_similarity({**data, "similarity_engine": engine})
+                report_df = mocked_report.call_args[0][0]
+                reports.append([tuple(sorted(pair)) for pair in zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])])
+        self.assertEqual(reports[0], [(os.path.join(repo, "a.py_first"), os.path.join(repo, "b.py_first"))])
+        self.assertEqual(reports[1], reports[0])
+        self.assertIn("Unknown similarity_engine random", sys.stdout.getvalue())
+
+
+    def test_similarity_memory_limit(self):
+        """ Function to test the blocked cosine within the memory budget reports the pairs of the cosine engine """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py", "c.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert %s == 1\n" % name)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "0,100", "similarity_engine": None}
+            reports = []
+            for memory_limit in [None, 0.000001]:
+                mocked_report = mock.Mock()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                                mock.Mock(return_value=(["first"], [1]))), \
+                        mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                    SimilarityEagle().orchestrate_similarity({**data, "similarity_memory_limit": memory_limit})
+                report_df = mocked_report.call_args[0][0]
+                reports.append(sorted(tuple(sorted(pair)) + (round(score, 6),) for *pair, score in
+                                      zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"], report_df["SIMILARITY"])))
+        self.assertEqual(len(reports[0]), 3)
+        self.assertEqual(reports[1], reports[0])
+
+
+    def test_similarity_top_k(self):
+        """ Function to test only the most similar function of each function is reported """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py", "c.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert %s == 1\n" % ("other" if name == "c.py" else "value"))
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "0,100", "similarity_engine": None,
+                    "similarity_memory_limit": None, "similarity_top_k": 1}
+            mocked_report = mock.Mock()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                            mock.Mock(return_value=(["first"], [1]))), \
+                    mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                SimilarityEagle().orchestrate_similarity(data)
+        report_df = mocked_report.call_args[0][0]
+        nearest = dict(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"]))
+        self.assertEqual(len(report_df), 3)
+        self.assertEqual(nearest[os.path.join(repo, "a.py_first")], os.path.join(repo, "b.py_first"))
+        self.assertEqual(nearest[os.path.join(repo, "b.py_first")], os.path.join(repo, "a.py_first"))
+
+
+    def test_similarity_index(self):
+        """ Function to test the second run with the similarity index reports the pairs of the first run """
+        with tempfile.TemporaryDirectory() as repo, tempfile.TemporaryDirectory() as report:
+            for name in ["a.py", "b.py", "c.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert %s == 1\n" % name)
+            data = {**TestResource.input_json, "path": repo, "report_folder": report, "run_pattern_match": False,
+                    "run_similarity": True, "pattern_match": None, "similarity_range": "0,100",
+                    "similarity_engine": None, "similarity_top_k": None, "similarity_index": True}
+            reports = []
+            for _ in range(2):
+                mocked_report = mock.Mock()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                                mock.Mock(return_value=(["first"], [1]))), \
+                        mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                    similarityobj = SimilarityEagle()
+                    similarityobj.orchestrate_similarity(data)
+                report_df = mocked_report.call_args[0][0]
+                reports.append(sorted(tuple(sorted(pair)) for pair in
+                                      zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])))
+            self.assertTrue(os.path.isfile(os.path.join(similarityobj.report_path, "similarity_index.npz")))
+        self.assertEqual(len(reports[0]), 3)
+        self.assertEqual(reports[1], reports[0])
+        self.assertIn("0 of 3 functions are new or changed", sys.stdout.getvalue())
+
+
+    def test_winnowing_similarity_engine(self):
+        """ Function to test the winnowing engine reports the copied lines of the functions """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first(values):\n    total = 0\n    for item in values:\n"
+                                   "        total += item\n    return total\n")
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "0,100", "similarity_engine": "winnowing",
+                    "similarity_top_k": None, "similarity_index": False}
+            mocked_report = mock.Mock()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                            mock.Mock(return_value=(["first"], [1]))), \
+                    mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                SimilarityEagle().orchestrate_similarity(data)
+        report_df = mocked_report.call_args[0][0]
+        self.assertEqual(len(report_df), 1)
+        self.assertEqual(report_df["SIMILARITY"][0], 100)
+        self.assertEqual(report_df["UNIQ ID BODY LINES"][0], report_df["POTENTIAL MATCH BODY LINES"][0])
+
+
+    def test_similarity_dedup(self):
+        """ Function to test the copies are reported as clone class and only the representative is matched """
+        with tempfile.TemporaryDirectory() as repo:
+            for name, code in [("a.py", "total = values + 1"), ("b.py", "result  = items + 1"), ("c.py", "pass")]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    %s\n" % code)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "0,100", "similarity_engine": None,
+                    "similarity_top_k": None, "similarity_index": False, "similarity_dedup": True}
+            mocked_report = mock.Mock()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                            mock.Mock(return_value=(["first"], [1]))), \
+                    mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                similarityobj = SimilarityEagle()
+                similarityobj.orchestrate_similarity(data)
+            self.assertTrue(any(name.startswith("clone_classes") for name in os.listdir(similarityobj.report_path)))
+        report_df = mocked_report.call_args[0][0]
+        self.assertEqual(len(report_df), 1)
+        self.assertEqual({report_df["UNIQ ID"].iloc[0], report_df["POTENTIAL MATCH"].iloc[0]},
+                         {os.path.join(repo, "a.py_first"), os.path.join(repo, "c.py_first")})
+        self.assertIn("1 copied functions are collapsed in to 1 clone classes", sys.stdout.getvalue())
+
+
+    def test_similarity_length_buckets(self):
+        """ Function to test the length buckets report the pairs of the cosine engine and the pruned pairs """
+        with tempfile.TemporaryDirectory() as repo:
+            for name, code in [("a.py", "total = values"), ("b.py", "total = values"), ("c.py", "%s" % " + ".join(
+                    "word%s" % index for index in range(50)))]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    %s\n" % code)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": True,
+                    "pattern_match": None, "similarity_range": "80,100", "similarity_engine": None,
+                    "similarity_top_k": None, "similarity_index": False, "similarity_dedup": False,
+                    "similarity_length_buckets": 3}
+            mocked_report = mock.Mock()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                            mock.Mock(return_value=(["first"], [1]))), \
+                    mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report):
+                similarityobj = SimilarityEagle()
+                similarityobj.orchestrate_similarity(data)
+        report_df = mocked_report.call_args[0][0]
+        self.assertEqual(sorted([report_df["UNIQ ID"].iloc[0], report_df["POTENTIAL MATCH"].iloc[0]]),
+                         [os.path.join(repo, "a.py_first"), os.path.join(repo, "b.py_first")])
+        self.assertEqual(len(report_df), 1)
+        self.assertEqual(similarityobj.pruning, {"computed": 1, "total": 3})
+        self.assertIn("length buckets pruned 2 of 3 pairs", sys.stdout.getvalue())
+
+
+    def test_similarity_streaming(self):
+        """ Function to test the streaming mode reports the patterns and pairs of the in memory mode """
+        with tempfile.TemporaryDirectory() as repo:
+            for name, code in [("a.py", "assert total(1) == values"), ("b.py", "assert total(2) == values"),
+                               ("c.py", "print(other)")]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    %s\n" % code)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": True, "run_similarity": True,
+                    "pattern_match": ["assert"], "pattern_seperator": ["("], "similarity_range": "0,100",
+                    "similarity_engine": None, "similarity_top_k": None, "similarity_index": False,
+                    "similarity_dedup": False, "similarity_length_buckets": None}
+            results = []
+            for streaming in [False, True]:
+                mocked_report, mocked_pattern = mock.Mock(), mock.Mock()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                                mock.Mock(return_value=(["first"], [1]))), \
+                        mock.patch('similarity.similarity_io.SimilarityIO.report', mocked_report), \
+                        mock.patch.object(SimilarityEagle, '__report_pattern__', mocked_pattern):
+                    similarityobj = SimilarityEagle()
+                    self.assertEqual(similarityobj.orchestrate_similarity({**data, "similarity_streaming": streaming}),
+                                     0)
+                report_df = mocked_report.call_args[0][0]
+                pattern, matched, pivot = mocked_pattern.call_args[0]
+                results.append((sorted(tuple(sorted(pair)) + (round(score, 6),) for *pair, score in
+                                       zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"], report_df["SIMILARITY"])),
+                                pattern, sorted(matched.loc[matched["Count of assert in function"] > 0, "Uniq ID"]),
+                                sorted(zip(pivot.iloc[:, 0], pivot.iloc[:, 1]))))
+            self.assertTrue(os.path.isfile(os.path.join(similarityobj.report_path, "streamed-functions.csv")))
+        self.assertEqual(len(results[0][0]), 3)
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[1][3], [("assert total", 2)])
+        self.assertIsNone(similarityobj.dataframe)
+
+    def test_similarity_streaming_cache(self):
+        """ Function to test the streaming mode looks up the result cache once per shard of the files """
+        with tempfile.TemporaryDirectory() as repo, tempfile.TemporaryDirectory() as cache:
+            for index in range(3):
+                Path(repo, "file%s.py" % index).write_text("def first():\n    assert %s == 1\n" % index)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": True, "run_similarity": False,
+                    "pattern_match": ["assert"], "pattern_seperator": [None], "similarity_streaming": True,
+                    "extraction_workers": None, "extraction_native": True, "pattern_file_scan": False,
+                    "cache_path": os.path.join(cache, "cache.db")}
+            with mock.patch('eaglevision.similarity_eagle.STREAM_FILES', 2), \
+                    mock.patch.object(SimilarityEagle, '__report_pattern__') as mocked_pattern:
+                self.assertEqual(SimilarityEagle().orchestrate_similarity(data), 0)
+                self.assertEqual(SimilarityEagle().orchestrate_similarity(data), 0)
+            self.assertEqual(len(mocked_pattern.call_args[0][1]), 3)
+        self.assertEqual(sys.stdout.getvalue().count("files served from the extraction cache"), 4)
+        self.assertIn("2 of 2 files served from the extraction cache", sys.stdout.getvalue())
+        self.assertIn("1 of 1 files served from the extraction cache", sys.stdout.getvalue())
+
+    def test_similarity_streaming_delta(self):
+        """ Function to test the annotation delta lines are not streamed, their IDs are numbered across the files """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a/utils.py", "b/utils.py"]:
+                Path(repo, name).parent.mkdir(exist_ok=True)
+                Path(repo, name).write_text("def first():\n    # @Test\n    assert 1\n")
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": False,
+                    "pattern_match": ["assert"], "pattern_seperator": [None], "similarity_streaming": True,
+                    "extraction_workers": None, "extraction_native": False, "pattern_file_scan": False,
+                    "extraction_annotation": "@Test", "extraction_delta": 1, "cache_path": None}
+            similarityobj = SimilarityEagle()
+            self.assertEqual(similarityobj.orchestrate_similarity(data), 0)
+            self.assertFalse(os.path.isfile(os.path.join(similarityobj.report_path, "streamed-functions.csv")))
+        self.assertEqual(sorted(similarityobj.dataframe["Uniq ID"]), ["utils.py_1", "utils.py_2"])
+
+
+    def test_extraction_workers(self):
+        """ Function to test the extraction across workers gives the functions of the extraction in process """
+        with tempfile.TemporaryDirectory() as repo:
+            for index in range(7):
+                with open(os.path.join(repo, "file%s.py" % index), "w") as file_out:
+                    file_out.write("def first():\n    assert %s == 1\n" % index)
+            data = {**TestResource.input_json, "path": repo, "run_similarity": False, "pattern_match": None,
+                    "similarity_streaming": False, "cache_path": None}
+            frames = []
+            for workers, cache_path in [(None, None), (2, None), (3, os.path.join(repo, "cache.db"))]:
+                similarityobj = SimilarityEagle()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names',
+                                mock.Mock(return_value=(["first"], [1]))), \
+                        mock.patch('eaglevision.similarity_eagle.ProcessPoolExecutor',
+                                   wraps=ProcessPoolExecutor) as mocked_pool:
+                    similarityobj.orchestrate_similarity({**data, "extraction_workers": workers,
+                                                          "cache_path": cache_path, "shared_file_walk": True})
+                self.assertEqual(mocked_pool.called, workers is not None)
+                frames.append(similarityobj.dataframe.sort_values("Uniq ID").reset_index(drop=True))
+        self.assertEqual(len(frames[0]), 7)
+        assert_frame_equal(frames[1], frames[0])
+        assert_frame_equal(frames[2], frames[0])
+
+
+    def test_extraction_native(self):
+        """ Function to test the python functions are extracted without ctags, other files still with ctags """
+        with tempfile.TemporaryDirectory() as repo:
+            with open(os.path.join(repo, "a.py"), "w") as file_out:
+                file_out.write("import os\n\n\ndef first():\n    assert 1 == 1\n\n\ndef second():\n    pass\n")
+            with open(os.path.join(repo, "b.java"), "w") as file_out:
+                file_out.write("class B {\n    void third() {\n        run();\n    }\n}\n")
+            data = {**TestResource.input_json, "path": repo, "run_similarity": False, "pattern_match": None,
+                    "similarity_streaming": False, "extraction_workers": None, "cache_path": None,
+                    "extraction_native": True}
+            mocked_names = mock.Mock(return_value=(["third"], [2]))
+            similarityobj = SimilarityEagle()
+            with mock.patch('functiondefextractor.core_extractor.get_function_names', mocked_names):
+                similarityobj.orchestrate_similarity(data)
+        self.assertEqual(mocked_names.call_args_list, [mock.call(os.path.join(repo, "b.java"))])
+        self.assertEqual(sorted(similarityobj.dataframe["Uniq ID"]), [os.path.join(repo, "a.py_first"),
+                                                                     os.path.join(repo, "a.py_second"),
+                                                                     os.path.join(repo, "b.java_third")])
+
+
+    def test_extraction_cache_pattern_change(self):
+        """ Function to test a change of the pattern list only reuses the cached extraction of the files """
+        with tempfile.TemporaryDirectory() as repo:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    assert 1 == 1\n    print(1)\n")
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": False,
+                    "pattern_seperator": [None], "similarity_streaming": False, "extraction_workers": None,
+                    "extraction_native": False, "cache_path": os.path.join(repo, "cache.db"), "cache_max_size": 1}
+            mocked_names = mock.Mock(return_value=(["first"], [1]))
+            with mock.patch('functiondefextractor.core_extractor.get_function_names', mocked_names):
+                for pattern in ["assert", "print"]:
+                    with mock.patch('eaglevision.similarity_eagle.check_conditions',
+                                    mock.Mock(return_value=[(pd.DataFrame(), pd.DataFrame())])) \
+                            as mocked_condition:
+                        SimilarityEagle().orchestrate_similarity({**data, "pattern_match": [pattern]})
+                    self.assertEqual(mocked_condition.call_args[0][0], [pattern])
+                    self.assertEqual(len(mocked_condition.call_args[0][1]), 2)
+                SimilarityEagle().orchestrate_similarity({**data, "pattern_match": ["print"],
+                                                          "extraction_annotation": "@Test"})
+            self.assertEqual(mocked_names.call_count, 4)
+        self.assertIn("2 of 2 files served from the extraction cache", sys.stdout.getvalue())
+        self.assertIn("0 of 2 files served from the extraction cache", sys.stdout.getvalue())
+
+    def test_pattern_file_scan(self):
+        """ Function to test the pattern only fast mode extracts only the files with a hit and reports the pattern
+        check of the in memory mode """
+        with tempfile.TemporaryDirectory() as repo:
+            for name, code in [("a.py", "assert total(1) == values"), ("b.py", "ASSERT total(2) == values"),
+                               ("c.py", "print(other)")]:
+                with open(os.path.join(repo, name), "w") as file_out:
+                    file_out.write("def first():\n    %s\n" % code)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": True, "run_similarity": False,
+                    "pattern_match": ["assert"], "pattern_seperator": ["("], "similarity_streaming": False,
+                    "extraction_workers": None, "extraction_native": False, "cache_path": None}
+            results = []
+            for file_scan in [False, True]:
+                mocked_names, mocked_pattern = mock.Mock(return_value=(["first"], [1])), mock.Mock()
+                with mock.patch('functiondefextractor.core_extractor.get_function_names', mocked_names), \
+                        mock.patch.object(SimilarityEagle, '__report_pattern__', mocked_pattern):
+                    self.assertEqual(SimilarityEagle().orchestrate_similarity({**data, "pattern_file_scan": file_scan}),
+                                     0)
+                pattern, matched, pivot = mocked_pattern.call_args[0]
+                results.append((pattern, sorted(matched.loc[matched["Count of assert in function"] > 0, "Uniq ID"]),
+                                sorted(zip(pivot.iloc[:, 0], pivot.iloc[:, 1]))))
+                self.assertEqual(mocked_names.call_count, 3 - file_scan)
+            self.assertEqual(sorted(call[0][0] for call in mocked_names.call_args_list),
+                             [os.path.join(repo, "a.py"), os.path.join(repo, "b.py")])
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[1][1], [os.path.join(repo, "a.py_first"), os.path.join(repo, "b.py_first")])
+        self.assertIn("2 of 3 files contain the patterns", sys.stdout.getvalue())
+
+    def test_extraction_cache_delta(self):
+        """ Function to test the annotation delta lines served from the extraction cache keep the IDs of the
+        extractor, for copies with an other file name and for file names repeated across folders """
+        with tempfile.TemporaryDirectory() as repo, tempfile.TemporaryDirectory() as cache:
+            code = "def first():\n    # @Test\n    assert %s\n"
+            for name, value in [("a/utils.py", 1), ("b/utils.py", 2), ("c/other.py", 1)]:
+                Path(repo, name).parent.mkdir(exist_ok=True)
+                Path(repo, name).write_text(code % value + code % value)
+            data = {**TestResource.input_json, "path": repo, "run_pattern_match": False, "run_similarity": False,
+                    "pattern_match": ["assert"], "pattern_seperator": [None], "similarity_streaming": False,
+                    "extraction_workers": None, "extraction_native": False, "pattern_file_scan": False,
+                    "extraction_annotation": "@Test", "extraction_delta": 1,
+                    "cache_path": os.path.join(cache, "cache.db")}
+            expected = core_extractor.extractor(repo, annot="@Test", delta=1)
+            for _ in range(2):
+                similarityobj = SimilarityEagle()
+                similarityobj.orchestrate_similarity(data)
+                self.assertEqual(sorted(zip(similarityobj.dataframe["Uniq ID"], similarityobj.dataframe["Code"])),
+                                 sorted(zip(expected["Uniq ID"], expected["Code"])))
+        self.assertIn("3 of 3 files served from the extraction cache", sys.stdout.getvalue())
+
 
 if __name__ == '__main__':
     unittest.main()
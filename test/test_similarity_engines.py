@@ -0,0 +1,285 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from similarity.similarity_io import SimilarityIO
+from eaglevision.similarity_engines import word_count_matrix, minhash_signatures, choose_rows_per_band, \
+    lsh_candidates, minhash_cos_match, rows_per_block, blocked_cos_match, top_k_cos_match, top_k_of_pairs, \
+    fingerprints, line_ranges, winnowing_match, normalized_body, clone_classes, length_profile, length_buckets, \
+    bucketed_cos_match, shared_words_bound
+
+
+class SimilarityEnginesTestCase(unittest.TestCase):  # pylint: disable=R0904
+    """ Class to test the similarity_engines.py"""
+
+    @staticmethod
+    def functions_frame(count=120, seed=3):
+        """ Function which creates functions of random words, every fourth one a near copy of the previous one """
+        state = np.random.RandomState(seed)
+        words = ["word%s" % index for index in range(400)]
+        steps = []
+        for index in range(count):
+            if index % 4 == 3:
+                body = steps[-1].split()
+                body[state.randint(len(body))] = "changed"
+                steps.append(" ".join(body))
+            else:
+                steps.append(" ".join(state.choice(words, 40)))
+        return pd.DataFrame({"Uniq ID": ["id%s" % index for index in range(count)], "Steps": steps})
+
+    @staticmethod
+    def exact_pairs(data_frame, filter_range):
+        """ Function which returns the pairs of the all pairs cosine similarity of SimilarityIO """
+        similarity_io_obj = SimilarityIO(None, None, None, filter_range=filter_range)
+        similarity_io_obj.data_frame = data_frame.copy()
+        similarity_io_obj.uniq_header = "Uniq ID"
+        report_df = similarity_io_obj.process_cos_match()
+        return sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"]))
+
+    def test_signatures(self):
+        """ Function to test texts with the same word counts have the same signature, empty texts are masked """
+        matrix = word_count_matrix(pd.Series(["alpha beta gamma alpha", "gamma alpha beta alpha", "",
+                                              "delta epsilon"]))
+        signatures, non_empty = minhash_signatures(matrix)
+        self.assertEqual(signatures.shape, (4, 128))
+        self.assertTrue(np.array_equal(signatures[0], signatures[1]))
+        self.assertFalse(np.array_equal(signatures[0], signatures[3]))
+        self.assertEqual(list(non_empty), [True, True, False, True])
+        first, second = lsh_candidates(signatures, non_empty, 8)
+        self.assertEqual(list(zip(first, second)), [(0, 1)])
+
+    def test_rows_per_band(self):
+        """ Function to test the banding gets more selective with the threshold """
+        self.assertEqual(choose_rows_per_band(0.01), 1)
+        self.assertEqual(choose_rows_per_band(0.5), 2)
+        self.assertEqual(choose_rows_per_band(1.0), 128)
+        self.assertGreater(choose_rows_per_band(0.95), choose_rows_per_band(0.5))
+
+    def test_minhash_matches_exact(self):
+        """ Function to test the MinHash engine finds the near copies found by the all pairs cosine """
+        data_frame = self.functions_frame()
+        report_df = minhash_cos_match(data_frame, "80,100")
+        self.assertEqual(sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                         self.exact_pairs(data_frame, "80,100"))
+        self.assertEqual(len(report_df), 30)
+        self.assertTrue(((report_df["SIMILARITY"] >= 80) & (report_df["SIMILARITY"] <= 100)).all())
+
+    def test_minhash_recall(self):
+        """ Function to test the MinHash engine finds the pairs of the all pairs cosine for functions of skewed word
+        counts, whose similarity spreads over the range """
+        state = np.random.RandomState(5)
+        words = ["word%s" % index for index in range(60)]
+        frequency = 1.0 / np.arange(1, len(words) + 1)
+        steps = [" ".join(state.choice(words, state.randint(5, 60), p=frequency / frequency.sum()))
+                 for _ in range(200)]
+        data_frame = pd.DataFrame({"Uniq ID": ["id%s" % index for index in range(200)], "Steps": steps})
+        for filter_range in ["70,100", "90,100"]:
+            report_df = minhash_cos_match(data_frame, filter_range)
+            self.assertEqual(sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                             self.exact_pairs(data_frame, filter_range))
+
+    def test_minhash_changed(self):
+        """ Function to test only the pairs of the changed functions are reported, changed function first """
+        data_frame = self.functions_frame()
+        changed = np.zeros(len(data_frame), dtype=bool)
+        changed[[3, 6]] = True
+        report_df = minhash_cos_match(data_frame, "80,100", changed)
+        self.assertEqual(sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                         [("id3", "id2"), ("id6", "id7")])
+
+
+    def test_rows_per_block(self):
+        """ Function to test the block size follows the memory budget """
+        self.assertEqual(rows_per_block(1024, 1), 32)
+        self.assertEqual(rows_per_block(1024, 0.5), 16)
+        self.assertEqual(rows_per_block(10 ** 9, 1), 1)
+
+    def test_blocked_matches_exact(self):
+        """ Function to test the blocked cosine reports the pairs and scores of the all pairs cosine """
+        data_frame = self.functions_frame()
+        similarity_io_obj = SimilarityIO(None, None, None, filter_range="50,100")
+        similarity_io_obj.data_frame = data_frame.copy()
+        similarity_io_obj.uniq_header = "Uniq ID"
+        expected_df = similarity_io_obj.process_cos_match().reset_index(drop=True)
+        # 0.01 MB is two rows of 120 functions per block
+        report_df = blocked_cos_match(data_frame, "50,100", 0.01)
+        self.assertEqual(list(report_df["UNIQ ID"]), list(expected_df["UNIQ ID"]))
+        self.assertEqual(list(report_df["POTENTIAL MATCH"]), list(expected_df["POTENTIAL MATCH"]))
+        self.assertTrue(np.allclose(report_df["SIMILARITY"], expected_df["SIMILARITY"]))
+        self.assertEqual(len(blocked_cos_match(data_frame, "0,100", 0.01)), 120 * 119 // 2)
+
+    def test_blocked_changed(self):
+        """ Function to test the changed functions are matched against all the functions, each pair once """
+        data_frame = self.functions_frame()
+        changed = np.zeros(len(data_frame), dtype=bool)
+        changed[[3, 6]] = True
+        report_df = blocked_cos_match(data_frame, "0,100", 0.01, changed)
+        self.assertEqual(len(report_df), 119 + 118)
+        self.assertEqual(set(report_df["UNIQ ID"]), {"id3", "id6"})
+        self.assertEqual(sorted(zip(*[column[report_df["SIMILARITY"] >= 80] for column in
+                                      (report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])])),
+                         [("id3", "id2"), ("id6", "id7")])
+
+
+    def test_top_k(self):
+        """ Function to test the top k neighbours of each function are the most similar of the all pairs cosine """
+        data_frame = self.functions_frame()
+        report_df = top_k_cos_match(data_frame, "0,100", 2, 0.01)
+        self.assertEqual(len(report_df), 120 * 2)
+        self.assertEqual(list(report_df["UNIQ ID"][:2]), ["id0", "id0"])
+        self.assertTrue((report_df["SIMILARITY"].to_numpy()[::2] >= report_df["SIMILARITY"].to_numpy()[1::2]).all())
+        all_pairs = blocked_cos_match(data_frame, "0,100", 0.01)
+        all_pairs = top_k_of_pairs(all_pairs, 2)
+        for uniq_id in ["id2", "id3", "id50"]:
+            self.assertTrue(np.allclose(report_df["SIMILARITY"][report_df["UNIQ ID"] == uniq_id],
+                                        all_pairs["SIMILARITY"][all_pairs["UNIQ ID"] == uniq_id]))
+        nearest = dict(zip(report_df["UNIQ ID"][::2], report_df["POTENTIAL MATCH"][::2]))
+        self.assertEqual((nearest["id2"], nearest["id3"]), ("id3", "id2"))
+        self.assertTrue(top_k_cos_match(data_frame, "80,100", 2, 0.01)["SIMILARITY"].ge(80).all())
+
+    def test_top_k_changed(self):
+        """ Function to test only the neighbours of the changed functions are reported """
+        data_frame = self.functions_frame()
+        changed = np.zeros(len(data_frame), dtype=bool)
+        changed[[3, 6]] = True
+        report_df = top_k_cos_match(data_frame, "0,100", 1, None, changed)
+        self.assertEqual(list(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])), [("id3", "id2"), ("id6", "id7")])
+        pairs_df = top_k_of_pairs(minhash_cos_match(data_frame, "80,100", changed), 1, {"id3", "id6"})
+        self.assertEqual(list(zip(pairs_df["UNIQ ID"], pairs_df["POTENTIAL MATCH"])), [("id3", "id2"), ("id6", "id7")])
+
+
+    def test_fingerprints(self):
+        """ Function to test the winnowing selects at least one fingerprint per window with the lines of the shingle """
+        selected = fingerprints("a = b + c\nd = e + f\n")
+        positions = sorted(span for spans in selected.values() for span in spans)
+        self.assertEqual(positions[0][0], 1)
+        self.assertEqual(positions[-1][1], 2)
+        self.assertEqual(fingerprints("a = b"), dict())
+        self.assertEqual(len(fingerprints("a = b + c")), 1)
+
+    def test_line_ranges(self):
+        """ Function to test the line spans are merged in to ranges """
+        self.assertEqual(line_ranges([(4, 6), (1, 2), (3, 3), (9, 9)]), "1-6,9")
+        self.assertEqual(line_ranges([]), "")
+
+    def test_winnowing_match(self):
+        """ Function to test the copied region is found with its lines, unrelated functions are not reported """
+        body = "    total = 0\n    for item in values:\n        total += item * 2\n    return total\n"
+        data_frame = pd.DataFrame({"Uniq ID": ["a", "b", "c"],
+                                   "Steps": ["def first(values):\n" + body,
+                                             "def second(values):\n    print(values)\n" + body,
+                                             "def third():\n    return None\n"]})
+        report_df = winnowing_match(data_frame, "0,100")
+        self.assertEqual(list(report_df.columns), ["UNIQ ID", "POTENTIAL MATCH", "SIMILARITY", "UNIQ ID BODY LINES",
+                                                   "POTENTIAL MATCH BODY LINES"])
+        self.assertEqual(list(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])), [("a", "b")])
+        self.assertTrue(0 < report_df["SIMILARITY"][0] < 100)
+        self.assertTrue(report_df["UNIQ ID BODY LINES"][0].startswith("2-"))
+        self.assertTrue(report_df["POTENTIAL MATCH BODY LINES"][0].startswith("3-"))
+        self.assertTrue(winnowing_match(data_frame, "90,100").empty)
+        changed = winnowing_match(data_frame, "0,100", np.array([False, True, False]))
+        self.assertEqual(list(zip(changed["UNIQ ID"], changed["POTENTIAL MATCH"], changed["UNIQ ID BODY LINES"])),
+                         [("b", "a", report_df["POTENTIAL MATCH BODY LINES"][0])])
+        nearest = top_k_of_pairs(report_df, 1)
+        self.assertEqual(list(nearest["POTENTIAL MATCH BODY LINES"]),
+                         [report_df["POTENTIAL MATCH BODY LINES"][0], report_df["UNIQ ID BODY LINES"][0]])
+
+
+    def test_normalized_body(self):
+        """ Function to test copies with other names and layout normalize equal, other structures do not """
+        self.assertEqual(normalized_body("int add(a, b) {\n  return a + b;\n}"),
+                         normalized_body("int  plus(x,y) { return x + y; }"))
+        self.assertNotEqual(normalized_body("a + b"), normalized_body("a + a"))
+        self.assertNotEqual(normalized_body("a + 1"), normalized_body("a + 2"))
+        self.assertNotEqual(normalized_body("for x in items: yield x"), normalized_body("if x in items: raise x"))
+
+    def test_clone_classes(self):
+        """ Function to test the copies are grouped with one representative, the preferred one first """
+        data_frame = pd.DataFrame({"Uniq ID": ["a", "b", "c", "d"],
+                                   "Steps": ["f(x) { x + 1 }", "g(y)  {y + 1}", "h(z) { z * 2 }", "f(x) { x + 1 }"]})
+        representative, classes = clone_classes(data_frame)
+        self.assertEqual(list(representative), [True, False, True, False])
+        self.assertEqual(list(zip(classes["REPRESENTATIVE"], classes["UNIQ ID"], classes["MEMBERS"])),
+                         [("a", "a", 3), ("a", "b", 3), ("a", "d", 3)])
+        representative, classes = clone_classes(data_frame, np.array([False, False, False, True]))
+        self.assertEqual(list(representative), [False, False, True, True])
+        self.assertEqual(set(classes["REPRESENTATIVE"]), {"d"})
+        data_frame = pd.DataFrame({"Uniq ID": ["a", "b", "c"],
+                                   "Steps": ["if (count > 0) { return count; }", "while (count > 0) { return count; }",
+                                             "if (total > 0) { return total; }"]})
+        representative, classes = clone_classes(data_frame)
+        self.assertEqual(list(representative), [True, True, False])
+        self.assertEqual(list(zip(classes["REPRESENTATIVE"], classes["UNIQ ID"])), [("a", "a"), ("a", "c")])
+
+
+    @staticmethod
+    def lengths_frame(count=90, seed=5):
+        """ Function which creates functions of very different lengths, every third one a near copy """
+        state = np.random.RandomState(seed)
+        words = ["word%s" % index for index in range(300)]
+        steps = []
+        for index in range(count):
+            if index % 3 == 2:
+                steps.append(steps[-1] + " changed")
+            else:
+                steps.append(" ".join(state.choice(words, [3, 20, 200][index % 4 % 3])))
+        return pd.DataFrame({"Uniq ID": ["id%s" % index for index in range(count)], "Steps": steps})
+
+    def test_length_bound(self):
+        """ Function to test the distinct words bound the cosine similarity of all the pairs """
+        data_frame = self.lengths_frame()
+        matrix = word_count_matrix(data_frame["Steps"])
+        profile = length_profile(matrix)
+        similarity = cosine_similarity(matrix)
+        rows = np.arange(len(data_frame))
+        bound = np.array([shared_words_bound(profile, rows, words) for words in profile[0]])
+        self.assertTrue((similarity <= bound + 1e-9).all())
+        self.assertLess(bound.min(), 0.5)
+        profile = length_profile(word_count_matrix(pd.Series(["", "ab cd ab ab"])))
+        self.assertEqual(list(shared_words_bound(profile, np.array([0, 1]), 1)), [0, 0.9486832980505138])
+        self.assertEqual(list(shared_words_bound(profile, np.array([1]), 5)), [1])
+        self.assertEqual(sorted(np.concatenate(length_buckets(profile[0], 4))), [0, 1])
+        self.assertEqual(len(length_buckets(np.arange(90), 1000)), 90)
+
+    def test_bucketed_matches_exact(self):
+        """ Function to test the pruned buckets report the pairs of the all pairs cosine with fewer computed """
+        data_frame = self.lengths_frame()
+        report_df, computed, total = bucketed_cos_match(data_frame, "80,100", 6)
+        self.assertEqual(sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                         self.exact_pairs(data_frame, "80,100"))
+        self.assertEqual(total, 90 * 89 // 2)
+        self.assertLess(computed, total)
+        report_df, computed, total = bucketed_cos_match(data_frame, "0,100", 6, 0.001)
+        self.assertEqual(computed, total)
+        self.assertEqual(len(report_df), total)
+
+    def test_bucketed_skips_pairs(self):
+        """ Function to test the pairs of random functions of mixed lengths are skipped, with the pairs of the all
+        pairs cosine reported """
+        state = np.random.RandomState(2)
+        words = ["word%s" % index for index in range(300)]
+        data_frame = pd.DataFrame({"Uniq ID": ["id%s" % index for index in range(130)],
+                                   "Steps": [" ".join(state.choice(words, state.randint(5, 80))) for _ in range(130)]})
+        report_df, computed, total = bucketed_cos_match(data_frame, "80,100", 8)
+        self.assertEqual(sorted(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])),
+                         self.exact_pairs(data_frame, "80,100"))
+        self.assertEqual(total, 130 * 129 // 2)
+        self.assertLess(computed, 0.7 * total)
+
+    def test_bucketed_changed(self):
+        """ Function to test only the pairs of the changed functions are computed, changed function first """
+        data_frame = self.lengths_frame()
+        changed = np.zeros(len(data_frame), dtype=bool)
+        changed[[2, 5]] = True
+        report_df, computed, total = bucketed_cos_match(data_frame, "0,100", 3, None, changed)
+        self.assertEqual(total, 89 + 88)
+        self.assertEqual(computed, total)
+        self.assertEqual(set(report_df["UNIQ ID"]), {"id2", "id5"})
+        report_df, _, _ = bucketed_cos_match(data_frame, "80,100", 3, None, changed)
+        self.assertEqual(list(zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"])), [("id2", "id1"),
+                                                                                          ("id5", "id4")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Koninklijke Philips N.V., 2019 - 2020. All rights reserved."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from eaglevision.similarity_engines import blocked_cos_match
+from eaglevision.similarity_index import SimilarityIndex, function_keys
+
+
+class SimilarityIndexTestCase(unittest.TestCase):
+    """ Class to test the similarity_index.py"""
+
+    steps = ["alpha beta gamma delta", "alpha beta gamma epsilon", "zeta eta theta", "alpha beta zeta eta"]
+
+    @staticmethod
+    def sorted_pairs(report_df):
+        """ Function which returns the pairs of the report in a comparable order """
+        return sorted(tuple(sorted([first, second])) + (round(score, 6),) for first, second, score in
+                      zip(report_df["UNIQ ID"], report_df["POTENTIAL MATCH"], report_df["SIMILARITY"]))
+
+    def run_index(self, index_path, uniq_ids, steps, settings="0,100"):
+        """ Function which updates and queries the index like a run of the similarity check """
+        similarity_index = SimilarityIndex(index_path, settings)
+        changed = similarity_index.update(uniq_ids, steps)
+        report_df = similarity_index.query(changed, settings)
+        similarity_index.save()
+        return changed, report_df
+
+    def test_function_keys(self):
+        """ Function to test the repeated unique ids get distinct keys """
+        self.assertEqual(list(function_keys(["a", "b", "a"])), ["a#0", "b#0", "a#1"])
+
+    def test_incremental_update(self):
+        """ Function to test only the new and changed functions are vectorized and the report equals a full run """
+        with tempfile.TemporaryDirectory() as report:
+            index_path = os.path.join(report, "index.npz")
+            changed, report_df = self.run_index(index_path, ["a", "b", "c", "d"], self.steps)
+            self.assertEqual(list(changed), [True] * 4)
+            expected = blocked_cos_match(pd.DataFrame({"Uniq ID": ["a", "b", "c", "d"], "Steps": self.steps}),
+                                         "0,100", 1)
+            self.assertEqual(self.sorted_pairs(report_df), self.sorted_pairs(expected))
+            # c is changed, d is removed and e is added
+            steps = [self.steps[0], self.steps[1], "alpha gamma theta", "beta delta epsilon"]
+            with mock.patch('sklearn.feature_extraction.text.HashingVectorizer.transform',
+                            side_effect=SimilarityIndex(index_path, "0,100").vectorizer.transform) as mocked:
+                changed, report_df = self.run_index(index_path, ["a", "b", "c", "e"], steps)
+            self.assertEqual(list(changed), [False, False, True, True])
+            self.assertEqual(len(mocked.call_args[0][0]), 2)
+            expected = blocked_cos_match(pd.DataFrame({"Uniq ID": ["a", "b", "c", "e"], "Steps": steps}), "0,100", 1)
+            self.assertEqual(self.sorted_pairs(report_df), self.sorted_pairs(expected))
+            changed, report_df = self.run_index(index_path, ["a", "b", "c", "e"], steps)
+            self.assertFalse(changed.any())
+            self.assertEqual(self.sorted_pairs(report_df), self.sorted_pairs(expected))
+
+    def test_settings_change(self):
+        """ Function to test the index is rebuilt when the similarity range changes """
+        with tempfile.TemporaryDirectory() as report:
+            index_path = os.path.join(report, "index.npz")
+            self.run_index(index_path, ["a", "b", "c", "d"], self.steps)
+            changed, report_df = self.run_index(index_path, ["a", "b", "c", "d"], self.steps, "50,100")
+            self.assertTrue(changed.all())
+            self.assertTrue((report_df["SIMILARITY"] >= 50).all())
+            self.assertTrue(np.isin(["a"], report_df["UNIQ ID"]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
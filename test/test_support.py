@@ -2,6 +2,7 @@
 This file holds the test resources for testing """
 
 import os
+import subprocess
 from pathlib import Path
 
 
@@ -55,6 +56,19 @@ class TestResource:
         file.write(json_in)
         file.close()
 
+    @staticmethod
+    def commit_files(repo, files, removed=()):
+        """ Function to write, remove and commit files in a git repository, initialised on first use"""
+        if not os.path.isdir(os.path.join(repo, ".git")):
+            subprocess.run(["git", "init", "-q", repo], check=True)
+        for name, content in files.items():
+            Path(repo, name).write_text(content)
+        for name in removed:
+            os.remove(os.path.join(repo, name))
+        subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+        subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "test"],
+                       cwd=repo, check=True)
+
     @staticmethod
     def get_result_file_name(folder_name, file_starts):
         """ Function to return file name when sub string name is given"""